@@ -1,8 +1,9 @@
 import source.utils as utils
 import numpy as np
 import source.constants as constants
-from typing import Dict, List, Optional, Tuple
-from Levenshtein import distance as levenshtein_distance
+import source.genome as genome_utils
+import source.scoring as scoring
+from typing import Dict, List, Optional, Tuple, Union
 
 
 # define the cell class
@@ -12,10 +13,13 @@ class Cell:
         ideal_seqs: Dict[str, str],
         traits: List[str],
         trait2frame: Optional[Dict[str, Tuple[int, int]]] = None,
-        genome: Optional[str] = None,
+        genome: Optional[Union[str, genome_utils.PackedGenome]] = None,
+        parent: Optional["Cell"] = None,
     ):
         # genome
         self.genome = utils.gen_genome() if genome is None else genome
+        if constants.PACKED_GENOMES and isinstance(self.genome, str):
+            self.genome = genome_utils.PackedGenome(self.genome)
         self.genome_size = len(self.genome)
         # traits
         self.traits = traits
@@ -30,7 +34,11 @@ class Cell:
         self.trait2score = {}
         for trait in self.traits:
             if trait in ideal_seqs:
-                self.calc_trait_score(trait=trait, ideal_seq=ideal_seqs[trait])
+                # only rescore the traits whose sequence changed from the parent
+                if parent is not None and parent.has_same_trait_seq(self, trait):
+                    self.trait2score[trait] = parent.trait2score[trait]
+                else:
+                    self.calc_trait_score(trait=trait, ideal_seq=ideal_seqs[trait])
         # position
         self.position = constants.INITIAL_POSITION
         # movement
@@ -54,7 +62,8 @@ class Cell:
         deltas = utils.gen_deltas(scaling_factor=self.scaling_factor)
         # calculate new positions
         position_hat = self.position + deltas
-        # TODO: add canvas based adjustments
+        # add canvas based adjustments
+        position_hat = utils.bound_positions(positions=position_hat)
         # reassign position to new positions
         self.position = position_hat
         # calculate the energy
@@ -75,13 +84,9 @@ class Cell:
         @param ideal_seq = the ideal sequence for this gene
         @returns score = score from 1 to 0 of the trait
         """
-        frame = self.trait2frame[trait]
-        self_seq = self.genome[frame[0] : frame[1]]
-        dist = levenshtein_distance(self_seq, ideal_seq)
-        if dist > len(ideal_seq):
-            self.trait2score[trait] = 0
-        else:
-            self.trait2score[trait] = 1 - (dist / len(ideal_seq))
+        self.trait2score[trait] = scoring.calc_trait_score(
+            seq=self.get_trait_seq(trait=trait), ideal_seq=ideal_seq
+        )
 
     # mutation functions
     def mut_genome(self) -> str:
@@ -96,6 +101,9 @@ class Cell:
             curr_nuc = self.genome[idx]
             nuc = utils.gen_mut(threshold=self.trait2score["mutate"], curr_nuc=curr_nuc)
             mut_genome += nuc
+        # keep the representation of the parent
+        if isinstance(self.genome, genome_utils.PackedGenome):
+            return genome_utils.PackedGenome(mut_genome)
         return mut_genome
 
     def mut_frame(self, trait: str) -> Tuple[int]:
@@ -134,8 +142,20 @@ class Cell:
         """
         return self.energy >= 0
 
+    def has_same_trait_seq(self, other: "Cell", trait: str) -> bool:
+        """
+        checks if another cell has the same sequence for a scored trait
+
+        @param other = cell to compare with
+        @param trait = key to access the cells' sequences
+        @returns True if this cell is scored and the sequences match
+        """
+        if trait not in self.trait2score or trait not in other.trait2frame:
+            return False
+        return self.get_trait_seq(trait=trait) == other.get_trait_seq(trait=trait)
+
     # get functions
-    def get_genome(self) -> str:
+    def get_genome(self) -> Union[str, genome_utils.PackedGenome]:
         """
         get function for the genome
 
@@ -167,6 +187,16 @@ class Cell:
         """
         return self.trait2frame[trait]
 
+    def get_trait_seq(self, trait: str) -> str:
+        """
+        get function for the sequence in a trait's reading frame
+
+        @param trait = key to access the cell's sequence
+        @returns sequence of the trait
+        """
+        frame = self.trait2frame[trait]
+        return str(self.genome[frame[0] : frame[1]])
+
     def get_trait_score(self, trait: str) -> float:
         """
         get function for the score of a given trait
@@ -175,6 +205,14 @@ class Cell:
         """
         return self.trait2score[trait]
 
+    def get_energy(self) -> float:
+        """
+        get function for the energy
+
+        @returns the energy of the cell
+        """
+        return self.energy
+
     def get_move_step_size(self) -> float:
         """
         get function for the step size of a movement
@@ -217,7 +255,7 @@ class Cell:
         # instantiate the tracking variable
         json_out = {}
         # add all variables of interest
-        json_out["genome"] = self.genome
+        json_out["genome"] = str(self.genome)
         json_out["genome_size"] = self.genome_size
         json_out["color"] = self.color
         json_out["radius"] = self.radius
@@ -9,6 +9,8 @@ BKGD_COLOR = "#ffffff"
 DEFAULT_NUCS = ["A", "C", "G", "T"]
 # size of the genome to create
 DEFAULT_GENOME_SIZE = 115
+# store cell genomes as genome.PackedGenome rather than str
+PACKED_GENOMES = False
 # random number generator
 DEFAULT_RNG = np.random.default_rng(0)
 # chance for a mutation to be an indel
@@ -33,9 +35,15 @@ MOVE_STEP_SIZE = WINDOW_WIDTH * MOVE_WINDOW_WIDTH_PERC
 # energy components
 ENERGY_WINDOW_WIDTH_PERC = 0.50
 INITIAL_ENERGY = round(ENERGY_WINDOW_WIDTH_PERC / MOVE_WINDOW_WIDTH_PERC)
+# energy a cell needs to divide, the parent and daughter split it evenly
+REPRODUCTION_ENERGY = 2 * INITIAL_ENERGY
 # radius components
 CELL_RADIUS_WIDTH_PERC = 0.02
 CELL_RADIUS = WINDOW_WIDTH * CELL_RADIUS_WIDTH_PERC
+# crowding components, fraction of the overlap of two cells pushed apart a round
+CROWDING_STRENGTH = 0.5
+# bytes allowed per chunk of neighbor candidates in spatial queries
+SPATIAL_MEMORY_BUDGET = 2**26
 # color components
 CELL_OUTLINE_COLOR = "maroon"
 
@@ -58,11 +66,22 @@ FOOD_RADIUS_MEAN_WIDTH_PERC = 0.01
 FOOD_RADIUS_MEAN = WINDOW_WIDTH * FOOD_RADIUS_MEAN_WIDTH_PERC
 FOOD_RADIUS_STD_WIDTH_PERC = 0.0025
 FOOD_RADIUS_STD = WINDOW_WIDTH * FOOD_RADIUS_STD_WIDTH_PERC
+# lifetime components, rounds a food lasts before it is removed
+FOOD_LIFETIME = 500
+# capacity components, the oldest foods are evicted past these caps
+FOOD_MAX = 10000
+FOOD_MAX_PER_VENT = None
+# energy components, energy a food gives a cell with a perfect digest score
+FOOD_ENERGY = 10
 
 # environment genetic optimals
 DIGEST_SIZE = 50
 MOVE_SIZE = 50
 MUTATE_SIZE = 15
+# frame sequences remembered per ideal sequence when scoring traits
+SCORE_CACHE_SIZE = 2**16
+# cells scored per task when rescoring a population
+RESCORE_CHUNK_SIZE = 2**14
 # colors
 DEFAULT_FILL_COLOR = "#ffffff"
 DEFAULT_OUTLINE_COLOR = "#000000"
@@ -70,9 +89,51 @@ DEFAULT_OUTLINE_COLOR = "#000000"
 # snapshot filename
 SNAPSHOT_DIRNAME = "snapshots"
 SNAPSHOT_FILENAME_PREFIX = "snap_"
+# how snapshots are written, "columnar" into one store, "delta" as keyframes
+# with the changes in between, "sqlite" into a database or "json" files
+SNAPSHOT_FORMAT = "columnar"
+# directory inside the snapshot directory holding the columnar store
+SNAPSHOT_STORE_DIRNAME = "store"
+# directory inside the snapshot directory holding the delta store
+SNAPSHOT_DELTA_DIRNAME = "deltas"
+# rounds between the keyframes of the delta store
+SNAPSHOT_KEYFRAME_INTERVAL = 50
+# database inside the snapshot directory every run is added to
+SNAPSHOT_SQLITE_FILENAME = "snapshots.sqlite"
+# number of cells saved each round, every cell if None, the sample keeps the
+# cells with the smallest hashes of their ids under the seed so it is stable
+SNAPSHOT_SAMPLE_SIZE = None
+SNAPSHOT_SAMPLE_SEED = 0
+# aggregates over every cell of sampled rounds, a JSON file per round or a
+# JSON lines file inside each store
+SNAPSHOT_AGGREGATE_PREFIX = "agg_"
+SNAPSHOT_AGGREGATES_FILENAME = "aggregates.jsonl"
+# codec and level compressing the genomes new each round, "none", "zlib" or "lzma"
+GENOME_TABLE_CODEC = "zlib"
+GENOME_TABLE_LEVEL = 6
+# whether new genomes are stored as the edits of their parent's genome and
+# how many edits may be chained before a genome is stored in full again
+GENOME_TABLE_EDITS = True
+GENOME_TABLE_MAX_DEPTH = 32
+# whether snapshots are written by a background thread
+SNAPSHOT_BACKGROUND = True
+# rounds that may wait for the snapshot thread and what to do once it is full,
+# "block" waits for room, "drop" skips the round, "coalesce" replaces the newest
+SNAPSHOT_QUEUE_SIZE = 8
+SNAPSHOT_QUEUE_POLICY = "block"
 
 # current components
 CURRENT_SCALER = 3
+# bytes allowed per block of (pixel x vent) distances when computing currents
+CURRENT_MEMORY_BUDGET = 2**26
+# rings of neighboring tiles whose vents push on a round world
+CURRENT_IMAGE_SHELLS = 1
+# how to compute the currents either "direct" or "fft"
+CURRENT_BACKEND = "direct"
+# on disk cache of the current maps
+CURRENT_CACHE_ENABLED = True
+CURRENT_CACHE_DIRNAME = "current_cache"
+CURRENT_CACHE_MAX_BYTES = 2**30
 
 # define the world
 WORLD_SHAPE = "round"
@@ -0,0 +1,440 @@
+import numpy as np
+import source.constants as constants
+from typing import Dict, Optional, Tuple
+
+# approximate number of bytes held per (pixel, vent) pair while computing currents
+_BYTES_PER_PAIR = 48
+
+
+# retrieve vent arrays
+def get_vent_arrays(vent_objects: Dict) -> Tuple[np.array, np.array]:
+    """
+    gathers the positions and radii of the vents into arrays
+
+    @param vent_objects = dictionary of vent objects to get their positions
+    @returns vent_positions = (n_vents x 2) array of the vent x, y coordinates
+    @returns vent_radii = (n_vents) array of the vent radii
+    """
+    vent_positions = np.array(
+        [vent_object.get_position() for vent_object in vent_objects.values()],
+        dtype=float,
+    ).reshape(-1, 2)
+    vent_radii = np.array(
+        [vent_object.get_radius() for vent_object in vent_objects.values()],
+        dtype=float,
+    )
+    return (vent_positions, vent_radii)
+
+
+# calculate the currents for a block of positions
+def calc_current_block(
+    positions: np.array, vent_positions: np.array, vent_radii: np.array
+) -> np.array:
+    """
+    computes the current at each position as the sum of every vent's push
+    where a vent pushes away from itself with strength radius / (distance + 1)
+
+    @param positions = (n_pixels x 2) array of x, y coordinates
+    @param vent_positions = (n_vents x 2) array of the vent x, y coordinates
+    @param vent_radii = (n_vents) array of the vent radii
+    @returns currents = (n_pixels x 2) array of the x, y currents
+    """
+    # calculate difference from vents as (n_pixels x n_vents) blocks
+    differencesx = vent_positions[None, :, 0] - positions[:, 0, None]
+    differencesy = vent_positions[None, :, 1] - positions[:, 1, None]
+    # calculate distances
+    distances = np.hypot(differencesx, differencesy)
+    # calculate scaling factors
+    scaling_factors = vent_radii[None, :] / (distances + 1)
+    # compute unit circle values, a vent sitting on the pixel has theta = 0
+    on_vent = distances == 0
+    distances[on_vent] = 1
+    differencesx[on_vent] = 1
+    differencesy[on_vent] = 0
+    scaling_factors /= distances
+    # finally compute the current, we take negative bc of backwards counting
+    currents = np.empty(shape=(positions.shape[0], 2))
+    currents[:, 0] = -(scaling_factors * differencesx).sum(1)
+    currents[:, 1] = -(scaling_factors * differencesy).sum(1)
+    currents *= constants.CURRENT_SCALER
+    return currents
+
+
+# calculate the current maps over the whole window
+def calc_current_maps(
+    vent_positions: np.array,
+    vent_radii: np.array,
+    memory_budget: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+) -> Tuple[np.array, np.array]:
+    """
+    computes the single digit resolution map of the currents in chunks of rows
+    and vents so the (n_pixels x n_vents) blocks stay within the memory budget
+
+    @param vent_positions = (n_vents x 2) array of the vent x, y coordinates
+    @param vent_radii = (n_vents) array of the vent radii
+    @param memory_budget = bytes allowed per block defaults to constants
+    @param width = width of the maps defaults to the window width
+    @param height = height of the maps defaults to the window height
+    @returns currentx_map = currents indexed by [y, x] for axis x
+    @returns currenty_map = currents indexed by [y, x] for axis y
+    """
+    # configure parameters
+    memory_budget = (
+        constants.CURRENT_MEMORY_BUDGET if memory_budget is None else memory_budget
+    )
+    width = constants.WINDOW_WIDTH if width is None else width
+    height = constants.WINDOW_HEIGHT if height is None else height
+    # instantiate tracking variables
+    currentx_map = np.zeros(shape=(height, width))
+    currenty_map = np.zeros(shape=(height, width))
+    n_vents = len(vent_radii)
+    if n_vents == 0:
+        return (currentx_map, currenty_map)
+    # size the chunks, rows first then vents if a single row is too large
+    pairs_budget = max(1, memory_budget // _BYTES_PER_PAIR)
+    n_rows = int(max(1, min(height, pairs_budget // (width * n_vents))))
+    n_chunk_vents = int(max(1, min(n_vents, pairs_budget // (width * n_rows))))
+    # add in the current vent values
+    xs = np.arange(width, dtype=float)
+    for row_start in range(0, height, n_rows):
+        row_end = min(row_start + n_rows, height)
+        # retrieve positions of the rows
+        ys = np.arange(row_start, row_end, dtype=float)
+        grid_x, grid_y = np.meshgrid(xs, ys)
+        positions = np.column_stack([grid_x.ravel(), grid_y.ravel()])
+        # accumulate over the chunks of vents
+        currents = np.zeros(shape=positions.shape)
+        for vent_start in range(0, n_vents, n_chunk_vents):
+            vent_end = vent_start + n_chunk_vents
+            currents += calc_current_block(
+                positions=positions,
+                vent_positions=vent_positions[vent_start:vent_end],
+                vent_radii=vent_radii[vent_start:vent_end],
+            )
+        # save the currents
+        currentx_map[row_start:row_end] = currents[:, 0].reshape(-1, width)
+        currenty_map[row_start:row_end] = currents[:, 1].reshape(-1, width)
+    return (currentx_map, currenty_map)
+
+
+# tile the vents across the periodic images of a round world
+def gen_periodic_images(
+    vent_positions: np.array,
+    vent_radii: np.array,
+    n_shells: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+) -> Tuple[np.array, np.array]:
+    """
+    copies every vent into the surrounding tiles of a round world so that
+    the currents wrap around the edges, shell k covers the ring of tiles
+    k windows away giving (2 * n_shells + 1) ** 2 images per vent
+
+    @param vent_positions = (n_vents x 2) array of the vent x, y coordinates
+    @param vent_radii = (n_vents) array of the vent radii
+    @param n_shells = number of rings of tiles to add defaults to constants
+    @param width = width of the world defaults to the window width
+    @param height = height of the world defaults to the window height
+    @returns image_positions = (n_images * n_vents x 2) array of the coordinates
+    @returns image_radii = (n_images * n_vents) array of the radii
+    """
+    # configure parameters
+    n_shells = constants.CURRENT_IMAGE_SHELLS if n_shells is None else n_shells
+    width = constants.WINDOW_WIDTH if width is None else width
+    height = constants.WINDOW_HEIGHT if height is None else height
+    # compute the offsets of every tile
+    multipliers = np.arange(-n_shells, n_shells + 1)
+    multipliersx, multipliersy = np.meshgrid(multipliers, multipliers)
+    offsets = np.column_stack(
+        [multipliersx.ravel() * width, multipliersy.ravel() * height]
+    )
+    # shift the vents into each tile
+    image_positions = (offsets[:, None, :] + vent_positions[None, :, :]).reshape(-1, 2)
+    image_radii = np.tile(vent_radii, len(offsets))
+    return (image_positions, image_radii)
+
+
+# find a size the fft handles quickly
+def _next_fast_len(size: int) -> int:
+    """
+    finds the smallest number >= size whose only prime factors are 2, 3 and 5
+
+    @param size = minimum length of the transform
+    @returns fast_size = length of the transform to use
+    """
+    fast_size = size
+    while True:
+        remainder = fast_size
+        for factor in (2, 3, 5):
+            while remainder % factor == 0:
+                remainder //= factor
+        if remainder == 1:
+            return fast_size
+        fast_size += 1
+
+
+# rasterize the vents onto a grid
+def rasterize_vents(
+    vent_positions: np.array, vent_radii: np.array, width: int, height: int
+) -> np.array:
+    """
+    spreads each vent's radius over its four surrounding pixels with bilinear
+    weights so vents between pixels keep their center of strength
+
+    @param vent_positions = (n_vents x 2) array of the vent x, y coordinates
+    @param vent_radii = (n_vents) array of the vent radii
+    @param width = width of the raster
+    @param height = height of the raster
+    @returns strength_map = (height x width) raster of vent strength
+    """
+    strength_map = np.zeros(shape=(height, width))
+    # split the positions into pixel and fractional parts
+    floors = np.floor(vent_positions)
+    fractions = vent_positions - floors
+    floors = floors.astype(int)
+    # add each of the four corners
+    for shiftx in (0, 1):
+        for shifty in (0, 1):
+            weightsx = fractions[:, 0] if shiftx else 1 - fractions[:, 0]
+            weightsy = fractions[:, 1] if shifty else 1 - fractions[:, 1]
+            idxs = floors[:, 0] + shiftx
+            idys = floors[:, 1] + shifty
+            weights = vent_radii * weightsx * weightsy
+            # weights leaving the raster are dropped
+            inside = (idxs >= 0) & (idxs < width) & (idys >= 0) & (idys < height)
+            idxs, idys, weights = idxs[inside], idys[inside], weights[inside]
+            np.add.at(strength_map, (idys, idxs), weights)
+    return strength_map
+
+
+# calculate the current kernel for a grid of offsets
+def calc_current_kernel(offsetsx: np.array, offsetsy: np.array) -> np.array:
+    """
+    computes the current felt at an offset from a vent of unit radius
+    matching calc_current_block for a single vent
+
+    @param offsetsx = x offsets of the pixels from the vent
+    @param offsetsy = y offsets of the pixels from the vent
+    @returns kernelx = x current at each offset
+    @returns kernely = y current at each offset
+    """
+    distances = np.hypot(offsetsx, offsetsy)
+    # a vent sitting on the pixel has theta = 0 and pushes along -x
+    on_vent = distances == 0
+    scaling_factors = constants.CURRENT_SCALER / (
+        np.where(on_vent, 1, distances) * (distances + 1)
+    )
+    kernelx = np.where(on_vent, -constants.CURRENT_SCALER, scaling_factors * offsetsx)
+    kernely = np.where(on_vent, 0, scaling_factors * offsetsy)
+    return (kernelx, kernely)
+
+
+# calculate the current maps via fft convolution
+def calc_current_maps_fft(
+    vent_positions: np.array,
+    vent_radii: np.array,
+    world_shape: Optional[str] = None,
+    n_shells: Optional[int] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+) -> Tuple[np.array, np.array]:
+    """
+    computes the single digit resolution map of the currents as the convolution
+    of a raster of vent strength with the current of a single vent, the cost
+    only depends on the size of the window and not the number of vents
+    the raster is zero padded and round worlds sum the kernel over the same
+    periodic images as gen_periodic_images, vents off the pixel grid are
+    spread bilinearly so those currents are approximate near the vent
+
+    @param vent_positions = (n_vents x 2) array of the vent x, y coordinates
+    @param vent_radii = (n_vents) array of the vent radii
+    @param world_shape = "flat" or "round" defaults to constants
+    @param n_shells = rings of periodic images of a round world defaults to constants
+    @param width = width of the maps defaults to the window width
+    @param height = height of the maps defaults to the window height
+    @returns currentx_map = currents indexed by [y, x] for axis x
+    @returns currenty_map = currents indexed by [y, x] for axis y
+    """
+    # configure parameters
+    world_shape = constants.WORLD_SHAPE if world_shape is None else world_shape
+    n_shells = constants.CURRENT_IMAGE_SHELLS if n_shells is None else n_shells
+    width = constants.WINDOW_WIDTH if width is None else width
+    height = constants.WINDOW_HEIGHT if height is None else height
+    if world_shape not in ("flat", "round"):
+        raise ValueError(f"world_shape={world_shape} is erroneous")
+    # offsets span every pixel to vent pairing, the extra raster pixel
+    # catches the bilinear weight of vents on the last row or column
+    offsetsx, offsetsy = np.meshgrid(
+        np.arange(-width, width + 1), np.arange(-height, height + 1)
+    )
+    kernelx, kernely = calc_current_kernel(offsetsx, offsetsy)
+    # a round world adds the images of the vent in the surrounding tiles
+    if world_shape == "round":
+        for shiftx in range(-n_shells, n_shells + 1):
+            for shifty in range(-n_shells, n_shells + 1):
+                if shiftx == 0 and shifty == 0:
+                    continue
+                image_kernelx, image_kernely = calc_current_kernel(
+                    offsetsx - shiftx * width, offsetsy - shifty * height
+                )
+                kernelx += image_kernelx
+                kernely += image_kernely
+    strength_map = rasterize_vents(
+        vent_positions=vent_positions,
+        vent_radii=vent_radii,
+        width=width + 1,
+        height=height + 1,
+    )
+    fft_shape = (_next_fast_len(3 * height + 1), _next_fast_len(3 * width + 1))
+    # convolve the kernels with the strength of the vents
+    strength_fft = np.fft.rfft2(strength_map, s=fft_shape)
+    currentx_map = np.fft.irfft2(
+        strength_fft * np.fft.rfft2(kernelx, s=fft_shape), s=fft_shape
+    )
+    currenty_map = np.fft.irfft2(
+        strength_fft * np.fft.rfft2(kernely, s=fft_shape), s=fft_shape
+    )
+    # subset to reality, the output is shifted by the negative offsets
+    currentx_map = currentx_map[height : 2 * height, width : 2 * width]
+    currenty_map = currenty_map[height : 2 * height, width : 2 * width]
+    return (currentx_map, currenty_map)
+
+
+# calculate the current maps for the configured world
+def calc_world_maps(
+    vent_positions: np.array,
+    vent_radii: np.array,
+    world_shape: Optional[str] = None,
+    backend: Optional[str] = None,
+) -> Tuple[np.array, np.array]:
+    """
+    computes the current maps of the given vents with the world shape and
+    backend used by engine.create_current_field
+
+    @param vent_positions = (n_vents x 2) array of the vent x, y coordinates
+    @param vent_radii = (n_vents) array of the vent radii
+    @param world_shape = "flat" or "round" defaults to constants
+    @param backend = "direct" or "fft" defaults to constants
+    @returns currentx_map = currents indexed by [y, x] for axis x
+    @returns currenty_map = currents indexed by [y, x] for axis y
+    """
+    # configure parameters
+    world_shape = constants.WORLD_SHAPE if world_shape is None else world_shape
+    backend = constants.CURRENT_BACKEND if backend is None else backend
+    # convolution handles both world types
+    if backend == "fft":
+        return calc_current_maps_fft(
+            vent_positions=vent_positions,
+            vent_radii=vent_radii,
+            world_shape=world_shape,
+        )
+    elif backend != "direct":
+        raise ValueError(f"backend={backend} is erroneous")
+    # repeat the vents across the periodic images of a round world
+    if world_shape == "round":
+        vent_positions, vent_radii = gen_periodic_images(
+            vent_positions=vent_positions, vent_radii=vent_radii
+        )
+    elif world_shape != "flat":
+        raise ValueError(f"world_shape={world_shape} is erroneous")
+    return calc_current_maps(vent_positions=vent_positions, vent_radii=vent_radii)
+
+
+# define the current field class
+class CurrentField:
+    def __init__(
+        self,
+        currentx_map: np.array,
+        currenty_map: np.array,
+        world_shape: Optional[str] = None,
+        backend: Optional[str] = None,
+    ):
+        """
+        @param currentx_map = currents with single number resolution for x axis
+        @param currenty_map = currents with single number resolution for y axis
+        @param world_shape = "flat" or "round" defaults to constants
+        @param backend = "direct" or "fft" defaults to constants
+        """
+        # maps, copied since cached maps are read only
+        self.currentx_map = np.array(currentx_map, dtype=float)
+        self.currenty_map = np.array(currenty_map, dtype=float)
+        # world
+        self.world_shape = constants.WORLD_SHAPE if world_shape is None else world_shape
+        self.backend = constants.CURRENT_BACKEND if backend is None else backend
+
+    # calculation functions
+    def calc_vent_maps(self, position: np.array, radius: float) -> Tuple[np.array]:
+        """
+        computes the currents of a single vent, the field is a linear sum
+        of the vents so this is all that changes when a vent changes
+
+        @param position = center of the vent
+        @param radius = radius of the vent
+        @returns currentx_map, currenty_map = currents of this vent alone
+        """
+        return calc_world_maps(
+            vent_positions=np.array([position], dtype=float),
+            vent_radii=np.array([radius], dtype=float),
+            world_shape=self.world_shape,
+            backend=self.backend,
+        )
+
+    # update functions
+    def add_vent(self, vent_object, weight: float = 1.0):
+        """
+        adds a vent's currents to the maps in place
+
+        @param vent_object = vent to add
+        @param weight = multiplier on the vent's currents, negative removes it
+        """
+        currentx_map, currenty_map = self.calc_vent_maps(
+            position=vent_object.get_position(), radius=vent_object.get_radius()
+        )
+        self.currentx_map += weight * currentx_map
+        self.currenty_map += weight * currenty_map
+
+    def remove_vent(self, vent_object):
+        """
+        removes a vent's currents from the maps in place
+
+        @param vent_object = vent to remove
+        """
+        self.add_vent(vent_object=vent_object, weight=-1.0)
+
+    def move_vent(self, vent_object, position: np.array):
+        """
+        moves a vent to a new position and updates the maps in place
+
+        @param vent_object = vent to move
+        @param position = new center of the vent
+        """
+        self.remove_vent(vent_object=vent_object)
+        vent_object.position = np.array(position, dtype=float)
+        self.add_vent(vent_object=vent_object)
+
+    def resize_vent(self, vent_object, radius: float):
+        """
+        changes a vent's radius, e.g. as it decays, and updates the maps in place
+        the currents scale linearly with the radius so only the change is added
+
+        @param vent_object = vent to resize
+        @param radius = new radius of the vent
+        """
+        old_radius = vent_object.get_radius()
+        currentx_map, currenty_map = self.calc_vent_maps(
+            position=vent_object.get_position(), radius=radius - old_radius
+        )
+        self.currentx_map += currentx_map
+        self.currenty_map += currenty_map
+        vent_object.radius = radius
+
+    # get functions
+    def get_maps(self) -> Tuple[np.array, np.array]:
+        """
+        get function for the current maps
+
+        @returns currentx_map, currenty_map = currents for axes x and y
+        """
+        return (self.currentx_map, self.currenty_map)
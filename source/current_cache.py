@@ -0,0 +1,189 @@
+import os
+import hashlib
+import logging
+import numpy as np
+import source.constants as constants
+import source.utils as utils
+from typing import Callable, Optional, Tuple
+
+"""
+this file keeps computed current maps on disk so that runs sharing a vent
+layout can skip the current calculations, each entry is a pair of .npy files
+named by a hash of everything that determines the maps and the least recently
+used entries are evicted once the cache grows past its size cap
+"""
+
+# version of the computed maps, bumped when the same settings give new maps
+CACHE_VERSION = 2
+
+
+# find the directory the cache lives in
+def get_cache_dir(dirname: Optional[str] = None) -> str:
+    """
+    constructs the cache directory next to the source directory
+    creating it if it does not exist
+
+    @param dirname = name of the cache directory defaults to constants
+    @returns dirname = full path of the cache directory
+    """
+    # configure parameters
+    dirname = constants.CURRENT_CACHE_DIRNAME if dirname is None else dirname
+    # replace current directory with ideal
+    file_dir = os.path.dirname(os.path.abspath(__file__))
+    dirname = os.path.join(os.path.dirname(file_dir), dirname)
+    # create the directory if not yet done
+    _ = utils.create_dir_if_none(dirname=dirname, overwrite=False)
+    return dirname
+
+
+# hash the vent configuration
+def hash_vent_config(vent_positions: np.array, vent_radii: np.array) -> str:
+    """
+    hashes the vents together with every setting that changes the current maps
+
+    @param vent_positions = (n_vents x 2) array of the vent x, y coordinates
+    @param vent_radii = (n_vents) array of the vent radii
+    @returns key = hex digest identifying the current maps
+    """
+    hasher = hashlib.sha256()
+    # add the vents
+    hasher.update(np.ascontiguousarray(vent_positions, dtype=float).tobytes())
+    hasher.update(np.ascontiguousarray(vent_radii, dtype=float).tobytes())
+    # add the world settings
+    settings = (
+        CACHE_VERSION,
+        constants.WORLD_SHAPE,
+        constants.WINDOW_WIDTH,
+        constants.WINDOW_HEIGHT,
+        constants.CURRENT_SCALER,
+        constants.CURRENT_BACKEND,
+        constants.CURRENT_IMAGE_SHELLS,
+    )
+    hasher.update(repr(settings).encode())
+    return hasher.hexdigest()
+
+
+# retrieve the filenames of an entry
+def get_entry_filenames(key: str, dirname: str) -> Tuple[str, str]:
+    """
+    @param key = hex digest identifying the current maps
+    @param dirname = full path of the cache directory
+    @returns filenamex = file holding the x axis currents
+    @returns filenamey = file holding the y axis currents
+    """
+    filenamex = os.path.join(dirname, f"{key}_x.npy")
+    filenamey = os.path.join(dirname, f"{key}_y.npy")
+    return (filenamex, filenamey)
+
+
+# load current maps from the cache
+def load_currents(key: str, dirname: str) -> Optional[Tuple[np.array, np.array]]:
+    """
+    loads the current maps memory mapped read only and marks them as used
+
+    @param key = hex digest identifying the current maps
+    @param dirname = full path of the cache directory
+    @returns currentx_map, currenty_map = currents or None if not cached
+    """
+    filenames = get_entry_filenames(key=key, dirname=dirname)
+    try:
+        current_maps = tuple(np.load(fn, mmap_mode="r") for fn in filenames)
+    except (OSError, ValueError):
+        return None
+    # mark the entry as recently used
+    for filename in filenames:
+        os.utime(filename)
+    return current_maps
+
+
+# save current maps to the cache
+def save_currents(
+    key: str,
+    currentx_map: np.array,
+    currenty_map: np.array,
+    dirname: str,
+    max_bytes: Optional[int] = None,
+):
+    """
+    saves the current maps then evicts old entries past the size cap
+
+    @param key = hex digest identifying the current maps
+    @param currentx_map = currents with single number resolution for x axis
+    @param currenty_map = currents with single number resolution for y axis
+    @param dirname = full path of the cache directory
+    @param max_bytes = size cap of the cache defaults to constants
+    """
+    filenames = get_entry_filenames(key=key, dirname=dirname)
+    for filename, current_map in zip(filenames, (currentx_map, currenty_map)):
+        # write to a temporary file first so readers never see half a map
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "wb") as f:
+            np.save(f, current_map)
+        os.replace(tmp_filename, filename)
+    evict_currents(dirname=dirname, max_bytes=max_bytes)
+
+
+# evict the least recently used entries
+def evict_currents(dirname: str, max_bytes: Optional[int] = None):
+    """
+    removes the least recently used entries until the cache fits its size cap
+
+    @param dirname = full path of the cache directory
+    @param max_bytes = size cap of the cache defaults to constants
+    """
+    # configure parameters
+    max_bytes = constants.CURRENT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    # gather the size and last use of each entry
+    entries = {}
+    for filename in os.listdir(dirname):
+        if not filename.endswith(".npy"):
+            continue
+        key = filename.rsplit("_", 1)[0]
+        stat = os.stat(os.path.join(dirname, filename))
+        size, last_used = entries.get(key, (0, 0))
+        entries[key] = (size + stat.st_size, max(last_used, stat.st_mtime))
+    # remove the oldest entries first
+    total_bytes = sum(size for size, _ in entries.values())
+    for key, (size, _) in sorted(entries.items(), key=lambda item: item[1][1]):
+        if total_bytes <= max_bytes:
+            break
+        logging.info(f"evicting current cache entry {key}")
+        for filename in get_entry_filenames(key=key, dirname=dirname):
+            if os.path.exists(filename):
+                os.remove(filename)
+        total_bytes -= size
+
+
+# retrieve current maps from the cache or compute them
+def calc_currents_cached(
+    vent_positions: np.array,
+    vent_radii: np.array,
+    calc_currents: Callable[[], Tuple[np.array, np.array]],
+) -> Tuple[np.array, np.array]:
+    """
+    retrieves the current maps for the vents from the on disk cache
+    computing and caching them if this vent layout has not been seen
+
+    @param vent_positions = (n_vents x 2) array of the vent x, y coordinates
+    @param vent_radii = (n_vents) array of the vent radii
+    @param calc_currents = function computing the maps on a cache miss
+    @returns currentx_map = currents with single number resolution for x axis
+    @returns currenty_map = currents with single number resolution for y axis
+    """
+    # skip the cache if it is turned off
+    if not constants.CURRENT_CACHE_ENABLED:
+        return calc_currents()
+    # hash the vent layout
+    key = hash_vent_config(vent_positions=vent_positions, vent_radii=vent_radii)
+    dirname = get_cache_dir()
+    # return the cached maps if they exist
+    current_maps = load_currents(key=key, dirname=dirname)
+    if current_maps is not None:
+        logging.info(f"loaded currents from cache entry {key}")
+        return current_maps
+    # otherwise compute and save them
+    currentx_map, currenty_map = calc_currents()
+    save_currents(
+        key=key, currentx_map=currentx_map, currenty_map=currenty_map, dirname=dirname
+    )
+    return (currentx_map, currenty_map)
@@ -0,0 +1,474 @@
+import logging
+import numpy as np
+import source.constants as constants
+import source.utils as utils
+import source.cell as cell
+import source.vent as vent
+import source.food as food
+import source.current as current
+import source.current_cache as current_cache
+import source.population as population
+import source.scoring as scoring
+from typing import Callable, Dict, List, Optional
+
+"""
+this file runs the simulation without any graphical interface, the state of
+the world lives in a SimulationState and an Engine advances it one round at a
+time, anything that wants to watch the simulation (the tkinter canvas,
+snapshots) registers as an Observer and is notified after every round
+"""
+
+
+# raised by observers to end the simulation
+class StopSimulation(Exception):
+    pass
+
+
+# define the simulation state class
+class SimulationState:
+    def __init__(
+        self,
+        ideal_seqs: Dict[str, str],
+        cells: population.CellPopulation,
+        vent_objects: Dict,
+        foods: food.FoodField,
+        current_field: current.CurrentField,
+        round_num: int = 0,
+    ):
+        """
+        @param ideal_seqs = the idealized sequence to compare the cells with
+        @param cells = population of living cells
+        @param vent_objects = map of vent memory id to their objects
+        @param foods = field of every food
+        @param current_field = currents the food follows
+        @param round_num = number of rounds simulated so far
+        """
+        # clock
+        self.round_num = round_num
+        # seconds spent in the steps of the last round that report them
+        self.timings = {}
+        # environment
+        self.ideal_seqs = ideal_seqs
+        self.current_field = current_field
+        # objects
+        self.cells = cells
+        self.vent_objects = vent_objects
+        self.foods = foods
+
+    @property
+    def cell_objects(self) -> Dict[int, population.CellView]:
+        """
+        map of cell id to views of the living cells for observers
+        """
+        return self.cells.get_views()
+
+    @property
+    def food_objects(self) -> Dict[int, food.FoodView]:
+        """
+        map of food id to views of the foods for observers
+        """
+        return self.foods.get_views()
+
+    # get functions
+    def get_round_num(self) -> int:
+        """
+        get function for the round number
+
+        @returns number of rounds simulated so far
+        """
+        return self.round_num
+
+    def get_n_cells(self) -> int:
+        """
+        get function for the number of cells
+
+        @returns number of living cells
+        """
+        return len(self.cells)
+
+
+# define the observer class
+class Observer:
+    """
+    base class for anything watching the simulation, each hook receives the
+    state and may raise StopSimulation to end the run
+    """
+
+    def on_start(self, state: SimulationState):
+        pass
+
+    def on_round(self, state: SimulationState):
+        pass
+
+    def on_stop(self, state: SimulationState):
+        pass
+
+
+# create ideal sequences
+def create_ideal_seqs() -> Dict[str, str]:
+    """
+    instantiates ideal sequences based on gene sizes defined in constants
+
+    @returns ideal_seqs = idealized sequences that are randomly generated
+    """
+    # debugging message
+    logging.info("creating ideal sequences")
+    ideal_seqs = {
+        "digest": utils.gen_genome(size=constants.DIGEST_SIZE),
+        "move": utils.gen_genome(size=constants.MOVE_SIZE),
+        "mutate": utils.gen_genome(size=constants.MUTATE_SIZE),
+    }
+    return ideal_seqs
+
+
+# define the shifting environment observer
+class IdealSeqsShifter(Observer):
+    def __init__(
+        self,
+        every_n_rounds: int,
+        create_ideal_seqs: Callable[[], Dict[str, str]] = create_ideal_seqs,
+        n_workers: Optional[int] = None,
+    ):
+        """
+        replaces the ideal sequences every few rounds to shift the environment
+
+        @param every_n_rounds = rounds between changes of the ideal sequences
+        @param create_ideal_seqs = function creating the new ideal sequences
+        @param n_workers = number of threads to rescore with, serial if None
+        """
+        self.every_n_rounds = every_n_rounds
+        self.create_ideal_seqs = create_ideal_seqs
+        self.n_workers = n_workers
+        # timings of every change
+        self.timings = []
+
+    def on_round(self, state: SimulationState):
+        if state.get_round_num() % self.every_n_rounds == 0:
+            timings = set_ideal_seqs(
+                state=state,
+                ideal_seqs=self.create_ideal_seqs(),
+                n_workers=self.n_workers,
+            )
+            self.timings.append(timings)
+
+
+# create vents
+def create_vents(n_vents: int) -> Dict:
+    """
+    creates vents for the environment and simulation
+
+    @param n_vents = number of vents to start with
+    @returns vent_objects = map of vent memory id to their objects
+    """
+    # debugging message
+    logging.info("creating vents")
+    # save the vents using their memory id
+    vent_objects = {}
+    for _ in range(n_vents):
+        vent_object = vent.Vent(prod_rate=constants.VENT_PROD_RATE)
+        vent_objects[id(vent_object)] = vent_object
+    return vent_objects
+
+
+# create cells
+def create_cells(n_cells: int, ideal_seqs: Dict[str, str]) -> population.CellPopulation:
+    """
+    creates cells for the environment and simulation
+
+    @param n_cells = number of cells to start with
+    @param ideal_seqs = the idealized sequence to compare the cells with
+    @returns cells = population of the new cells
+    """
+    # debugging message
+    logging.info("creating cells")
+    # store the cells as columns
+    cells = population.CellPopulation(traits=constants.CELL_TRAITS, capacity=n_cells)
+    cells.add_cells(
+        cell.Cell(traits=constants.CELL_TRAITS, ideal_seqs=ideal_seqs)
+        for _ in range(n_cells)
+    )
+    return cells
+
+
+# create the currents
+def create_current_field(vent_objects: Dict) -> current.CurrentField:
+    """
+    computes the currents of the vents reusing cached maps where possible
+
+    @param vent_objects = map of vent memory id to their objects
+    @returns current_field = currents the food follows
+    """
+    # debugging message
+    logging.info("calculating currents")
+    # compute or load the maps
+    vent_positions, vent_radii = current.get_vent_arrays(vent_objects=vent_objects)
+    current_maps = current_cache.calc_currents_cached(
+        vent_positions=vent_positions,
+        vent_radii=vent_radii,
+        calc_currents=lambda: current.calc_world_maps(
+            vent_positions=vent_positions, vent_radii=vent_radii
+        ),
+    )
+    return current.CurrentField(*current_maps)
+
+
+# create the state
+def create_state(
+    n_cells: int, n_vents: int, ideal_seqs: Dict[str, str]
+) -> SimulationState:
+    """
+    creates the vents, cells and currents of a new simulation
+
+    @param n_cells = number of cells to start with
+    @param n_vents = number of vents to start with
+    @param ideal_seqs = the idealized sequence to compare the cells with
+    @returns state = state of the simulation before the first round
+    """
+    # debugging message
+    logging.info("creating simulation state")
+    vent_objects = create_vents(n_vents=n_vents)
+    cells = create_cells(n_cells=n_cells, ideal_seqs=ideal_seqs)
+    current_field = create_current_field(vent_objects=vent_objects)
+    return SimulationState(
+        ideal_seqs=ideal_seqs,
+        cells=cells,
+        vent_objects=vent_objects,
+        foods=food.FoodField(),
+        current_field=current_field,
+    )
+
+
+# change the ideal sequences
+def set_ideal_seqs(
+    state: SimulationState, ideal_seqs: Dict[str, str], n_workers: Optional[int] = None
+) -> Dict[str, float]:
+    """
+    swaps in new ideal sequences and rescores the whole population against
+    them in one batched pass
+
+    @param state = state of the simulation
+    @param ideal_seqs = the new idealized sequences to compare the cells with
+    @param n_workers = number of threads to rescore with, serial if None
+    @returns timings = seconds spent encoding, scoring and in total
+    """
+    # debugging message
+    logging.info("changing ideal sequences")
+    state.ideal_seqs = ideal_seqs
+    # scores cached against the old sequences are no longer useful
+    scoring.clear_score_caches()
+    timings = state.cells.rescore(ideal_seqs=ideal_seqs, n_workers=n_workers)
+    logging.info(
+        f"rescored {timings['n_cells']} cells in {timings['total'] * 1000:.1f}ms"
+    )
+    return timings
+
+
+def process_vents(state: SimulationState):
+    """
+    adds the new foods from every vent to the food field in one batch
+
+    @param state = state of the simulation
+    """
+    # debugging message
+    logging.info("updating vents with new foods")
+    # gather the vents
+    vent_positions, vent_radii = current.get_vent_arrays(
+        vent_objects=state.vent_objects
+    )
+    prod_rates = np.array(
+        [vent_object.get_prod_rate() for vent_object in state.vent_objects.values()],
+        dtype=int,
+    )
+    # create and add all of the foods
+    positions, radii, sources = vent.create_food_batch(
+        vent_positions=vent_positions, vent_radii=vent_radii, prod_rates=prod_rates
+    )
+    state.foods.add(positions=positions, radii=radii, sources=sources)
+
+
+def diffuse_foods(state: SimulationState):
+    """
+    moves all of the foods along the currents in one batch
+
+    @param state = state of the simulation
+    """
+    # debugging message
+    logging.info("diffusing foods")
+    currentx_map, currenty_map = state.current_field.get_maps()
+    state.foods.advect(currentx_map=currentx_map, currenty_map=currenty_map)
+
+
+def age_foods(state: SimulationState):
+    """
+    ages all of the foods removing those past their lifetime
+
+    @param state = state of the simulation
+    """
+    # debugging message
+    logging.info("aging foods")
+    n_expired = state.foods.expire()
+    logging.info(f"{n_expired} foods expired")
+
+
+def move_cells(state: SimulationState):
+    """
+    moves all of the cells in one batch
+
+    @param state = state of the simulation
+    """
+    # debugging message
+    logging.info("moving cells")
+    state.cells.move()
+
+
+def crowd_cells(state: SimulationState):
+    """
+    pushes overlapping cells apart in one batch
+
+    @param state = state of the simulation
+    """
+    # debugging message
+    logging.info("crowding cells")
+    state.cells.crowd()
+
+
+def feed_cells(state: SimulationState):
+    """
+    feeds the cells the foods they touch removing the eaten foods
+
+    @param state = state of the simulation
+    """
+    # debugging message
+    logging.info("feeding cells")
+    rows = state.foods.get_rows()
+    eaten_idxs = state.cells.eat(
+        food_positions=state.foods.positions[rows],
+        food_radii=state.foods.radii[rows],
+    )
+    state.foods.remove_rows(rows=rows[eaten_idxs])
+    logging.info(f"{len(eaten_idxs)} foods eaten")
+
+
+def reproduce_cells(state: SimulationState):
+    """
+    divides the cells with enough energy in one batch
+
+    @param state = state of the simulation
+    """
+    # debugging message
+    logging.info("reproducing cells")
+    daughter_ids, timings = state.cells.reproduce(ideal_seqs=state.ideal_seqs)
+    state.timings["reproduce"] = timings
+    logging.info(
+        f"{len(daughter_ids)} cells divided in {timings['total'] * 1000:.1f}ms"
+    )
+
+
+def reap_cells(state: SimulationState):
+    """
+    checks the health of all the cells and kills them if their energy is negative
+
+    @param state = state of the simulation
+    """
+    # debugging message
+    logging.info("checking health of all cells and reaping where necessary")
+    state.cells.reap()
+
+
+# define the engine class
+class Engine:
+    def __init__(
+        self, state: SimulationState, observers: Optional[List[Observer]] = None
+    ):
+        """
+        @param state = state of the simulation to advance
+        @param observers = anything watching the simulation
+        """
+        self.state = state
+        self.observers = [] if observers is None else observers
+        self.is_started = False
+
+    def add_observer(self, observer: Observer):
+        """
+        registers an observer to be notified of every round
+
+        @param observer = observer to notify
+        """
+        self.observers.append(observer)
+
+    def set_ideal_seqs(
+        self, ideal_seqs: Dict[str, str], n_workers: Optional[int] = None
+    ) -> Dict[str, float]:
+        """
+        swaps in new ideal sequences and rescores the whole population
+
+        @param ideal_seqs = the new idealized sequences to compare the cells with
+        @param n_workers = number of threads to rescore with, serial if None
+        @returns timings = seconds spent encoding, scoring and in total
+        """
+        return set_ideal_seqs(
+            state=self.state, ideal_seqs=ideal_seqs, n_workers=n_workers
+        )
+
+    def start(self):
+        """
+        notifies the observers of the initial state, only happens once
+        """
+        if not self.is_started:
+            self.is_started = True
+            for observer in self.observers:
+                observer.on_start(self.state)
+
+    def step(self):
+        """
+        simulates a single round and notifies the observers
+        """
+        self.start()
+        # debugging message
+        logging.info("beginning next round")
+        # loop through the vents
+        process_vents(state=self.state)
+        # process food diffusion
+        diffuse_foods(state=self.state)
+        # remove the foods that are too old
+        age_foods(state=self.state)
+        # move the cells
+        move_cells(state=self.state)
+        # push apart the cells that overlap
+        crowd_cells(state=self.state)
+        # feed the cells
+        feed_cells(state=self.state)
+        # divide the cells with enough energy
+        reproduce_cells(state=self.state)
+        # kill the cells if needed
+        reap_cells(state=self.state)
+        # advance the clock
+        self.state.round_num += 1
+        for observer in self.observers:
+            observer.on_round(self.state)
+
+    def stop(self):
+        """
+        notifies the observers that the simulation is over
+        """
+        for observer in self.observers:
+            observer.on_stop(self.state)
+
+    def run(self, n_rounds: Optional[int] = None) -> SimulationState:
+        """
+        simulates rounds until n_rounds have passed or an observer stops it
+
+        @param n_rounds = number of rounds to simulate, forever if None
+        @returns state = state of the simulation afterwards
+        """
+        try:
+            self.start()
+            round_num = 0
+            while n_rounds is None or round_num < n_rounds:
+                self.step()
+                round_num += 1
+        except StopSimulation:
+            logging.info("simulation stopped by an observer")
+        finally:
+            self.stop()
+        return self.state
@@ -1,8 +1,42 @@
-from typing import List
+from typing import Dict, List, Optional
 import source.constants as constants
 import source.utils as utils
 import numpy as np
 
+# value of a limit that turns it off even when constants set one
+NO_LIMIT = -1
+
+
+# resolve a limit given to the food field
+def get_limit(limit: Optional[int], default: Optional[int]) -> Optional[int]:
+    """
+    @param limit = limit given by the caller, None for the default
+    @param default = limit set in constants
+    @returns limit = the limit to apply, None if there is none
+    """
+    if limit is None:
+        return default
+    return None if limit == NO_LIMIT else limit
+
+
+# rank items within their groups
+def calc_group_ranks(groups: np.array, orders: np.array) -> np.array:
+    """
+    ranks every item among the items of its group in a single sort
+
+    @param groups = (n) non negative group of each item
+    @param orders = (n) values ordering the items within a group
+    @returns ranks = (n) position of each item in its group, 0 for the smallest
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    sorted_rows = np.lexsort((orders, groups))
+    counts = np.bincount(groups)
+    starts = np.cumsum(counts) - counts
+    ranks = np.empty(shape=len(groups), dtype=np.int64)
+    ranks[sorted_rows] = np.arange(len(groups)) - starts[groups[sorted_rows]]
+    return ranks
+
+
 # define the food class
 class Food:
     def __init__(self, position: np.array = constants.INITIAL_POSITION):
@@ -66,3 +100,329 @@ class Food:
         @returns the color of the food
         """
         return self.color
+
+
+# define the food field class
+class FoodField:
+    def __init__(
+        self,
+        capacity: int = 1024,
+        lifetime: Optional[int] = None,
+        max_foods: Optional[int] = None,
+        max_foods_per_source: Optional[int] = None,
+    ):
+        """
+        stores every food in slots of preallocated numpy arrays, slots of
+        expired or evicted foods are recycled for new foods and once a cap is
+        reached the oldest foods are evicted like a ring buffer
+
+        @param capacity = number of slots to allocate up front
+        @param lifetime = rounds a food lasts defaults to constants
+        @param max_foods = cap on the number of foods defaults to constants
+        @param max_foods_per_source = cap on the foods of each vent defaults to constants
+        a limit of None in constants or NO_LIMIT given here means foods are
+        never removed for that reason
+        """
+        # limits
+        self.lifetime = get_limit(limit=lifetime, default=constants.FOOD_LIFETIME)
+        self.max_foods = get_limit(limit=max_foods, default=constants.FOOD_MAX)
+        self.max_foods_per_source = get_limit(
+            limit=max_foods_per_source, default=constants.FOOD_MAX_PER_VENT
+        )
+        # number of foods
+        self.n_foods = 0
+        self.n_slots = 0
+        self.next_id = 0
+        self.id2row = {}
+        self.free_rows = []
+        # columns
+        self.ids = np.zeros(shape=capacity, dtype=np.int64)
+        self.positions = np.zeros(shape=(capacity, 2))
+        self.radii = np.zeros(shape=capacity)
+        self.ages = np.zeros(shape=capacity, dtype=np.int64)
+        self.sources = np.zeros(shape=capacity, dtype=np.int64)
+        self.alive = np.zeros(shape=capacity, dtype=bool)
+        # color
+        self.color = constants.FOOD_COLOR
+
+    # storage functions
+    def reserve(self, capacity: int):
+        """
+        grows the columns so they can hold at least capacity slots
+
+        @param capacity = number of slots the columns must fit
+        """
+        old_capacity = len(self.ids)
+        if capacity <= old_capacity:
+            return
+        new_capacity = max(capacity, 2 * old_capacity)
+        for name in ("ids", "positions", "radii", "ages", "sources", "alive"):
+            column = getattr(self, name)
+            new_column = np.zeros(
+                shape=(new_capacity,) + column.shape[1:], dtype=column.dtype
+            )
+            new_column[: self.n_slots] = column[: self.n_slots]
+            setattr(self, name, new_column)
+
+    def take_rows(self, n_rows: int) -> np.array:
+        """
+        hands out slots for new foods, recycled slots first
+
+        @param n_rows = number of slots needed
+        @returns rows = slots to fill
+        """
+        # reuse the freed slots
+        n_recycled = min(n_rows, len(self.free_rows))
+        recycled_rows = self.free_rows[len(self.free_rows) - n_recycled :]
+        del self.free_rows[len(self.free_rows) - n_recycled :]
+        # then extend past the used slots
+        n_fresh = n_rows - n_recycled
+        self.reserve(capacity=self.n_slots + n_fresh)
+        fresh_rows = np.arange(self.n_slots, self.n_slots + n_fresh)
+        self.n_slots += n_fresh
+        return np.concatenate([np.array(recycled_rows, dtype=int), fresh_rows])
+
+    def remove_rows(self, rows: np.array):
+        """
+        removes the foods in the given slots freeing the slots for reuse
+
+        @param rows = slots of the foods to remove
+        """
+        rows = rows[self.alive[rows]]
+        self.alive[rows] = False
+        self.free_rows.extend(rows.tolist())
+        for food_id in self.ids[rows].tolist():
+            del self.id2row[food_id]
+        self.n_foods -= len(rows)
+
+    def evict_oldest(self, n_evict: int):
+        """
+        removes the oldest foods
+
+        @param n_evict = number of foods to remove
+        """
+        rows = self.get_rows()
+        if n_evict <= 0 or len(rows) == 0:
+            return
+        # ids are handed out in order so the smallest ids are the oldest foods
+        if n_evict < len(rows):
+            rows = rows[np.argpartition(self.ids[rows], n_evict - 1)[:n_evict]]
+        self.remove_rows(rows=rows)
+
+    def evict_oldest_per_source(self, n_evicts: np.array):
+        """
+        removes the oldest foods of every vent in one grouped pass
+
+        @param n_evicts = number of foods to remove from each vent indexed by
+        the vent + 1 so unknown vents come first
+        """
+        if not np.any(n_evicts > 0):
+            return
+        # only sort the foods of the vents past their cap
+        rows = self.get_rows()
+        keys = self.sources[rows] + 1
+        is_over = n_evicts[keys] > 0
+        rows, keys = rows[is_over], keys[is_over]
+        # ids are handed out in order so the smallest ids are the oldest foods
+        ranks = calc_group_ranks(groups=keys, orders=self.ids[rows])
+        self.remove_rows(rows=rows[ranks < n_evicts[keys]])
+
+    def add(
+        self, positions: np.array, radii: np.array, sources: Optional[np.array] = None
+    ) -> np.array:
+        """
+        adds a batch of foods evicting the oldest foods past the caps
+
+        @param positions = (n x 2) positions of the new foods
+        @param radii = (n) radii of the new foods
+        @param sources = (n) index of the vent making each food, -1 if unknown
+        @returns food_ids = ids given to the new foods that were kept
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        radii = np.asarray(radii, dtype=float)
+        sources = np.full(len(radii), -1) if sources is None else np.asarray(sources)
+        # a batch with more foods of a vent than its cap only keeps their newest
+        if self.max_foods_per_source is not None and len(radii) > 0:
+            ranks = calc_group_ranks(groups=sources + 1, orders=np.arange(len(radii)))
+            counts = np.bincount(sources + 1)
+            is_kept = ranks >= counts[sources + 1] - self.max_foods_per_source
+            positions = positions[is_kept]
+            radii = radii[is_kept]
+            sources = sources[is_kept]
+        # a batch larger than the cap only keeps its newest foods
+        if self.max_foods is not None and len(radii) > self.max_foods:
+            positions = positions[len(radii) - self.max_foods :]
+            radii = radii[len(radii) - self.max_foods :]
+            sources = sources[len(sources) - self.max_foods :]
+        n_new = len(radii)
+        # evict the oldest foods of each vent past its cap
+        if self.max_foods_per_source is not None and n_new > 0:
+            old_keys = self.sources[self.get_rows()] + 1
+            n_keys = max(old_keys.max(initial=0), sources.max() + 1) + 1
+            old_counts = np.bincount(old_keys, minlength=n_keys)
+            new_counts = np.bincount(sources + 1, minlength=n_keys)
+            # vents without new foods stay within their cap
+            n_overs = np.where(
+                new_counts > 0, old_counts + new_counts - self.max_foods_per_source, 0
+            )
+            self.evict_oldest_per_source(n_evicts=n_overs)
+        # evict the oldest foods past the overall cap
+        if self.max_foods is not None:
+            self.evict_oldest(n_evict=self.n_foods + n_new - self.max_foods)
+        # assign slots and ids
+        rows = self.take_rows(n_rows=n_new)
+        food_ids = np.arange(self.next_id, self.next_id + n_new, dtype=np.int64)
+        self.next_id += n_new
+        # fill the columns
+        self.ids[rows] = food_ids
+        self.positions[rows] = positions
+        self.radii[rows] = radii
+        self.ages[rows] = 0
+        self.sources[rows] = sources
+        self.alive[rows] = True
+        self.id2row.update(zip(food_ids.tolist(), rows.tolist()))
+        self.n_foods += n_new
+        return food_ids
+
+    def add_foods(self, food_objects: Dict, source: int = -1) -> np.array:
+        """
+        adds Food objects copying their position and radius
+
+        @param food_objects = map of food memory id to their objects
+        @param source = index of the vent making the foods
+        @returns food_ids = ids given to the new foods
+        """
+        foods = list(food_objects.values())
+        return self.add(
+            positions=np.array([food.get_position() for food in foods]).reshape(-1, 2),
+            radii=np.array([food.get_radius() for food in foods], dtype=float),
+            sources=np.full(len(foods), source),
+        )
+
+    # aging functions
+    def expire(self) -> int:
+        """
+        ages every food by a round and removes those past their lifetime
+
+        @returns n_expired = number of foods removed
+        """
+        rows = self.get_rows()
+        self.ages[rows] += 1
+        if self.lifetime is None:
+            return 0
+        expired_rows = rows[self.ages[rows] > self.lifetime]
+        self.remove_rows(rows=expired_rows)
+        return len(expired_rows)
+
+    # movement functions
+    def advect(self, currentx_map: np.array, currenty_map: np.array):
+        """
+        moves every food by the current at its nearest pixel wrapping
+        foods that leave the window around to the other side
+
+        @param currentx_map = currents to follow for axis x
+        @param currenty_map = currents to follow for axis y
+        """
+        rows = self.get_rows()
+        positions = self.positions[rows]
+        # calculate position inputs
+        idxs = np.rint(positions[:, 0]).astype(int)
+        idys = np.rint(positions[:, 1]).astype(int)
+        # retrieve the relevant deltas and move
+        positions[:, 0] += currentx_map[idys, idxs]
+        positions[:, 1] += currenty_map[idys, idxs]
+        # add canvas based adjustments
+        positions[:, 0] = utils.limit_array(
+            values=positions[:, 0], vmin=0, vmax=constants.WINDOW_WIDTH - 1
+        )
+        positions[:, 1] = utils.limit_array(
+            values=positions[:, 1], vmin=0, vmax=constants.WINDOW_HEIGHT - 1
+        )
+        self.positions[rows] = positions
+
+    # get functions
+    def get_rows(self) -> np.array:
+        """
+        @returns the slots holding foods
+        """
+        return np.flatnonzero(self.alive[: self.n_slots])
+
+    def get_ids(self) -> np.array:
+        """
+        @returns the ids of the foods
+        """
+        return self.ids[self.get_rows()]
+
+    def get_positions(self) -> np.array:
+        """
+        @returns (n_foods x 2) positions of the foods
+        """
+        return self.positions[self.get_rows()]
+
+    def get_radii(self) -> np.array:
+        """
+        @returns (n_foods) radii of the foods
+        """
+        return self.radii[self.get_rows()]
+
+    def get_ages(self) -> np.array:
+        """
+        @returns (n_foods) rounds each food has existed
+        """
+        return self.ages[self.get_rows()]
+
+    def get_food(self, food_id: int) -> "FoodView":
+        """
+        @returns a view of the given food with the Food getters
+        """
+        return FoodView(field=self, food_id=food_id)
+
+    def get_views(self) -> Dict[int, "FoodView"]:
+        """
+        @returns map of food id to views of every food
+        """
+        return {
+            food_id: FoodView(field=self, food_id=food_id)
+            for food_id in self.get_ids().tolist()
+        }
+
+    def __len__(self) -> int:
+        return self.n_foods
+
+
+# define the food view class
+class FoodView:
+    def __init__(self, field: FoodField, food_id: int):
+        """
+        a single food of a food field exposing the same getters as Food
+
+        @param field = food field the food lives in
+        @param food_id = id of the food in the field
+        """
+        self.field = field
+        self.food_id = food_id
+
+    # get functions
+    def get_position(self) -> np.array:
+        """
+        get function for the position
+
+        @returns the position of the food
+        """
+        return self.field.positions[self.field.id2row[self.food_id]].copy()
+
+    def get_radius(self) -> float:
+        """
+        get function for the radius
+
+        @returns the radius of the food
+        """
+        return float(self.field.radii[self.field.id2row[self.food_id]])
+
+    def get_color(self) -> str:
+        """
+        get function for the color
+
+        @returns the color of the food
+        """
+        return self.field.color
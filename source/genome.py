@@ -0,0 +1,155 @@
+import numpy as np
+import source.constants as constants
+from typing import Union
+
+"""
+this file holds a compact genome representation, nucleotides are converted
+to uint8 codes (the index of the nucleotide in constants.DEFAULT_NUCS) and
+four codes are packed per byte, a packed genome only keeps those bytes and
+its length and unpacks them when it is sliced, scored or converted
+"""
+
+# lookup tables between nucleotide characters and codes
+NUC_BYTES = np.frombuffer("".join(constants.DEFAULT_NUCS).encode(), dtype=np.uint8)
+CODE_LOOKUP = np.full(shape=256, fill_value=255, dtype=np.uint8)
+CODE_LOOKUP[NUC_BYTES] = np.arange(len(NUC_BYTES), dtype=np.uint8)
+# number of bases packed into each byte
+BASES_PER_BYTE = 4
+
+
+# convert a genome string to codes
+def encode(genome: str) -> np.array:
+    """
+    converts a genome string into nucleotide codes
+
+    @param genome = string of the genome made of the allowed nucs
+    @returns codes = uint8 array of nucleotide codes
+    """
+    codes = CODE_LOOKUP[np.frombuffer(genome.encode(), dtype=np.uint8)]
+    if np.any(codes == 255):
+        raise ValueError(f"genome={genome} contains unknown nucleotides")
+    return codes
+
+
+# convert codes to a genome string
+def decode(codes: np.array) -> str:
+    """
+    converts nucleotide codes into a genome string
+
+    @param codes = uint8 array of nucleotide codes
+    @returns genome = string of the genome made of the allowed nucs
+    """
+    return NUC_BYTES[codes].tobytes().decode()
+
+
+# pack codes into 2 bits per base
+def pack(codes: np.array) -> bytes:
+    """
+    packs nucleotide codes four to a byte with the first base in the high bits
+
+    @param codes = uint8 array of nucleotide codes
+    @returns packed = bytes holding the codes, the last byte is zero padded
+    """
+    n_bytes = -(-len(codes) // BASES_PER_BYTE)
+    padded = np.zeros(shape=n_bytes * BASES_PER_BYTE, dtype=np.uint8)
+    padded[: len(codes)] = codes
+    padded = padded.reshape(n_bytes, BASES_PER_BYTE)
+    packed = (
+        (padded[:, 0] << 6) | (padded[:, 1] << 4) | (padded[:, 2] << 2) | padded[:, 3]
+    )
+    return packed.astype(np.uint8).tobytes()
+
+
+# unpack codes from 2 bits per base
+def unpack(packed: bytes, size: int) -> np.array:
+    """
+    unpacks nucleotide codes packed by pack
+
+    @param packed = bytes holding the codes
+    @param size = number of bases in the genome
+    @returns codes = uint8 array of nucleotide codes
+    """
+    packed = np.frombuffer(packed, dtype=np.uint8)
+    shifts = np.array([6, 4, 2, 0], dtype=np.uint8)
+    codes = (packed[:, None] >> shifts[None, :]) & 3
+    return codes.ravel()[:size].astype(np.uint8)
+
+
+# define the packed genome class
+class PackedGenome:
+    # no per genome dict so each genome costs its packed bytes and a length
+    __slots__ = ("packed", "size")
+
+    def __init__(self, genome: Union[str, np.array, "PackedGenome"]):
+        """
+        keeps the genome packed at 2 bits per base, the codes are only
+        unpacked when the genome is sliced, scored or converted
+
+        @param genome = genome string, nucleotide codes or another genome
+        """
+        if isinstance(genome, PackedGenome):
+            self.packed, self.size = genome.packed, genome.size
+            return
+        if isinstance(genome, str):
+            codes = encode(genome=genome)
+        else:
+            codes = np.asarray(genome, dtype=np.uint8)
+        self.packed = pack(codes=codes)
+        self.size = len(codes)
+
+    @classmethod
+    def from_packed(cls, packed: bytes, size: int) -> "PackedGenome":
+        """
+        creates a genome from its packed storage form
+
+        @param packed = bytes holding the codes
+        @param size = number of bases in the genome
+        @returns genome = the genome holding those bytes
+        """
+        genome = cls.__new__(cls)
+        genome.packed, genome.size = bytes(packed), size
+        return genome
+
+    # conversion functions
+    @property
+    def codes(self) -> np.array:
+        """
+        @returns the nucleotide codes unpacked into a new array
+        """
+        return unpack(packed=self.packed, size=self.size)
+
+    def pack(self) -> bytes:
+        """
+        @returns the genome packed at 2 bits per base
+        """
+        return self.packed
+
+    def __str__(self) -> str:
+        return decode(codes=self.codes)
+
+    def __repr__(self) -> str:
+        return f"PackedGenome('{self}')"
+
+    # sequence functions
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, key) -> Union[str, "PackedGenome"]:
+        # slices, e.g. reading frames, stay packed genomes
+        if isinstance(key, slice):
+            return PackedGenome(self.codes[key])
+        # single positions give the nucleotide read straight from its byte
+        idx = range(self.size)[key]
+        shift = 2 * (BASES_PER_BYTE - 1 - idx % BASES_PER_BYTE)
+        return constants.DEFAULT_NUCS[(self.packed[idx // BASES_PER_BYTE] >> shift) & 3]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, str):
+            return str(self) == other
+        if not isinstance(other, PackedGenome):
+            return False
+        return self.size == other.size and self.packed == other.packed
+
+    def __hash__(self) -> int:
+        # hash like the string so both forms find each other in dicts and sets
+        return hash(str(self))
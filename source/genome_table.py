@@ -0,0 +1,312 @@
+import os
+import json
+import lzma
+import zlib
+import numpy as np
+import source.constants as constants
+import source.store_index as store_index
+from Levenshtein import opcodes as levenshtein_opcodes
+from typing import List, Optional, Union
+
+"""
+this file interns the genomes of a run into a table so snapshots store an
+integer id per cell instead of the genome itself, each genome is stored once
+the first round it appears, either in full or as the edits turning its
+parent's genome into it, and the genomes new in a round are written as one
+compressed block so the bytes written follow how many genomes are new
+"""
+
+# codecs for the genome blocks
+CODECS = ("none", "zlib", "lzma")
+# each index entry is first genome id, number of genomes, first byte of the
+# block and number of bytes of the block
+_INDEX_WIDTH = 4
+# name of the file holding the blocks
+_BLOCKS_FILENAME = "blocks.bin"
+
+
+# compress a block
+def compress(data: bytes, codec: str, level: int) -> bytes:
+    """
+    @param data = bytes to compress
+    @param codec = "none", "zlib" or "lzma"
+    @param level = compression level of the codec
+    @returns the compressed bytes
+    """
+    if codec == "zlib":
+        return zlib.compress(data, level)
+    if codec == "lzma":
+        return lzma.compress(data, preset=level)
+    return data
+
+
+# decompress a block
+def decompress(data: bytes, codec: str) -> bytes:
+    """
+    @param data = bytes to decompress
+    @param codec = "none", "zlib" or "lzma"
+    @returns the decompressed bytes
+    """
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "lzma":
+        return lzma.decompress(data)
+    return data
+
+
+# find the edits turning one genome into another
+def calc_edits(parent_genome: str, genome: str) -> List[list]:
+    """
+    @param parent_genome = genome to edit
+    @param genome = genome after the edits
+    @returns edits = [start, end, replacement] replacing parent_genome[start:end]
+    """
+    return [
+        [start, end, genome[new_start:new_end]]
+        for tag, start, end, new_start, new_end in levenshtein_opcodes(
+            parent_genome, genome
+        )
+        if tag != "equal"
+    ]
+
+
+# apply edits to a genome
+def apply_edits(parent_genome: str, edits: List[list]) -> str:
+    """
+    @param parent_genome = genome to edit
+    @param edits = [start, end, replacement] in order, see calc_edits
+    @returns genome = genome after the edits
+    """
+    pieces = []
+    position = 0
+    for start, end, replacement in edits:
+        pieces.append(parent_genome[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(parent_genome[position:])
+    return "".join(pieces)
+
+
+# read the block index of a table
+def read_index(dirname: str) -> np.array:
+    """
+    reads every complete index entry of a table
+
+    @param dirname = full path of the table directory
+    @returns index = (n_blocks x 4) first genome id, number of genomes,
+        first byte and number of bytes of each block
+    """
+    return store_index.read_index(dirname=dirname, width=_INDEX_WIDTH)
+
+
+# define the genome table writer class
+class GenomeTableWriter:
+    def __init__(
+        self,
+        dirname: str,
+        overwrite: bool,
+        codec: Optional[str] = None,
+        level: Optional[int] = None,
+        use_edits: Optional[bool] = None,
+    ):
+        """
+        @param dirname = full path of the table directory
+        @param overwrite = whether to remove a previous table first
+        @param codec = "none", "zlib" or "lzma" defaults to constants
+        @param level = compression level of the codec defaults to constants
+        @param use_edits = whether to store genomes as edits of their parent's
+        """
+        # configure parameters
+        codec = constants.GENOME_TABLE_CODEC if codec is None else codec
+        level = constants.GENOME_TABLE_LEVEL if level is None else level
+        use_edits = constants.GENOME_TABLE_EDITS if use_edits is None else use_edits
+        if codec not in CODECS:
+            raise ValueError(f"codec={codec} is not one of {CODECS}")
+        self.dirname = dirname
+        self.codec = codec
+        self.level = level
+        self.use_edits = use_edits
+        # the interned genomes and how many edits each is from a full genome
+        self.genome2id = {}
+        self.genomes = []
+        self.depths = []
+        self.n_bytes = 0
+        # create the table or load the genomes it already holds
+        meta = store_index.open_meta(
+            dirname=dirname, overwrite=overwrite, meta={"codec": codec}
+        )
+        self.codec = meta["codec"]
+        if len(read_index(dirname=dirname)) > 0:
+            reader = GenomeTableReader(dirname=dirname)
+            self.genomes = reader.get_genomes(genome_ids=range(len(reader)))
+            self.genome2id = {genome: idx for idx, genome in enumerate(self.genomes)}
+            for genome_id in range(len(reader)):
+                parent_genome_id = reader.id2entry[genome_id][0]
+                depth = 0 if parent_genome_id < 0 else self.depths[parent_genome_id] + 1
+                self.depths.append(depth)
+            self.n_bytes = int(reader.index[-1, 2] + reader.index[-1, 3])
+        self.blocks_file = store_index.open_data_file(
+            filename=os.path.join(dirname, _BLOCKS_FILENAME), n_bytes=self.n_bytes
+        )
+        self.index_file = store_index.open_index_file(
+            dirname=dirname, width=_INDEX_WIDTH
+        )
+        # genome ids of the cells of the previous round to find parents with
+        self.cell2genome = {}
+
+    def intern(
+        self,
+        genomes: List[str],
+        cell_ids: np.array,
+        parent_ids: Optional[np.array] = None,
+    ) -> np.array:
+        """
+        gives each genome its id and writes the genomes not seen before as
+        one block, a new genome is stored as the edits of its parent's genome
+        when the parent is known and the edits are shorter than the genome
+
+        @param genomes = genome of each cell
+        @param cell_ids = id of each cell
+        @param parent_ids = id of the cell each divided from, -1 for none
+        @returns genome_ids = (n) id of each genome in the table
+        """
+        first_id = len(self.genomes)
+        genome_ids = np.empty(shape=len(genomes), dtype=np.int64)
+        new_rows = []
+        for row, genome in enumerate(genomes):
+            genome_id = self.genome2id.get(genome)
+            if genome_id is None:
+                genome_id = len(self.genomes)
+                self.genome2id[genome] = genome_id
+                self.genomes.append(genome)
+                new_rows.append(row)
+            genome_ids[row] = genome_id
+        # find the genome of each new genome's parent cell
+        cell2genome = dict(zip(np.asarray(cell_ids).tolist(), genome_ids.tolist()))
+        entries = []
+        for row in new_rows:
+            genome_id = int(genome_ids[row])
+            genome = self.genomes[genome_id]
+            entry, depth = [-1, genome], 0
+            if self.use_edits and parent_ids is not None:
+                parent_id = int(parent_ids[row])
+                parent_genome_id = cell2genome.get(
+                    parent_id, self.cell2genome.get(parent_id, -1)
+                )
+                # chains of edits are capped so reading a genome stays cheap
+                if (
+                    0 <= parent_genome_id < genome_id
+                    and self.depths[parent_genome_id] < constants.GENOME_TABLE_MAX_DEPTH
+                ):
+                    edits = calc_edits(
+                        parent_genome=self.genomes[parent_genome_id], genome=genome
+                    )
+                    if len(json.dumps(edits)) < len(genome):
+                        entry = [parent_genome_id, edits]
+                        depth = self.depths[parent_genome_id] + 1
+            entries.append(entry)
+            self.depths.append(depth)
+        self.cell2genome = cell2genome
+        # write the new genomes as one block
+        if len(entries) > 0:
+            self.write(first_id=first_id, entries=entries)
+        return genome_ids
+
+    def write(self, first_id: int, entries: List[list]):
+        """
+        appends a compressed block then commits it to the index
+
+        @param first_id = genome id of the first entry
+        @param entries = [parent genome id, genome or edits] of each genome
+        """
+        data = json.dumps(entries, separators=(",", ":")).encode()
+        block = compress(data=data, codec=self.codec, level=self.level)
+        store_index.write_data(f=self.blocks_file, data=block)
+        store_index.write_entry(
+            f=self.index_file, entry=[first_id, len(entries), self.n_bytes, len(block)]
+        )
+        self.n_bytes += len(block)
+
+    def close(self):
+        """
+        closes every file of the table
+        """
+        self.blocks_file.close()
+        self.index_file.close()
+
+    def __len__(self) -> int:
+        return len(self.genomes)
+
+
+# define the genome table reader class
+class GenomeTableReader:
+    def __init__(self, dirname: str):
+        """
+        @param dirname = full path of the table directory
+        """
+        self.dirname = dirname
+        self.codec = store_index.read_meta(dirname=dirname)["codec"]
+        # genomes and block entries already read
+        self.id2genome = {}
+        self.id2entry = {}
+        self.refresh()
+
+    def refresh(self):
+        """
+        reads the index again to pick up blocks appended since it was opened
+        """
+        self.index = read_index(dirname=self.dirname)
+
+    def read_block(self, genome_id: int):
+        """
+        decompresses the block holding a genome id and keeps its entries
+
+        @param genome_id = id of a genome in the block
+        """
+        block_idx = int(np.searchsorted(self.index[:, 0], genome_id, side="right")) - 1
+        if genome_id < 0 or block_idx < 0 or genome_id >= len(self):
+            raise KeyError(f"genome_id={genome_id} is not in the table")
+        first_id, n_genomes, start, size = self.index[block_idx].tolist()
+        with open(os.path.join(self.dirname, _BLOCKS_FILENAME), "rb") as f:
+            f.seek(start)
+            block = f.read(size)
+        entries = json.loads(decompress(data=block, codec=self.codec))
+        self.id2entry.update(zip(range(first_id, first_id + n_genomes), entries))
+
+    # get functions
+    def get_genome(self, genome_id: int) -> str:
+        """
+        @param genome_id = id of the genome in the table
+        @returns genome = the genome, rebuilt from its ancestors' if needed
+        """
+        # walk up the edits until a genome that is known or stored in full
+        chain = []
+        while genome_id not in self.id2genome:
+            if genome_id not in self.id2entry:
+                self.read_block(genome_id=genome_id)
+            parent_genome_id, value = self.id2entry[genome_id]
+            if parent_genome_id < 0:
+                self.id2genome[genome_id] = value
+                break
+            chain.append((genome_id, value))
+            genome_id = parent_genome_id
+        # apply the edits back down the chain
+        genome = self.id2genome[genome_id]
+        for genome_id, edits in reversed(chain):
+            genome = apply_edits(parent_genome=genome, edits=edits)
+            self.id2genome[genome_id] = genome
+        return genome
+
+    def get_genomes(self, genome_ids: Union[np.array, List[int]]) -> List[str]:
+        """
+        @param genome_ids = ids of genomes in the table
+        @returns genomes = the genome of each id
+        """
+        return [
+            self.get_genome(genome_id) for genome_id in np.asarray(genome_ids).tolist()
+        ]
+
+    def __len__(self) -> int:
+        if len(self.index) == 0:
+            return 0
+        return int(self.index[-1, 0] + self.index[-1, 1])
@@ -0,0 +1,169 @@
+import numpy as np
+import source.constants as constants
+import source.genome as genome_utils
+from typing import List, Optional, Tuple, Union
+
+"""
+this file mutates the genomes and reading frames of many cells at once, the
+genomes are concatenated into one array of nucleotide codes with offsets
+marking where each genome starts so that every substitution, insertion and
+deletion is drawn in bulk, it follows the same rules as utils.gen_mut and
+utils.gen_mut_frame with each cell mutating at the rate of its mutate score
+"""
+
+
+# concatenate genomes into a single code array
+def concat_genomes(
+    genomes: List[Union[str, genome_utils.PackedGenome]],
+) -> Tuple[np.array, np.array]:
+    """
+    concatenates the genomes into one array of nucleotide codes
+
+    @param genomes = genome of each cell as strings or packed genomes
+    @returns codes = uint8 array of every nucleotide code back to back
+    @returns offsets = (n + 1) array of where each genome starts
+    """
+    lengths = np.array([len(genome) for genome in genomes], dtype=np.int64)
+    offsets = np.zeros(shape=len(genomes) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    # convert all of the string genomes in a single encode
+    if all(isinstance(genome, str) for genome in genomes):
+        codes = genome_utils.encode(genome="".join(genomes))
+    else:
+        codes = np.concatenate(
+            [genome_utils.PackedGenome(genome).codes for genome in genomes]
+            + [np.zeros(shape=0, dtype=np.uint8)]
+        )
+    return (codes, offsets)
+
+
+# split a code array into genomes
+def split_genomes(
+    codes: np.array, offsets: np.array, packed: bool = False
+) -> List[Union[str, genome_utils.PackedGenome]]:
+    """
+    splits concatenated nucleotide codes back into genomes
+
+    @param codes = uint8 array of every nucleotide code back to back
+    @param offsets = (n + 1) array of where each genome starts
+    @param packed = whether to return packed genomes instead of strings
+    @returns genomes = genome of each cell
+    """
+    # packed genomes copy their bases so no genome keeps the batch alive
+    if packed:
+        return [
+            genome_utils.PackedGenome(codes[start:end])
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+    # decode everything at once then slice the string
+    genomes = genome_utils.decode(codes=codes)
+    return [genomes[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+# mutate concatenated genomes
+def mutate_codes(
+    codes: np.array,
+    offsets: np.array,
+    thresholds: np.array,
+    rng: Optional[np.random._generator.Generator] = None,
+) -> Tuple[np.array, np.array]:
+    """
+    mutates every nucleotide of every genome in one pass, each nucleotide
+    mutates with its cell's threshold and the mutation is an insertion,
+    a deletion or a substitution with the same odds as utils.gen_mut_type
+
+    @param codes = uint8 array of every nucleotide code back to back
+    @param offsets = (n + 1) array of where each genome starts
+    @param thresholds = (n) mutational threshold of each genome
+    @param rng = random number generator
+    @returns mut_codes = uint8 array of the mutated nucleotide codes
+    @returns mut_offsets = (n + 1) array of where each mutated genome starts
+    """
+    # configure parameters
+    rng = constants.DEFAULT_RNG if rng is None else rng
+    n_nucs = len(codes)
+    n_codes = len(constants.DEFAULT_NUCS)
+    # give every nucleotide the threshold of its genome
+    nuc_thresholds = np.repeat(thresholds, np.diff(offsets))
+    # choose the mutations, equal chance of ins and del
+    is_mut = rng.uniform(low=0, high=1, size=n_nucs) < nuc_thresholds
+    rand_values = rng.uniform(low=0, high=1, size=n_nucs)
+    is_ins = is_mut & (rand_values < constants.INDEL_THRESHOLD / 2)
+    is_del = is_mut & ~is_ins & (rand_values < constants.INDEL_THRESHOLD)
+    is_sub = is_mut & ~is_ins & ~is_del
+    # substitute with one of the other nucleotides
+    mut_codes = codes.copy()
+    shifts = rng.integers(low=1, high=n_codes, size=np.count_nonzero(is_sub))
+    mut_codes[is_sub] = (mut_codes[is_sub] + shifts) % n_codes
+    # deletions keep no copies and insertions keep an extra one
+    counts = np.ones(shape=n_nucs, dtype=np.int64)
+    counts[is_del] = 0
+    counts[is_ins] = 2
+    mut_codes = np.repeat(mut_codes, counts)
+    # the extra copy is replaced by a random nucleotide after the original
+    ends = np.cumsum(counts)
+    mut_codes[ends[is_ins] - 1] = rng.integers(
+        low=0, high=n_codes, size=np.count_nonzero(is_ins)
+    )
+    # find where the mutated genomes start
+    mut_offsets = np.concatenate([[0], ends])[offsets]
+    return (mut_codes, mut_offsets)
+
+
+# mutate reading frames
+def mutate_frames(
+    frames: np.array,
+    thresholds: np.array,
+    rng: Optional[np.random._generator.Generator] = None,
+) -> np.array:
+    """
+    mutates every frame start and end at once with the same rule as
+    utils.gen_mut_frame then orders each frame so its start comes first
+
+    @param frames = (n x n_traits x 2) reading frames of each cell
+    @param thresholds = (n) mutational threshold of each cell
+    @param rng = random number generator
+    @returns mut_frames = (n x n_traits x 2) mutated reading frames
+    """
+    # configure parameters
+    rng = constants.DEFAULT_RNG if rng is None else rng
+    frames = np.asarray(frames, dtype=np.int64)
+    thresholds = np.broadcast_to(np.asarray(thresholds)[:, None, None], frames.shape)
+    # shift the values that mutate by a normal step scaled by the threshold
+    is_mut = rng.uniform(low=0, high=1, size=frames.shape) < thresholds
+    deltas = rng.normal(loc=0, scale=1, size=frames.shape)
+    deltas *= thresholds * constants.FRAME_STD_MAX
+    mut_frames = np.where(is_mut, frames + np.round(deltas).astype(np.int64), frames)
+    return np.sort(mut_frames, axis=-1)
+
+
+# mutate a batch of cells
+def mutate_cells(
+    genomes: List[Union[str, genome_utils.PackedGenome]],
+    frames: np.array,
+    thresholds: np.array,
+    rng: Optional[np.random._generator.Generator] = None,
+) -> Tuple[List[Union[str, genome_utils.PackedGenome]], np.array]:
+    """
+    mutates the genomes and reading frames of a batch of cells
+
+    @param genomes = genome of each cell as strings or packed genomes
+    @param frames = (n x n_traits x 2) reading frames of each cell
+    @param thresholds = (n) mutational threshold of each cell
+    @param rng = random number generator
+    @returns mut_genomes = mutated genomes in the same form as given
+    @returns mut_frames = (n x n_traits x 2) mutated reading frames
+    """
+    # configure parameters
+    rng = constants.DEFAULT_RNG if rng is None else rng
+    thresholds = np.asarray(thresholds, dtype=float)
+    # mutate the genomes
+    codes, offsets = concat_genomes(genomes=genomes)
+    mut_codes, mut_offsets = mutate_codes(
+        codes=codes, offsets=offsets, thresholds=thresholds, rng=rng
+    )
+    packed = len(genomes) > 0 and isinstance(genomes[0], genome_utils.PackedGenome)
+    mut_genomes = split_genomes(codes=mut_codes, offsets=mut_offsets, packed=packed)
+    # mutate the frames
+    mut_frames = mutate_frames(frames=frames, thresholds=thresholds, rng=rng)
+    return (mut_genomes, mut_frames)
@@ -0,0 +1,664 @@
+import time
+import concurrent.futures
+import numpy as np
+import source.constants as constants
+import source.cell as cell
+import source.genome as genome_utils
+import source.mutation as mutation
+import source.scoring as scoring
+import source.spatial as spatial
+import source.utils as utils
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+"""
+this file stores a population of cells as columns of numpy arrays so that
+moving and charging energy for every cell is a single batched operation,
+each row is one cell and CellView gives the familiar Cell getters for a row
+"""
+
+# names of the numpy columns of a population
+_NUMERIC_COLUMNS = (
+    "ids",
+    "parent_ids",
+    "positions",
+    "energies",
+    "radii",
+    "move_step_sizes",
+    "scaling_factors",
+    "scores",
+    "frames",
+)
+
+
+# define the cell population class
+class CellPopulation:
+    def __init__(self, traits: List[str], capacity: int = 64):
+        """
+        @param traits = traits every cell in the population is scored on
+        @param capacity = number of cells to allocate room for up front
+        """
+        # traits
+        self.traits = list(traits)
+        self.trait2idx = {trait: idx for idx, trait in enumerate(self.traits)}
+        # number of cells
+        self.n_cells = 0
+        self.next_id = 0
+        self.id2row = {}
+        # numeric columns
+        n_traits = len(self.traits)
+        self.ids = np.zeros(shape=capacity, dtype=np.int64)
+        self.parent_ids = np.zeros(shape=capacity, dtype=np.int64)
+        self.positions = np.zeros(shape=(capacity, 2))
+        self.energies = np.zeros(shape=capacity)
+        self.radii = np.zeros(shape=capacity)
+        self.move_step_sizes = np.zeros(shape=capacity)
+        self.scaling_factors = np.zeros(shape=capacity)
+        self.scores = np.zeros(shape=(capacity, n_traits))
+        self.frames = np.zeros(shape=(capacity, n_traits, 2), dtype=np.int64)
+        # object columns
+        self.genomes = []
+        self.colors = []
+
+    # storage functions
+    def reserve(self, capacity: int):
+        """
+        grows the columns so they can hold at least capacity cells
+
+        @param capacity = number of cells the columns must fit
+        """
+        old_capacity = len(self.ids)
+        if capacity <= old_capacity:
+            return
+        new_capacity = max(capacity, 2 * old_capacity)
+        # copy each numeric column into a larger one
+        for name in _NUMERIC_COLUMNS:
+            column = getattr(self, name)
+            new_column = np.zeros(
+                shape=(new_capacity,) + column.shape[1:], dtype=column.dtype
+            )
+            new_column[: self.n_cells] = column[: self.n_cells]
+            setattr(self, name, new_column)
+
+    def add_columns(
+        self,
+        genomes: List[Union[str, genome_utils.PackedGenome]],
+        frames: np.array,
+        scores: np.array,
+        positions: np.array,
+        energies: np.array,
+        colors: List[str],
+        radii: Optional[np.array] = None,
+        move_step_sizes: Optional[np.array] = None,
+        parent_ids: Optional[np.array] = None,
+    ) -> np.array:
+        """
+        appends a batch of cells given as columns
+
+        @param genomes = genome of each new cell
+        @param frames = (n x n_traits x 2) reading frames in trait order
+        @param scores = (n x n_traits) trait scores in trait order
+        @param positions = (n x 2) positions of the new cells
+        @param energies = (n) energies of the new cells
+        @param colors = color of each new cell
+        @param radii = (n) radii defaults to constants
+        @param move_step_sizes = (n) movement step sizes defaults to constants
+        @param parent_ids = (n) ids of the cells they divided from, -1 for none
+        @returns cell_ids = ids given to the new cells
+        """
+        n_new = len(genomes)
+        # configure parameters
+        radii = np.full(n_new, constants.CELL_RADIUS) if radii is None else radii
+        if move_step_sizes is None:
+            move_step_sizes = np.full(n_new, constants.MOVE_STEP_SIZE)
+        parent_ids = np.full(n_new, -1) if parent_ids is None else parent_ids
+        # make room and assign ids
+        self.reserve(capacity=self.n_cells + n_new)
+        start, end = self.n_cells, self.n_cells + n_new
+        cell_ids = np.arange(self.next_id, self.next_id + n_new, dtype=np.int64)
+        self.next_id += n_new
+        # fill the columns
+        self.ids[start:end] = cell_ids
+        self.parent_ids[start:end] = parent_ids
+        self.positions[start:end] = positions
+        self.energies[start:end] = energies
+        self.radii[start:end] = radii
+        self.move_step_sizes[start:end] = move_step_sizes
+        self.scaling_factors[start:end] = calc_scaling_factors(
+            magnitudes=np.asarray(move_step_sizes, dtype=float)
+        )
+        self.scores[start:end] = scores
+        self.frames[start:end] = frames
+        self.genomes.extend(genomes)
+        self.colors.extend(colors)
+        # index the new rows
+        self.id2row.update(zip(cell_ids.tolist(), range(start, end)))
+        self.n_cells = end
+        return cell_ids
+
+    def add_cells(self, cell_objects: Iterable[cell.Cell]) -> np.array:
+        """
+        appends Cell objects copying their attributes into the columns
+
+        @param cell_objects = cells to add
+        @returns cell_ids = ids given to the new cells
+        """
+        cell_objects = list(cell_objects)
+        n_traits = len(self.traits)
+        frames = np.zeros(shape=(len(cell_objects), n_traits, 2), dtype=np.int64)
+        scores = np.full(shape=(len(cell_objects), n_traits), fill_value=np.nan)
+        for row, cell_object in enumerate(cell_objects):
+            for trait, idx in self.trait2idx.items():
+                frames[row, idx] = cell_object.trait2frame[trait]
+                if trait in cell_object.trait2score:
+                    scores[row, idx] = cell_object.trait2score[trait]
+        return self.add_columns(
+            genomes=[cell_object.get_genome() for cell_object in cell_objects],
+            frames=frames,
+            scores=scores,
+            positions=np.array(
+                [cell_object.get_position() for cell_object in cell_objects]
+            ).reshape(-1, 2),
+            energies=np.array([cell_object.energy for cell_object in cell_objects]),
+            colors=[cell_object.get_color() for cell_object in cell_objects],
+            radii=np.array([cell_object.get_radius() for cell_object in cell_objects]),
+            move_step_sizes=np.array(
+                [cell_object.get_move_step_size() for cell_object in cell_objects]
+            ),
+        )
+
+    def keep(self, mask: np.array):
+        """
+        keeps only the rows where mask is True, compacting the columns
+
+        @param mask = (n_cells) boolean array of the rows to keep
+        """
+        rows = np.flatnonzero(mask)
+        n_kept = len(rows)
+        for name in _NUMERIC_COLUMNS:
+            column = getattr(self, name)
+            column[:n_kept] = column[rows]
+        self.genomes = [self.genomes[row] for row in rows]
+        self.colors = [self.colors[row] for row in rows]
+        self.n_cells = n_kept
+        self.id2row = dict(zip(self.ids[:n_kept].tolist(), range(n_kept)))
+
+    # movement functions
+    def move(self, rng: Optional[np.random._generator.Generator] = None):
+        """
+        moves every cell a random step and charges its energy, the cost is
+        the distance moved scaled down by the cell's movement trait score
+
+        @param rng = random number generator
+        """
+        # configure parameters
+        rng = constants.DEFAULT_RNG if rng is None else rng
+        n = self.n_cells
+        # generate the random integer steps for every cell at once
+        rand_steps = rng.integers(
+            -constants.STEP_RESOLUTION, constants.STEP_RESOLUTION, size=(n, 2)
+        )
+        # scale the steps, cells that cannot move stay put
+        scaling_factors = self.scaling_factors[:n, None]
+        deltas = np.divide(
+            rand_steps,
+            scaling_factors,
+            out=np.zeros(shape=(n, 2)),
+            where=~np.isnan(scaling_factors),
+        )
+        # reassign position to new positions kept within the world
+        self.positions[:n] = utils.bound_positions(
+            positions=self.positions[:n] + deltas
+        )
+        # calculate and charge the energy
+        distances = np.hypot(deltas[:, 0], deltas[:, 1])
+        cost_scalers = self.scores[:n, self.trait2idx["move"]]
+        self.energies[:n] -= distances * (1 - cost_scalers)
+
+    def crowd(self, strength: Optional[float] = None):
+        """
+        pushes overlapping cells apart so they do not pile up on each other
+
+        @param strength = fraction of each overlap resolved defaults to constants
+        """
+        n = self.n_cells
+        displacements = spatial.calc_repulsions(
+            positions=self.positions[:n], radii=self.radii[:n], strength=strength
+        )
+        self.positions[:n] = utils.bound_positions(
+            positions=self.positions[:n] + displacements
+        )
+
+    # feeding functions
+    def eat(self, food_positions: np.array, food_radii: np.array) -> np.array:
+        """
+        feeds the cells every food they touch, a food touching several cells
+        goes to the closest one (the oldest cell on ties) and gives energy
+        scaled by the cell's digest trait score
+
+        @param food_positions = (m x 2) positions of the foods
+        @param food_radii = (m) radii of the foods
+        @returns eaten_idxs = indices of the foods that were eaten
+        """
+        n = self.n_cells
+        # find and resolve which cell eats each food
+        cell_rows, food_idxs, dists = spatial.find_contacts(
+            positions=self.positions[:n],
+            radii=self.radii[:n],
+            item_positions=food_positions,
+            item_radii=food_radii,
+        )
+        cell_rows, food_idxs = spatial.assign_items(
+            point_idxs=cell_rows,
+            item_idxs=food_idxs,
+            dists=dists,
+            point_keys=self.ids[:n],
+        )
+        # credit the energy
+        n_eaten = np.bincount(cell_rows, minlength=n)
+        digest_scores = np.nan_to_num(self.scores[:n, self.trait2idx["digest"]])
+        self.energies[:n] += n_eaten * constants.FOOD_ENERGY * digest_scores
+        return food_idxs
+
+    # mutation functions
+    def mutate(
+        self, rows: np.array, rng: Optional[np.random._generator.Generator] = None
+    ) -> Tuple[List[Union[str, genome_utils.PackedGenome]], np.array]:
+        """
+        mutates the genomes and reading frames of the given rows in one batch,
+        each cell mutates at the rate of its mutate trait score
+
+        @param rows = rows of the cells to mutate
+        @param rng = random number generator
+        @returns mut_genomes = mutated genome of each row
+        @returns mut_frames = (n x n_traits x 2) mutated reading frames
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        return mutation.mutate_cells(
+            genomes=[self.genomes[row] for row in rows.tolist()],
+            frames=self.frames[rows],
+            thresholds=self.scores[rows, self.trait2idx["mutate"]],
+            rng=rng,
+        )
+
+    # scoring functions
+    def calc_scores(
+        self,
+        genomes: List[Union[str, genome_utils.PackedGenome]],
+        frames: np.array,
+        ideal_seqs: Dict[str, str],
+        parent_rows: Optional[np.array] = None,
+    ) -> np.array:
+        """
+        scores the traits of new cells, when the rows of their parents are
+        given only the traits whose sequence changed are rescored
+
+        @param genomes = genome of each new cell
+        @param frames = (n x n_traits x 2) reading frames in trait order
+        @param ideal_seqs = the idealized sequence to compare the cells with
+        @param parent_rows = row of each new cell's parent
+        @returns scores = (n x n_traits) trait scores in trait order
+        """
+        if parent_rows is None:
+            return scoring.score_cells(
+                genomes=genomes,
+                frames=frames,
+                ideal_seqs=ideal_seqs,
+                traits=self.traits,
+            )
+        parent_rows = np.asarray(parent_rows, dtype=np.int64)
+        return scoring.score_cells(
+            genomes=genomes,
+            frames=frames,
+            ideal_seqs=ideal_seqs,
+            traits=self.traits,
+            parent_genomes=[self.genomes[row] for row in parent_rows.tolist()],
+            parent_frames=self.frames[parent_rows],
+            parent_scores=self.scores[parent_rows],
+        )
+
+    def rescore(
+        self,
+        ideal_seqs: Dict[str, str],
+        n_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+    ) -> Dict[str, float]:
+        """
+        rescores every trait of every cell against new ideal sequences in one
+        batched pass, chunks of rows are split over a thread pool if asked
+
+        @param ideal_seqs = the idealized sequence to compare the cells with
+        @param n_workers = number of threads to score with, serial if None
+        @param chunk_size = rows scored per task defaults to constants
+        @returns timings = seconds spent encoding, scoring and in total
+        """
+        # configure parameters
+        chunk_size = constants.RESCORE_CHUNK_SIZE if chunk_size is None else chunk_size
+        start_time = time.perf_counter()
+        n = self.n_cells
+        # concatenate the genomes once for every trait
+        codes, offsets = mutation.concat_genomes(genomes=self.genomes)
+        encode_time = time.perf_counter()
+        frames = self.frames[:n]
+
+        # score the rows from start to end
+        def score_rows(start: int, end: int) -> np.array:
+            return scoring.score_codes(
+                codes=codes,
+                offsets=offsets[start : end + 1],
+                frames=frames[start:end],
+                ideal_seqs=ideal_seqs,
+                traits=self.traits,
+            )
+
+        bounds = [
+            (start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)
+        ]
+        if n_workers is None or len(bounds) <= 1:
+            chunks = [score_rows(start, end) for start, end in bounds]
+        else:
+            # build the shared bitmasks before the threads read them
+            for ideal_seq in ideal_seqs.values():
+                _ = scoring.get_batch_scorer(ideal_seq=ideal_seq)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=n_workers) as pool:
+                chunks = list(pool.map(lambda bound: score_rows(*bound), bounds))
+        if n > 0:
+            self.scores[:n] = np.concatenate(chunks)
+        end_time = time.perf_counter()
+        return {
+            "n_cells": n,
+            "encode": encode_time - start_time,
+            "score": end_time - encode_time,
+            "total": end_time - start_time,
+        }
+
+    # reproduction functions
+    def reproduce(
+        self,
+        ideal_seqs: Dict[str, str],
+        threshold: Optional[float] = None,
+        rng: Optional[np.random._generator.Generator] = None,
+    ) -> Tuple[np.array, Dict[str, float]]:
+        """
+        divides every cell with enough energy in one batch, the daughters get
+        mutated copies of their parent's genome and frames, are scored only
+        where their sequences changed and take half of the parent's energy
+
+        @param ideal_seqs = the idealized sequence to compare the cells with
+        @param threshold = energy a cell needs to divide defaults to constants
+        @param rng = random number generator
+        @returns daughter_ids = ids given to the daughters
+        @returns timings = seconds spent selecting, mutating, scoring, inserting
+        """
+        # configure parameters
+        threshold = constants.REPRODUCTION_ENERGY if threshold is None else threshold
+        rng = constants.DEFAULT_RNG if rng is None else rng
+        start_time = time.perf_counter()
+        # select the parents
+        rows = np.flatnonzero(self.energies[: self.n_cells] >= threshold)
+        select_time = time.perf_counter()
+        # build the daughters
+        genomes, frames = self.mutate(rows=rows, rng=rng)
+        mutate_time = time.perf_counter()
+        scores = self.calc_scores(
+            genomes=genomes, frames=frames, ideal_seqs=ideal_seqs, parent_rows=rows
+        )
+        score_time = time.perf_counter()
+        # split the energy and append the daughters in one batch
+        self.energies[rows] /= 2
+        daughter_ids = self.add_columns(
+            genomes=genomes,
+            frames=frames,
+            scores=scores,
+            positions=self.positions[rows],
+            energies=self.energies[rows],
+            colors=utils.gen_colors(n=len(rows), rng=rng),
+            radii=self.radii[rows],
+            move_step_sizes=self.move_step_sizes[rows],
+            parent_ids=self.ids[rows],
+        )
+        end_time = time.perf_counter()
+        timings = {
+            "n_daughters": len(rows),
+            "select": select_time - start_time,
+            "mutate": mutate_time - select_time,
+            "score": score_time - mutate_time,
+            "insert": end_time - score_time,
+            "total": end_time - start_time,
+        }
+        return (daughter_ids, timings)
+
+    # health functions
+    def reap(self) -> np.array:
+        """
+        removes every cell whose energy is negative
+
+        @returns dead_ids = ids of the removed cells
+        """
+        is_alive = self.energies[: self.n_cells] >= 0
+        dead_ids = self.ids[: self.n_cells][~is_alive].copy()
+        if len(dead_ids) > 0:
+            self.keep(mask=is_alive)
+        return dead_ids
+
+    # get functions
+    def get_ids(self) -> np.array:
+        """
+        @returns the ids of the living cells
+        """
+        return self.ids[: self.n_cells]
+
+    def get_positions(self) -> np.array:
+        """
+        @returns (n_cells x 2) positions of the living cells
+        """
+        return self.positions[: self.n_cells]
+
+    def get_energies(self) -> np.array:
+        """
+        @returns (n_cells) energies of the living cells
+        """
+        return self.energies[: self.n_cells]
+
+    def get_trait_scores(self, trait: str) -> np.array:
+        """
+        @returns (n_cells) scores of the given trait for the living cells
+        """
+        return self.scores[: self.n_cells, self.trait2idx[trait]]
+
+    def get_columns(self) -> Dict[str, Union[np.array, list]]:
+        """
+        @returns copies of every column of the living cells, later rounds
+            never change them so they can be written out at any time
+        """
+        columns = {
+            name: getattr(self, name)[: self.n_cells].copy()
+            for name in _NUMERIC_COLUMNS
+        }
+        columns["genomes"] = [str(genome) for genome in self.genomes]
+        columns["colors"] = list(self.colors)
+        return columns
+
+    def get_cell(self, cell_id: int) -> "CellView":
+        """
+        @returns a view of the given cell with the Cell getters
+        """
+        return CellView(population=self, cell_id=cell_id)
+
+    def get_views(self) -> Dict[int, "CellView"]:
+        """
+        @returns map of cell id to views of every living cell
+        """
+        return {
+            cell_id: CellView(population=self, cell_id=cell_id)
+            for cell_id in self.get_ids().tolist()
+        }
+
+    def __len__(self) -> int:
+        return self.n_cells
+
+
+# calculate the scaling factors for many magnitudes
+def calc_scaling_factors(magnitudes: np.array) -> np.array:
+    """
+    vectorized utils.calc_scaling_factor, magnitudes of 0 give nan
+
+    @param magnitudes = the total distance the steps should equate to
+    @returns scaling_factors = the dividing factor for each magnitude
+    """
+    steps = np.array([constants.STEP_RESOLUTION] * 2, dtype=float)
+    scaling_factors = np.full(shape=magnitudes.shape, fill_value=np.nan)
+    nonzero = magnitudes != 0
+    scaling_factors[nonzero] = np.sqrt(
+        np.power(steps, 2).sum() / np.power(magnitudes[nonzero], 2)
+    )
+    return scaling_factors
+
+
+# define the cell view class
+class CellView:
+    def __init__(self, population: CellPopulation, cell_id: int):
+        """
+        a single cell of a population exposing the same getters as Cell
+
+        @param population = population the cell lives in
+        @param cell_id = id of the cell in the population
+        """
+        self.population = population
+        self.cell_id = cell_id
+
+    def get_row(self) -> int:
+        """
+        @returns the row of the cell, rows change when cells are removed
+        """
+        return self.population.id2row[self.cell_id]
+
+    # boolean functions
+    def is_alive(self) -> bool:
+        """
+        checks if the cell is alive based on health metrics
+        alive if energy is >= 0 i.e. quiescent / active
+        """
+        return self.get_energy() >= 0
+
+    # get functions
+    def get_genome(self) -> Union[str, genome_utils.PackedGenome]:
+        """
+        get function for the genome
+
+        @returns genome
+        """
+        return self.population.genomes[self.get_row()]
+
+    def get_genome_size(self) -> int:
+        """
+        get function for the genome's size
+
+        @returns genome size
+        """
+        return len(self.get_genome())
+
+    def get_traits(self) -> List[str]:
+        """
+        get function for the cell's traits
+
+        @returns list of traits
+        """
+        return self.population.traits
+
+    def get_trait_frame(self, trait: str) -> Tuple[int, int]:
+        """
+        get function for the frame of a given trait
+
+        @returns the frame for the given trait
+        """
+        start, end = self.population.frames[
+            self.get_row(), self.population.trait2idx[trait]
+        ]
+        return (int(start), int(end))
+
+    def get_trait_seq(self, trait: str) -> str:
+        """
+        get function for the sequence in a trait's reading frame
+
+        @param trait = key to access the cell's sequence
+        @returns sequence of the trait
+        """
+        start, end = self.get_trait_frame(trait=trait)
+        return str(self.get_genome()[start:end])
+
+    def get_trait_score(self, trait: str) -> float:
+        """
+        get function for the score of a given trait
+
+        @returns the score for a given trait relative to the ideal
+        """
+        return float(
+            self.population.scores[self.get_row(), self.population.trait2idx[trait]]
+        )
+
+    def get_move_step_size(self) -> float:
+        """
+        get function for the step size of a movement
+
+        @returns the step size for the cell
+        """
+        return float(self.population.move_step_sizes[self.get_row()])
+
+    def get_position(self) -> np.array:
+        """
+        get function for the position
+
+        @returns the position of the cell
+        """
+        return self.population.positions[self.get_row()].copy()
+
+    def get_energy(self) -> float:
+        """
+        get function for the energy
+
+        @returns the energy of the cell
+        """
+        return float(self.population.energies[self.get_row()])
+
+    def get_radius(self) -> float:
+        """
+        get function for the radius
+
+        @returns the radius of the cell
+        """
+        return float(self.population.radii[self.get_row()])
+
+    def get_color(self) -> str:
+        """
+        get function for the color
+
+        @returns the color of the cell
+        """
+        return self.population.colors[self.get_row()]
+
+    # snapshot functions
+    def get_snap(self) -> dict:
+        """
+        creates a JSON formatted snapshot of the cell matching Cell.get_snap
+
+        @returns json_out = JSON formatted cell insides
+        """
+        # instantiate the tracking variable
+        json_out = {}
+        # add all variables of interest
+        json_out["genome"] = str(self.get_genome())
+        json_out["genome_size"] = self.get_genome_size()
+        json_out["color"] = self.get_color()
+        json_out["radius"] = self.get_radius()
+        json_out["position"] = self.get_position().tolist()
+        json_out["move_step_size"] = self.get_move_step_size()
+        # add all trait related variables
+        json_out["traits"] = self.get_traits()
+        json_out["trait_frames"] = {
+            trait: list(self.get_trait_frame(trait=trait))
+            for trait in self.get_traits()
+        }
+        json_out["trait_scores"] = {
+            trait: self.get_trait_score(trait=trait) for trait in self.get_traits()
+        }
+        return json_out
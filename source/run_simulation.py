@@ -1,5 +1,8 @@
 import tkinter
+from typing import Optional
 import source.environment as environment
+import source.engine as engine
+import source.snapshot as snapshot
 
 """
 this program represents genetic development of a randomized subset of cells
@@ -14,16 +17,29 @@ where death is defined by the loss of all energy and biologic sustainability
 def run_simulation(
     n_cells: int = 1,
     n_vents: int = 1,
+    headless: bool = False,
+    n_rounds: Optional[int] = None,
 ):
     """
     implementation of the program described above
 
     @param n_cells = number of cells to start with
     @param n_vents = number of vents to start with
+    @param headless = whether to run without the tkinter window
+    @param n_rounds = number of rounds to simulate, forever if None
     """
     # create the idealized sequences
     ideal_seqs = environment.create_ideal_seqs()
 
+    # run without a window as fast as possible
+    if headless:
+        state = engine.create_state(
+            n_cells=n_cells, n_vents=n_vents, ideal_seqs=ideal_seqs
+        )
+        simulation = engine.Engine(state=state)
+        simulation.add_observer(snapshot.SnapshotObserver())
+        return simulation.run(n_rounds=n_rounds)
+
     # create the window and canvas
     window, canvas = environment.create_canvas()
 
@@ -44,4 +60,5 @@ def run_simulation(
         n_cells=n_cells,
         n_vents=n_vents,
         ideal_seqs=ideal_seqs,
+        n_rounds=n_rounds,
     )
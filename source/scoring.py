@@ -0,0 +1,432 @@
+import numpy as np
+import source.constants as constants
+import source.genome as genome_utils
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+from Levenshtein import distance as levenshtein_distance
+
+"""
+this file scores trait sequences against the ideal sequences, lineages of
+cells share most of their reading frames so scores are memoized in a least
+recently used cache per ideal sequence that every cell shares, sequences
+missing from the cache are scored one at a time by Levenshtein which is as
+fast as batching them, whole populations of genomes packed into nucleotide
+codes are scored together by a bit parallel levenshtein distance (myers /
+hyyro) that steps every sequence through one column of the dynamic
+programming table at a time
+"""
+
+# longest ideal sequence whose bitmasks fit the bit parallel scorer
+MAX_BIT_PARALLEL_SIZE = 64
+
+
+# score a sequence
+def calc_score(seq: str, ideal_seq: str) -> float:
+    """
+    scores a sequence based on its levenshtein distance to the ideal sequence
+
+    @param seq = the cell's sequence for the trait
+    @param ideal_seq = the ideal sequence for this gene
+    @returns score = score from 1 to 0 of the trait
+    """
+    dist = levenshtein_distance(seq, ideal_seq)
+    if dist > len(ideal_seq):
+        return 0
+    else:
+        return 1 - (dist / len(ideal_seq))
+
+
+# slice reading frames out of concatenated genomes
+def calc_frame_bounds(offsets: np.array, frames: np.array) -> Tuple[np.array, np.array]:
+    """
+    finds where each reading frame starts in the concatenated codes and how
+    long it is, frames are clipped the same way python clips string slices
+
+    @param offsets = (n + 1) array of where each genome starts
+    @param frames = (n x 2) start and end of a reading frame of each genome
+    @returns starts = (n) position of each frame in the concatenated codes
+    @returns lengths = (n) length of each frame
+    """
+    genome_lengths = np.diff(offsets)
+    bounds = np.asarray(frames, dtype=np.int64).copy()
+    # negative values count back from the end of the genome
+    bounds += np.where(bounds < 0, genome_lengths[:, None], 0)
+    bounds = np.clip(bounds, 0, genome_lengths[:, None])
+    lengths = np.maximum(bounds[:, 1] - bounds[:, 0], 0)
+    return (offsets[:-1] + bounds[:, 0], lengths)
+
+
+# define the batch scorer class
+class BatchScorer:
+    def __init__(self, ideal_seq: str):
+        """
+        precomputes the bitmasks of the ideal sequence, bit i of the mask of
+        a nucleotide is set if the ideal sequence has that nucleotide at i
+
+        @param ideal_seq = the ideal sequence the scores are against
+        """
+        self.ideal_seq = ideal_seq
+        self.size = len(ideal_seq)
+        n_codes = len(constants.DEFAULT_NUCS)
+        # long or unusual sequences fall back to Levenshtein
+        self.is_bit_parallel = 0 < self.size <= MAX_BIT_PARALLEL_SIZE and all(
+            nuc in constants.DEFAULT_NUCS for nuc in ideal_seq
+        )
+        if not self.is_bit_parallel:
+            return
+        ideal_codes = genome_utils.encode(genome=ideal_seq)
+        bits = np.left_shift(np.uint64(1), np.arange(self.size, dtype=np.uint64))
+        self.peq = np.zeros(shape=n_codes, dtype=np.uint64)
+        for code in range(n_codes):
+            self.peq[code] = np.bitwise_or.reduce(bits[ideal_codes == code])
+        self.mask = np.uint64(2**self.size - 1)
+        self.high_bit = np.uint64(2 ** (self.size - 1))
+        # nucleotide counts for the lower bound
+        self.counts = np.bincount(ideal_codes, minlength=n_codes)
+
+    def calc_lower_bounds(
+        self, codes: np.array, starts: np.array, lengths: np.array
+    ) -> np.array:
+        """
+        bounds the distances from below by the nucleotide counts, every edit
+        fixes at most one surplus and one shortfall of a nucleotide
+
+        @param codes = uint8 array of nucleotide codes holding the sequences
+        @param starts = (n) position of each sequence in the codes
+        @param lengths = (n) length of each sequence
+        @returns lower_bounds = (n) distances are at least this large
+        """
+        n_codes = len(self.counts)
+        # count the nucleotides of every sequence in a single pass
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        shifts = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        counts = np.bincount(
+            rows * n_codes + codes[np.arange(len(rows)) + shifts],
+            minlength=len(lengths) * n_codes,
+        ).reshape(-1, n_codes)
+        diffs = counts - self.counts[None, :]
+        surpluses = np.clip(diffs, 0, None).sum(axis=1)
+        shortfalls = np.clip(-diffs, 0, None).sum(axis=1)
+        return np.maximum(surpluses, shortfalls)
+
+    def calc_code_distances(
+        self,
+        codes: np.array,
+        starts: np.array,
+        lengths: np.array,
+        max_dist: Optional[int] = None,
+        use_lower_bounds: bool = True,
+    ) -> np.array:
+        """
+        computes the levenshtein distance of every sequence to the ideal,
+        distances past max_dist are cut off early and reported as max_dist + 1
+
+        @param codes = uint8 array of nucleotide codes holding the sequences
+        @param starts = (n) position of each sequence in the codes
+        @param lengths = (n) length of each sequence
+        @param max_dist = largest distance of interest, exact if None
+        @param use_lower_bounds = whether to skip sequences by their nucleotide counts
+        @returns dists = (n) distances capped at max_dist + 1
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        # fall back to Levenshtein one sequence at a time
+        if not self.is_bit_parallel:
+            dists = np.array(
+                [
+                    levenshtein_distance(
+                        genome_utils.decode(codes=codes[start : start + length]),
+                        self.ideal_seq,
+                    )
+                    for start, length in zip(starts.tolist(), lengths.tolist())
+                ],
+                dtype=np.int64,
+            )
+            return dists if max_dist is None else np.minimum(dists, max_dist + 1)
+        max_length = lengths.max() if len(lengths) > 0 else 0
+        max_dist = self.size + max_length if max_dist is None else max_dist
+        cut_dist = max_dist + 1
+        dists = np.full(shape=len(lengths), fill_value=cut_dist, dtype=np.int64)
+        # skip the sequences whose nucleotide counts are too far off
+        rows = np.arange(len(lengths))
+        if use_lower_bounds:
+            lower_bounds = self.calc_lower_bounds(
+                codes=codes, starts=starts, lengths=lengths
+            )
+            rows = np.flatnonzero(lower_bounds <= max_dist)
+            starts, lengths = starts[rows], lengths[rows]
+        # the first column of the table is 0 to size down the ideal sequence
+        pv = np.full(shape=len(rows), fill_value=self.mask, dtype=np.uint64)
+        mv = np.zeros(shape=len(rows), dtype=np.uint64)
+        scores = np.full(shape=len(rows), fill_value=self.size, dtype=np.int64)
+        one = np.uint64(1)
+        for col in range(max_length + 1):
+            # retire the sequences that ended or can no longer get under max_dist
+            is_live = (col < lengths) & (scores - (lengths - col) <= max_dist)
+            if not np.all(is_live):
+                dists[rows[~is_live]] = np.minimum(scores[~is_live], cut_dist)
+                rows, starts, lengths = rows[is_live], starts[is_live], lengths[is_live]
+                pv, mv, scores = pv[is_live], mv[is_live], scores[is_live]
+            if len(rows) == 0:
+                break
+            # compute the horizontal and vertical deltas of the next column
+            eq = self.peq[codes[starts + col]]
+            xv = eq | mv
+            xh = ((((eq & pv) + pv) & self.mask) ^ pv) | eq
+            ph = mv | (~(xh | pv) & self.mask)
+            mh = pv & xh
+            # track the bottom row which holds the distance so far
+            scores += (ph & self.high_bit) != 0
+            scores -= (mh & self.high_bit) != 0
+            # the top row grows by one every column
+            ph = ((ph << one) | one) & self.mask
+            mh = (mh << one) & self.mask
+            pv = mh | (~(xv | ph) & self.mask)
+            mv = ph & xv
+        return dists
+
+    def calc_distances(
+        self, seqs: List[str], max_dist: Optional[int] = None
+    ) -> np.array:
+        """
+        computes the levenshtein distance of every sequence to the ideal,
+        distances past max_dist are cut off early and reported as max_dist + 1
+
+        @param seqs = sequences made of the allowed nucs
+        @param max_dist = largest distance of interest, exact if None
+        @returns dists = (n) distances capped at max_dist + 1
+        """
+        lengths = np.array([len(seq) for seq in seqs], dtype=np.int64)
+        return self.calc_code_distances(
+            codes=genome_utils.encode(genome="".join(seqs)),
+            starts=np.cumsum(lengths) - lengths,
+            lengths=lengths,
+            max_dist=max_dist,
+        )
+
+    def calc_code_scores(
+        self, codes: np.array, starts: np.array, lengths: np.array
+    ) -> np.array:
+        """
+        scores the sequences the same way as calc_score
+
+        @param codes = uint8 array of nucleotide codes holding the sequences
+        @param starts = (n) position of each sequence in the codes
+        @param lengths = (n) length of each sequence
+        @returns scores = (n) scores from 1 to 0 of the trait
+        """
+        # any distance of at least size scores zero so those are cut off, the
+        # nucleotide counts are rarely off by size so they are not checked
+        dists = self.calc_code_distances(
+            codes=codes,
+            starts=starts,
+            lengths=lengths,
+            max_dist=self.size - 1,
+            use_lower_bounds=False,
+        )
+        return np.where(dists >= self.size, 0, 1 - (dists / self.size))
+
+    def calc_scores(self, seqs: List[str]) -> np.array:
+        """
+        scores the sequences the same way as calc_score
+
+        @param seqs = sequences made of the allowed nucs
+        @returns scores = (n) scores from 1 to 0 of the trait
+        """
+        lengths = np.array([len(seq) for seq in seqs], dtype=np.int64)
+        return self.calc_code_scores(
+            codes=genome_utils.encode(genome="".join(seqs)),
+            starts=np.cumsum(lengths) - lengths,
+            lengths=lengths,
+        )
+
+
+# define the score cache class
+class ScoreCache:
+    def __init__(self, ideal_seq: str, max_size: Optional[int] = None):
+        """
+        @param ideal_seq = the ideal sequence the scores are against
+        @param max_size = number of sequences to remember defaults to constants
+        """
+        self.ideal_seq = ideal_seq
+        self.max_size = constants.SCORE_CACHE_SIZE if max_size is None else max_size
+        self.seq2score = OrderedDict()
+        # counters
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def get_score(self, seq: str) -> float:
+        """
+        retrieves the score of the sequence computing it on a miss
+
+        @param seq = the cell's sequence for the trait
+        @returns score = score from 1 to 0 of the trait
+        """
+        score = self.seq2score.get(seq)
+        if score is not None:
+            self.n_hits += 1
+            self.seq2score.move_to_end(seq)
+            return score
+        # compute and remember the score
+        self.n_misses += 1
+        score = calc_score(seq=seq, ideal_seq=self.ideal_seq)
+        self.seq2score[seq] = score
+        # forget the least recently used sequence
+        if len(self.seq2score) > self.max_size:
+            self.seq2score.popitem(last=False)
+        return score
+
+    def clear(self):
+        """
+        forgets every score and resets the counters
+        """
+        self.seq2score.clear()
+        self.n_hits = 0
+        self.n_misses = 0
+
+    # get functions
+    def get_stats(self) -> Dict[str, int]:
+        """
+        @returns stats = number of hits, misses and remembered sequences
+        """
+        return {
+            "hits": self.n_hits,
+            "misses": self.n_misses,
+            "size": len(self.seq2score),
+        }
+
+
+# caches shared by every cell keyed by their ideal sequence
+_SCORE_CACHES = {}
+
+
+# retrieve the shared cache of an ideal sequence
+def get_score_cache(ideal_seq: str) -> ScoreCache:
+    """
+    @param ideal_seq = the ideal sequence the scores are against
+    @returns score_cache = the cache shared by every cell for this sequence
+    """
+    score_cache = _SCORE_CACHES.get(ideal_seq)
+    if score_cache is None:
+        score_cache = _SCORE_CACHES[ideal_seq] = ScoreCache(ideal_seq=ideal_seq)
+    return score_cache
+
+
+# batch scorers keyed by their ideal sequence
+_BATCH_SCORERS = {}
+
+
+# retrieve the batch scorer of an ideal sequence
+def get_batch_scorer(ideal_seq: str) -> BatchScorer:
+    """
+    @param ideal_seq = the ideal sequence the scores are against
+    @returns batch_scorer = scorer whose bitmasks are computed only once
+    """
+    batch_scorer = _BATCH_SCORERS.get(ideal_seq)
+    if batch_scorer is None:
+        batch_scorer = _BATCH_SCORERS[ideal_seq] = BatchScorer(ideal_seq=ideal_seq)
+    return batch_scorer
+
+
+# clear the shared caches
+def clear_score_caches():
+    """
+    forgets every shared cache, e.g. once the ideal sequences are replaced
+    """
+    _SCORE_CACHES.clear()
+    _BATCH_SCORERS.clear()
+
+
+# score a trait with the shared cache
+def calc_trait_score(seq: str, ideal_seq: str) -> float:
+    """
+    @param seq = the cell's sequence for the trait
+    @param ideal_seq = the ideal sequence for this gene
+    @returns score = score from 1 to 0 of the trait
+    """
+    return get_score_cache(ideal_seq=ideal_seq).get_score(seq=seq)
+
+
+# slice a reading frame out of a genome
+def get_frame_seq(
+    genome: Union[str, genome_utils.PackedGenome], frame: np.array
+) -> str:
+    """
+    @param genome = genome of the cell
+    @param frame = start and end of the reading frame
+    @returns seq = the sequence in the reading frame
+    """
+    return str(genome[int(frame[0]) : int(frame[1])])
+
+
+# score the traits of a batch of cells
+def score_cells(
+    genomes: List[Union[str, genome_utils.PackedGenome]],
+    frames: np.array,
+    ideal_seqs: Dict[str, str],
+    traits: List[str],
+    parent_genomes: Optional[List[Union[str, genome_utils.PackedGenome]]] = None,
+    parent_frames: Optional[np.array] = None,
+    parent_scores: Optional[np.array] = None,
+) -> np.array:
+    """
+    scores every trait of every cell, when the parents are given the traits
+    whose reading frame sequence is unchanged keep their parent's score
+
+    @param genomes = genome of each cell
+    @param frames = (n x n_traits x 2) reading frames in trait order
+    @param ideal_seqs = the idealized sequence to compare the cells with
+    @param traits = traits of the columns of frames
+    @param parent_genomes = genome of each cell's parent
+    @param parent_frames = (n x n_traits x 2) reading frames of the parents
+    @param parent_scores = (n x n_traits) trait scores of the parents
+    @returns scores = (n x n_traits) trait scores, nan if there is no ideal
+    """
+    has_parents = parent_genomes is not None
+    scores = np.full(shape=(len(genomes), len(traits)), fill_value=np.nan)
+    for idx, trait in enumerate(traits):
+        if trait not in ideal_seqs:
+            continue
+        score_cache = get_score_cache(ideal_seq=ideal_seqs[trait])
+        for row, genome in enumerate(genomes):
+            seq = get_frame_seq(genome=genome, frame=frames[row, idx])
+            # reuse the parent's score if the sequence did not change
+            if has_parents and not np.isnan(parent_scores[row, idx]):
+                parent_seq = get_frame_seq(
+                    genome=parent_genomes[row], frame=parent_frames[row, idx]
+                )
+                if seq == parent_seq:
+                    scores[row, idx] = parent_scores[row, idx]
+                    continue
+            scores[row, idx] = score_cache.get_score(seq=seq)
+    return scores
+
+
+# score the traits of concatenated genomes
+def score_codes(
+    codes: np.array,
+    offsets: np.array,
+    frames: np.array,
+    ideal_seqs: Dict[str, str],
+    traits: List[str],
+) -> np.array:
+    """
+    scores every trait of every genome straight from the nucleotide codes
+    with the bit parallel scorers, no sequence strings are built
+
+    @param codes = uint8 array of every nucleotide code back to back
+    @param offsets = (n + 1) array of where each genome starts
+    @param frames = (n x n_traits x 2) reading frames in trait order
+    @param ideal_seqs = the idealized sequence to compare the cells with
+    @param traits = traits of the columns of frames
+    @returns scores = (n x n_traits) trait scores, nan if there is no ideal
+    """
+    scores = np.full(shape=(len(offsets) - 1, len(traits)), fill_value=np.nan)
+    for idx, trait in enumerate(traits):
+        if trait not in ideal_seqs:
+            continue
+        starts, lengths = calc_frame_bounds(offsets=offsets, frames=frames[:, idx])
+        scores[:, idx] = get_batch_scorer(ideal_seq=ideal_seqs[trait]).calc_code_scores(
+            codes=codes, starts=starts, lengths=lengths
+        )
+    return scores
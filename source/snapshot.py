@@ -1,21 +1,27 @@
 import os
 import source.utils as utils
-from typing import Dict
+from typing import Dict, List, Optional, Union
+import numpy as np
 import source.constants as constants
+import source.engine as engine
+import source.snapshot_store as snapshot_store
+import source.snapshot_delta as snapshot_delta
+import source.snapshot_sqlite as snapshot_sqlite
+import source.snapshot_writer as snapshot_writer
 import json
-import tkinter
+import logging
 
 
 def prep_snapshot_env(
-    dirname: str, prefix: str, labels: Dict[str, tkinter.Label], overwrite: bool
+    dirname: str, prefix: str, round_num: int, overwrite: bool
 ) -> str:
     """
-    constructs a filename from the given round number in labels and in the
+    constructs a filename from the given round number and in the
     given directory creating it if it does not exist
 
     @param dirname = directory to create the snapshot
     @param prefix = prefix of the snapshot save files
-    @param labels = labels of the given environment
+    @param round_num = round number of the snapshot
     @param overwrite = whether to overwrite existing data
     @returns filename = filename to write the snapshot to
     """
@@ -26,8 +32,6 @@ def prep_snapshot_env(
     dirname = file_dir.replace("source", dirname)
     # create the directory if not yet done
     _ = utils.create_dir_if_none(dirname=dirname, overwrite=overwrite)
-    # retrieve the round number
-    round_num = labels["rounds"]["text"].split(" ")[0]
     # append the prefix
     filename = f"{prefix}{round_num}.json"
     # join with the directory
@@ -35,29 +39,423 @@ def prep_snapshot_env(
     return filename
 
 
+# hash cell ids
+def calc_id_hashes(ids: np.array, seed: Optional[int] = None) -> np.array:
+    """
+    hashes cell ids with splitmix64 so the order of the hashes looks random
+    but is the same every round and in every run with the same seed
+
+    @param ids = (n) ids of the cells
+    @param seed = seed mixed into the hash defaults to constants
+    @returns hashes = (n) uint64 hash of each id
+    """
+    # configure parameters
+    seed = constants.SNAPSHOT_SAMPLE_SEED if seed is None else seed
+    # uint64 arithmetic wraps around which the hash relies on
+    z = np.asarray(ids).astype(np.uint64) + np.uint64(seed)
+    z = z + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+# choose the cells to snapshot
+def sample_ids(
+    ids: np.array,
+    sample_size: Optional[int],
+    seed: Optional[int] = None,
+    sampled_ids: Optional[np.array] = None,
+) -> np.array:
+    """
+    keeps the cells sampled the round before that are still alive and fills
+    the slots freed by the ones that died with the unsampled cells that have
+    the smallest id hashes, so a sampled cell stays sampled while it lives
+    and its trajectory can be followed across rounds
+
+    @param ids = (n) ids of the cells
+    @param sample_size = number of cells to keep, every cell if None
+    @param seed = seed mixed into the hash defaults to constants
+    @param sampled_ids = ids sampled the round before, None for the first round
+    @returns is_sampled = (n) whether each cell is in the sample
+    """
+    ids = np.asarray(ids)
+    is_sampled = np.ones(shape=len(ids), dtype=bool)
+    if sample_size is None or len(ids) <= sample_size:
+        return is_sampled
+    hashes = calc_id_hashes(ids=ids, seed=seed)
+    # keep the living cells of the previous sample
+    if sampled_ids is None:
+        is_sampled[:] = False
+    else:
+        is_sampled = np.isin(ids, sampled_ids)
+    kept_rows = np.flatnonzero(is_sampled)
+    if len(kept_rows) > sample_size:
+        is_sampled[:] = False
+        kept_rows = kept_rows[np.argsort(hashes[kept_rows])[:sample_size]]
+        is_sampled[kept_rows] = True
+    # fill the free slots partitioning rather than sorting the hashes
+    n_free = sample_size - len(kept_rows)
+    if n_free > 0:
+        free_rows = np.flatnonzero(~is_sampled)
+        is_sampled[
+            free_rows[np.argpartition(hashes[free_rows], n_free - 1)[:n_free]]
+        ] = True
+    return is_sampled
+
+
+# summarize every cell
+def calc_aggregates(
+    energies: np.array, scores: np.array, genome_sizes: np.array, traits: List[str]
+) -> dict:
+    """
+    summarizes the population so sampled snapshots keep the totals
+
+    @param energies = (n) energy of every cell
+    @param scores = (n x n_traits) trait scores of every cell
+    @param genome_sizes = (n) genome size of every cell
+    @param traits = traits in the order of the score columns
+    @returns aggregates = counts, means and ranges over every cell
+    """
+    energies = np.asarray(energies, dtype=float)
+    scores = np.asarray(scores, dtype=float).reshape(len(energies), len(traits))
+    genome_sizes = np.asarray(genome_sizes, dtype=float)
+
+    # summarize ignoring nan and giving None for no values
+    def summarize(values: np.array) -> dict:
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return {"mean": None, "std": None, "min": None, "max": None}
+        return {
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+        }
+
+    aggregates = {}
+    aggregates["n_cells"] = len(energies)
+    aggregates["energy"] = summarize(energies)
+    aggregates["genome_size"] = summarize(genome_sizes)
+    aggregates["trait_scores"] = {
+        trait: summarize(scores[:, trait_idx]) for trait_idx, trait in enumerate(traits)
+    }
+    return aggregates
+
+
+# gather the columns of cell objects
+def get_cell_columns(cell_objects: Dict, traits: List[str]) -> Dict:
+    """
+    converts cell objects into the columns the snapshot writers take
+
+    @param cell_objects = map of cell id to the cell or its view
+    @param traits = traits in the order of the score and frame columns
+    @returns columns = columns of the cells, see CellPopulation.get_columns
+    """
+    cell_snaps = [cell_object.get_snap() for cell_object in cell_objects.values()]
+    n_traits = len(traits)
+    columns = {}
+    columns["ids"] = np.array(list(cell_objects.keys()), dtype=np.int64)
+    columns["genomes"] = [cell_snap["genome"] for cell_snap in cell_snaps]
+    columns["colors"] = [cell_snap["color"] for cell_snap in cell_snaps]
+    columns["radii"] = np.array(
+        [cell_snap["radius"] for cell_snap in cell_snaps], dtype=float
+    )
+    columns["positions"] = np.array(
+        [cell_snap["position"] for cell_snap in cell_snaps], dtype=float
+    ).reshape(-1, 2)
+    columns["move_step_sizes"] = np.array(
+        [cell_snap["move_step_size"] for cell_snap in cell_snaps], dtype=float
+    )
+    columns["frames"] = np.array(
+        [
+            [cell_snap["trait_frames"][trait] for trait in traits]
+            for cell_snap in cell_snaps
+        ],
+        dtype=np.int64,
+    ).reshape(-1, n_traits, 2)
+    columns["scores"] = np.array(
+        [
+            [cell_object.get_trait_score(trait=trait) for trait in traits]
+            for cell_object in cell_objects.values()
+        ],
+        dtype=float,
+    ).reshape(-1, n_traits)
+    columns["energies"] = np.array(
+        [cell_object.get_energy() for cell_object in cell_objects.values()],
+        dtype=float,
+    )
+    return columns
+
+
 def take_snapshot(
-    cell_objects: Dict, labels: Dict[str, tkinter.Label], overwrite: bool
+    cell_objects: Dict,
+    round_num: int,
+    overwrite: bool,
+    sample_size: Optional[int] = None,
+    seed: Optional[int] = None,
 ):
     """
-    takes a snapshot of all of the cells and saves it to the snapshot directory
+    takes a snapshot of all of the cells and saves it to the snapshot directory,
+    with a sample size only a stable sample of the cells is saved and the
+    aggregates over all of the cells are saved next to it
 
     @param cell_objects = cells to save
-    @param labels = labels of the given environment
+    @param round_num = round number of the snapshot
     @param overwrite = whether to overwrite existing data
+    @param sample_size = number of cells to save, every cell if None
+    @param seed = seed of the sample defaults to constants
     """
-    # get the filename
-    filename = prep_snapshot_env(
-        dirname=constants.SNAPSHOT_DIRNAME,
-        prefix=constants.SNAPSHOT_FILENAME_PREFIX,
-        labels=labels,
-        overwrite=overwrite,
-    )
-    # create tracking variable for all cells
-    cell_snaps = {}
-    # save all attributes for all of the cells by taking their snaps
-    for cell_id, cell_object in cell_objects.items():
-        cell_snap = cell_object.get_snap()
-        cell_snaps[cell_id] = cell_snap
-    # dump the data in JSON format into the given file
-    with open(filename, "wt") as f:
-        f.writelines(json.dumps(cell_snaps))
+    # gather the cells as columns
+    traits = []
+    if len(cell_objects) > 0:
+        traits = next(iter(cell_objects.values())).get_traits() or []
+    columns = get_cell_columns(cell_objects=cell_objects, traits=traits)
+    # write them like the JSON snapshot observer
+    writer = JsonSnapshotWriter(traits=traits, overwrite=overwrite)
+    if sample_size is not None:
+        writer = SampledSnapshotWriter(
+            sink=writer, traits=traits, sample_size=sample_size, seed=seed
+        )
+    writer.append(round_num=round_num, columns=columns)
+    writer.close()
+
+
+# define the JSON snapshot writer class
+class JsonSnapshotWriter:
+    """
+    writes each round given as columns to its own JSON file
+    """
+
+    def __init__(self, traits: List[str], overwrite: bool):
+        """
+        @param traits = traits every cell in the run is scored on
+        @param overwrite = whether to remove previous snapshots first
+        """
+        self.traits = list(traits)
+        self.overwrite = overwrite
+
+    def append(self, round_num: int, columns: Dict[str, Union[np.array, list]]):
+        """
+        @param round_num = round number of the snapshot
+        @param columns = columns of the living cells, see CellPopulation.get_columns
+        """
+        # get the filename, only the first round clears old snapshots
+        filename = prep_snapshot_env(
+            dirname=constants.SNAPSHOT_DIRNAME,
+            prefix=constants.SNAPSHOT_FILENAME_PREFIX,
+            round_num=round_num,
+            overwrite=self.overwrite,
+        )
+        self.overwrite = False
+        # dump the data in JSON format into the given file
+        cell_snaps = snapshot_store.get_snaps(columns=columns, traits=self.traits)
+        with open(filename, "wt") as f:
+            f.writelines(json.dumps(cell_snaps))
+
+    def append_aggregates(self, round_num: int, aggregates: dict):
+        """
+        writes the aggregates of a round to its own JSON file
+
+        @param round_num = round number of the snapshot
+        @param aggregates = aggregates over every cell, see calc_aggregates
+        """
+        filename = prep_snapshot_env(
+            dirname=constants.SNAPSHOT_DIRNAME,
+            prefix=constants.SNAPSHOT_AGGREGATE_PREFIX,
+            round_num=round_num,
+            overwrite=False,
+        )
+        with open(filename, "wt") as f:
+            f.writelines(json.dumps(dict(aggregates, round_num=round_num)))
+
+    def close(self):
+        pass
+
+
+# define the sampled snapshot writer class
+class SampledSnapshotWriter:
+    """
+    passes a stable sample of each round's cells on to another writer
+    together with the aggregates over every cell, which the writer keeps
+    alongside its snapshots, the ids sampled each round are carried to the
+    next so the sampled cells stay sampled while they live
+    """
+
+    def __init__(
+        self,
+        sink,
+        traits: List[str],
+        sample_size: int,
+        seed: Optional[int] = None,
+    ):
+        """
+        @param sink = writer with append, append_aggregates and close
+        @param traits = traits every cell in the run is scored on
+        @param sample_size = number of cells to pass on each round
+        @param seed = seed of the sample defaults to constants
+        """
+        self.sink = sink
+        self.traits = list(traits)
+        self.sample_size = sample_size
+        self.seed = seed
+        # ids sampled the round before
+        self.sampled_ids = None
+
+    def append(self, round_num: int, columns: Dict[str, Union[np.array, list]]):
+        """
+        @param round_num = round number of the snapshot
+        @param columns = columns of every living cell
+        """
+        is_sampled = sample_ids(
+            ids=columns["ids"],
+            sample_size=self.sample_size,
+            seed=self.seed,
+            sampled_ids=self.sampled_ids,
+        )
+        rows = np.flatnonzero(is_sampled)
+        self.sampled_ids = np.asarray(columns["ids"])[rows]
+        # summarize every cell before sampling
+        aggregates = calc_aggregates(
+            energies=columns["energies"],
+            scores=columns["scores"],
+            genome_sizes=[len(genome) for genome in columns["genomes"]],
+            traits=self.traits,
+        )
+        aggregates["n_sampled"] = len(rows)
+        # sample the rows of every column keeping their order
+        sampled_columns = {
+            name: (
+                [values[row] for row in rows.tolist()]
+                if isinstance(values, list)
+                else np.asarray(values)[rows]
+            )
+            for name, values in columns.items()
+        }
+        # the round goes first since it may clear what the writer held before
+        self.sink.append(round_num=round_num, columns=sampled_columns)
+        self.sink.append_aggregates(round_num=round_num, aggregates=aggregates)
+
+    def close(self):
+        """
+        closes the writer
+        """
+        self.sink.close()
+
+
+# define the snapshot observer class
+class SnapshotObserver(engine.Observer):
+    """
+    takes a snapshot of the initial cells, overwriting previous snapshots,
+    and then of the cells after every round as long as any are alive, either
+    as one JSON file per round, appended to a single columnar store, as
+    keyframes and deltas or as a new run in a SQLite database, the rounds are
+    copied and handed to a background thread to write by default and large
+    populations can be saved as a stable sample with aggregates of every cell
+    """
+
+    def __init__(
+        self,
+        snapshot_format: Optional[str] = None,
+        background: Optional[bool] = None,
+        queue_size: Optional[int] = None,
+        policy: Optional[str] = None,
+        sample_size: Optional[int] = None,
+    ):
+        """
+        @param snapshot_format = "columnar", "delta", "sqlite" or "json"
+        @param background = whether to write on a background thread
+        @param queue_size = number of rounds that may wait for the thread
+        @param policy = "block", "drop" or "coalesce" once the queue is full
+        @param sample_size = number of cells to save each round, all if None
+        """
+        # configure parameters
+        if snapshot_format is None:
+            snapshot_format = constants.SNAPSHOT_FORMAT
+        if snapshot_format not in ("columnar", "delta", "sqlite", "json"):
+            raise ValueError(f"snapshot_format={snapshot_format} is not supported")
+        background = constants.SNAPSHOT_BACKGROUND if background is None else background
+        self.snapshot_format = snapshot_format
+        self.background = background
+        self.queue_size = queue_size
+        self.policy = policy
+        if sample_size is None:
+            sample_size = constants.SNAPSHOT_SAMPLE_SIZE
+        self.sample_size = sample_size
+        self.writer = None
+
+    def open(self, traits: List[str], overwrite: bool):
+        """
+        opens the writer for the chosen format and threading
+
+        @param traits = traits every cell in the run is scored on
+        @param overwrite = whether to overwrite existing data
+        """
+        if self.snapshot_format == "json":
+            self.writer = JsonSnapshotWriter(traits=traits, overwrite=overwrite)
+        elif self.snapshot_format == "delta":
+            self.writer = snapshot_delta.DeltaSnapshotWriter(
+                dirname=snapshot_store.get_store_dirname(
+                    dirname=constants.SNAPSHOT_DELTA_DIRNAME
+                ),
+                traits=traits,
+                overwrite=overwrite,
+            )
+        elif self.snapshot_format == "sqlite":
+            # the database keeps every run so there is nothing to overwrite
+            self.writer = snapshot_sqlite.SqliteSnapshotWriter(
+                filename=snapshot_sqlite.get_database_filename(), traits=traits
+            )
+        else:
+            self.writer = snapshot_store.SnapshotWriter(
+                dirname=snapshot_store.get_store_dirname(),
+                traits=traits,
+                overwrite=overwrite,
+            )
+        # sample the cells after summarizing them all
+        if self.sample_size is not None:
+            self.writer = SampledSnapshotWriter(
+                sink=self.writer, traits=traits, sample_size=self.sample_size
+            )
+        if self.background:
+            self.writer = snapshot_writer.BackgroundSnapshotWriter(
+                sink=self.writer, queue_size=self.queue_size, policy=self.policy
+            )
+
+    def write(self, state: engine.SimulationState, overwrite: bool):
+        """
+        writes a snapshot of the current round in the chosen format
+
+        @param state = state of the simulation
+        @param overwrite = whether to overwrite existing data
+        """
+        # open the writer on the first snapshot
+        if self.writer is None:
+            self.open(traits=state.cells.traits, overwrite=overwrite)
+        self.writer.append(
+            round_num=state.get_round_num(), columns=state.cells.get_columns()
+        )
+        # report how far behind the background thread is
+        if self.background:
+            state.timings["snapshot"] = self.writer.get_stats()
+
+    def on_start(self, state: engine.SimulationState):
+        self.write(state=state, overwrite=True)
+
+    def on_round(self, state: engine.SimulationState):
+        if state.get_n_cells() > 0:
+            self.write(state=state, overwrite=False)
+
+    def on_stop(self, state: engine.SimulationState):
+        if self.writer is None:
+            return
+        # flush every waiting round before the run ends
+        self.writer.close()
+        if self.background:
+            stats = self.writer.get_stats()
+            state.timings["snapshot"] = stats
+            logging.info(
+                f"wrote {stats['n_written']} snapshots averaging "
+                f"{stats['mean_write_seconds'] * 1000:.1f}ms, "
+                f"dropped {stats['n_dropped']} and coalesced {stats['n_coalesced']}"
+            )
+        self.writer = None
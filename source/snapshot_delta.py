@@ -0,0 +1,503 @@
+import os
+import json
+import numpy as np
+import source.constants as constants
+import source.snapshot_store as snapshot_store
+import source.genome_table as genome_table
+import source.store_index as store_index
+from typing import Dict, List, Optional, Union
+
+"""
+this file stores snapshots as periodic keyframes holding every cell with
+deltas in between holding only what changed since the round before, a delta
+lists the rows of the previous round that died, the rows of the survivors
+whose columns changed with their new values and the cells that were born,
+readers rebuild a round by replaying the deltas from the keyframe before it,
+genomes are interned into a genome table so only their ids appear in records
+"""
+
+# version of the delta store layout written to its metadata
+STORE_VERSION = 2
+# columns a delta records changes for, the ids of survivors never change
+_DELTA_COLUMNS = (
+    "parent_ids",
+    "positions",
+    "energies",
+    "radii",
+    "move_step_sizes",
+    "frames",
+    "scores",
+    "genome_ids",
+    "colors",
+)
+# columns holding strings rather than numbers
+_STRING_COLUMNS = ("colors",)
+# each index entry is round number, whether it is a keyframe, first byte
+# of the record and number of bytes of the record
+_INDEX_WIDTH = 4
+# names of the files in a store
+_RECORDS_FILENAME = "records.bin"
+_GENOMES_DIRNAME = "genomes"
+
+
+# serialize named arrays into one record
+def pack_arrays(arrays: Dict[str, np.array]) -> bytes:
+    """
+    packs arrays as a JSON header of their dtypes, shapes and offsets
+    followed by their raw bytes
+
+    @param arrays = map of name to array
+    @returns record = bytes holding every array
+    """
+    header = {}
+    chunks = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        header[name] = [array.dtype.str, list(array.shape), offset]
+        chunks.append(array.tobytes())
+        offset += array.nbytes
+    header = json.dumps(header, separators=(",", ":")).encode()
+    size = np.array([len(header)], dtype="<i4").tobytes()
+    return b"".join([size, header] + chunks)
+
+
+# deserialize a record into named arrays
+def unpack_arrays(record: np.array) -> Dict[str, np.array]:
+    """
+    unpacks a record created by pack_arrays without copying the arrays
+
+    @param record = uint8 array holding the record
+    @returns arrays = map of name to array
+    """
+    header_size = int(record[:4].view("<i4")[0])
+    header = json.loads(record[4 : 4 + header_size].tobytes())
+    data = record[4 + header_size :]
+    arrays = {}
+    for name, (dtype, shape, offset) in header.items():
+        dtype = np.dtype(dtype)
+        n_bytes = dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        arrays[name] = data[offset : offset + n_bytes].view(dtype).reshape(shape)
+    return arrays
+
+
+# convert a column into arrays for a record
+def encode_column(name: str, values: Union[np.array, list]) -> Dict[str, np.array]:
+    """
+    @param name = name of the column
+    @param values = values of the column
+    @returns arrays = the column as arrays
+    """
+    if name == "colors":
+        return {"colors": np.array([color.encode() for color in values], dtype="S16")}
+    return {name: np.asarray(values)}
+
+
+# convert arrays of a record back into a column
+def decode_column(name: str, arrays: Dict[str, np.array]) -> Union[np.array, list]:
+    """
+    @param name = name of the column
+    @param arrays = arrays of the record, see encode_column
+    @returns values = values of the column
+    """
+    if name == "colors":
+        return [color.decode() for color in arrays["colors"].tolist()]
+    return arrays[name]
+
+
+# find the rows whose values changed
+def calc_changed_rows(
+    old_values: Union[np.array, list], new_values: Union[np.array, list]
+) -> np.array:
+    """
+    compares two columns row by row treating nan as equal to nan
+
+    @param old_values = values before
+    @param new_values = values after
+    @returns rows = indices of the rows that changed
+    """
+    if isinstance(new_values, list):
+        return np.array(
+            [
+                row
+                for row, values in enumerate(zip(old_values, new_values))
+                if values[0] != values[1]
+            ],
+            dtype=np.int64,
+        )
+    # no rows can change when there are none
+    if len(new_values) == 0:
+        return np.zeros(shape=0, dtype=np.int64)
+    is_changed = old_values != new_values
+    if np.issubdtype(new_values.dtype, np.floating):
+        is_changed &= ~(np.isnan(old_values) & np.isnan(new_values))
+    is_changed = is_changed.reshape(len(new_values), -1).any(axis=1)
+    return np.flatnonzero(is_changed)
+
+
+# take rows of a column
+def take_rows(values: Union[np.array, list], rows: np.array) -> Union[np.array, list]:
+    """
+    @param values = values of the column
+    @param rows = indices of the rows to take
+    @returns the values of the given rows
+    """
+    if isinstance(values, list):
+        return [values[row] for row in rows.tolist()]
+    return values[rows]
+
+
+# define the delta snapshot writer class
+class DeltaSnapshotWriter:
+    def __init__(
+        self,
+        dirname: str,
+        traits: List[str],
+        overwrite: bool,
+        keyframe_interval: Optional[int] = None,
+    ):
+        """
+        @param dirname = full path of the store directory
+        @param traits = traits every cell in the run is scored on
+        @param overwrite = whether to remove a previous store first
+        @param keyframe_interval = rounds between keyframes defaults to constants
+        """
+        # configure parameters
+        if keyframe_interval is None:
+            keyframe_interval = constants.SNAPSHOT_KEYFRAME_INTERVAL
+        self.dirname = dirname
+        self.traits = list(traits)
+        self.keyframe_interval = keyframe_interval
+        # create the store or check it matches the traits
+        _ = store_index.open_meta(
+            dirname=dirname,
+            overwrite=overwrite,
+            meta={"version": STORE_VERSION, "traits": self.traits},
+            keys=("traits",),
+        )
+        # open the files for appending
+        self.genome_table = genome_table.GenomeTableWriter(
+            dirname=os.path.join(dirname, _GENOMES_DIRNAME), overwrite=False
+        )
+        index = read_index(dirname=dirname)
+        self.n_bytes = int(index[-1, 2] + index[-1, 3]) if len(index) > 0 else 0
+        self.records_file = store_index.open_data_file(
+            filename=os.path.join(dirname, _RECORDS_FILENAME), n_bytes=self.n_bytes
+        )
+        self.index_file = store_index.open_index_file(
+            dirname=dirname, width=_INDEX_WIDTH
+        )
+        # opened once a sampled round brings aggregates
+        self.aggregates_file = None
+        # the previous round, a reopened store starts with a keyframe
+        self.prev_columns = None
+        self.n_since_keyframe = 0
+        self.n_keyframe_bytes = 0
+        self.n_delta_bytes = 0
+
+    def append(self, round_num: int, columns: Dict[str, Union[np.array, list]]):
+        """
+        appends a round as a keyframe every keyframe_interval rounds and as a
+        delta against the previous round otherwise
+
+        @param round_num = round number of the snapshot
+        @param columns = columns of the living cells, see CellPopulation.get_columns
+        """
+        # intern the genomes, writing only the ones not seen before
+        columns = dict(columns)
+        columns["genome_ids"] = self.genome_table.intern(
+            genomes=columns["genomes"],
+            cell_ids=columns["ids"],
+            parent_ids=columns["parent_ids"],
+        )
+        columns = {
+            name: (
+                columns[name] if name in _STRING_COLUMNS else np.asarray(columns[name])
+            )
+            for name in ("ids",) + _DELTA_COLUMNS
+        }
+        arrays = None
+        if (
+            self.prev_columns is not None
+            and self.n_since_keyframe < self.keyframe_interval
+        ):
+            arrays = self.calc_delta(columns=columns)
+        # write a keyframe when it is time or the rows can not be matched
+        is_keyframe = arrays is None
+        if is_keyframe:
+            arrays = {}
+            for name, values in columns.items():
+                arrays.update(encode_column(name=name, values=values))
+            self.n_since_keyframe = 0
+        self.n_since_keyframe += 1
+        self.write(round_num=round_num, is_keyframe=is_keyframe, arrays=arrays)
+        self.prev_columns = columns
+
+    def calc_delta(
+        self, columns: Dict[str, Union[np.array, list]]
+    ) -> Optional[Dict[str, np.array]]:
+        """
+        finds the deaths, the changed values of the survivors and the births
+
+        @param columns = columns of the living cells
+        @returns arrays = the delta as arrays or None if the survivors are
+            not in the same order followed by the births
+        """
+        prev_ids = self.prev_columns["ids"]
+        ids = columns["ids"]
+        # the survivors must keep their order and come before the births
+        is_alive = np.isin(prev_ids, ids)
+        n_alive = int(is_alive.sum())
+        if not np.array_equal(prev_ids[is_alive], ids[:n_alive]):
+            return None
+        if np.isin(ids[n_alive:], prev_ids).any():
+            return None
+        alive_rows = np.flatnonzero(is_alive)
+        arrays = {"dead_rows": np.flatnonzero(~is_alive).astype("<i4")}
+        # record the changed values of the survivors
+        for name in _DELTA_COLUMNS:
+            old_values = take_rows(values=self.prev_columns[name], rows=alive_rows)
+            new_values = take_rows(values=columns[name], rows=np.arange(n_alive))
+            rows = calc_changed_rows(old_values=old_values, new_values=new_values)
+            if len(rows) == 0:
+                continue
+            # columns that changed for every survivor need no rows
+            if len(rows) < n_alive:
+                arrays[f"{name}_rows"] = rows.astype("<i4")
+                new_values = take_rows(values=new_values, rows=rows)
+            for key, array in encode_column(name=name, values=new_values).items():
+                arrays[f"changed_{key}"] = array
+        # record the births in full
+        born_rows = np.arange(n_alive, len(ids))
+        if len(born_rows) > 0:
+            for name in ("ids",) + _DELTA_COLUMNS:
+                values = take_rows(values=columns[name], rows=born_rows)
+                for key, array in encode_column(name=name, values=values).items():
+                    arrays[f"born_{key}"] = array
+        return arrays
+
+    def write(self, round_num: int, is_keyframe: bool, arrays: Dict[str, np.array]):
+        """
+        appends a record then commits it to the index
+
+        @param round_num = round number of the snapshot
+        @param is_keyframe = whether the record holds every cell
+        @param arrays = arrays of the record
+        """
+        record = pack_arrays(arrays=arrays)
+        store_index.write_data(f=self.records_file, data=record)
+        store_index.write_entry(
+            f=self.index_file,
+            entry=[round_num, int(is_keyframe), self.n_bytes, len(record)],
+        )
+        self.n_bytes += len(record)
+        if is_keyframe:
+            self.n_keyframe_bytes += len(record)
+        else:
+            self.n_delta_bytes += len(record)
+
+    def append_aggregates(self, round_num: int, aggregates: dict):
+        """
+        appends the aggregates of a round to the store's JSON lines file
+
+        @param round_num = round number of the snapshot
+        @param aggregates = aggregates over every cell, see snapshot.calc_aggregates
+        """
+        if self.aggregates_file is None:
+            self.aggregates_file = open(
+                os.path.join(self.dirname, constants.SNAPSHOT_AGGREGATES_FILENAME), "at"
+            )
+        store_index.write_json_line(
+            f=self.aggregates_file, value=dict(aggregates, round_num=round_num)
+        )
+
+    def close(self):
+        """
+        closes every file of the store
+        """
+        self.genome_table.close()
+        self.records_file.close()
+        self.index_file.close()
+        if self.aggregates_file is not None:
+            self.aggregates_file.close()
+
+
+# read the round index of a store
+def read_index(dirname: str) -> np.array:
+    """
+    reads every complete index entry of a store
+
+    @param dirname = full path of the store directory
+    @returns index = (n_rounds x 4) round number, whether it is a keyframe,
+        first byte and number of bytes of each record
+    """
+    return store_index.read_index(dirname=dirname, width=_INDEX_WIDTH)
+
+
+# define the delta snapshot reader class
+class DeltaSnapshotReader:
+    def __init__(self, dirname: str):
+        """
+        @param dirname = full path of the store directory
+        """
+        self.dirname = dirname
+        self.refresh()
+
+    def refresh(self):
+        """
+        maps the store again to pick up rounds appended since it was opened
+        """
+        self.traits = store_index.read_meta(dirname=self.dirname)["traits"]
+        self.index = read_index(dirname=self.dirname)
+        self.round2entry = {
+            round_num: idx for idx, round_num in enumerate(self.index[:, 0].tolist())
+        }
+        # the keyframe each entry replays from
+        keyframe_entries = np.where(
+            self.index[:, 1] == 1, np.arange(len(self.index)), 0
+        )
+        self.keyframe_entries = np.maximum.accumulate(keyframe_entries)
+        self.genome_table = genome_table.GenomeTableReader(
+            dirname=os.path.join(self.dirname, _GENOMES_DIRNAME)
+        )
+        self.records = snapshot_store.map_rows(
+            filename=os.path.join(self.dirname, _RECORDS_FILENAME),
+            dtype="u1",
+            shape=(),
+        )
+        # the last round rebuilt so reading rounds in order replays one delta
+        self.cached_entry = None
+        self.cached_columns = None
+
+    # get functions
+    def get_rounds(self) -> List[int]:
+        """
+        @returns round numbers stored in the order they were written
+        """
+        return self.index[:, 0].tolist()
+
+    def get_keyframe_rounds(self) -> List[int]:
+        """
+        @returns round numbers stored as keyframes
+        """
+        return self.index[self.index[:, 1] == 1, 0].tolist()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    # read functions
+    def read_record(self, entry: int) -> Dict[str, np.array]:
+        """
+        @param entry = position of the record in the index
+        @returns arrays = arrays of the record
+        """
+        _, _, start, size = self.index[entry].tolist()
+        return unpack_arrays(record=self.records[start : start + size])
+
+    def read_round(self, round_num: int) -> Dict[str, Union[np.array, list]]:
+        """
+        rebuilds a round by replaying the deltas after its keyframe
+
+        @param round_num = round number of the snapshot
+        @returns columns = columns of the cells and their genomes
+        """
+        if round_num not in self.round2entry:
+            raise KeyError(f"round_num={round_num} is not in the store")
+        entry = self.round2entry[round_num]
+        keyframe_entry = int(self.keyframe_entries[entry])
+        # continue from the cached round when it lies on the way
+        if (
+            self.cached_entry is not None
+            and keyframe_entry <= self.cached_entry <= entry
+        ):
+            columns = self.cached_columns
+            start_entry = self.cached_entry + 1
+        else:
+            arrays = self.read_record(entry=keyframe_entry)
+            columns = {
+                name: decode_column(name=name, arrays=arrays)
+                for name in ("ids",) + _DELTA_COLUMNS
+            }
+            start_entry = keyframe_entry + 1
+        for delta_entry in range(start_entry, entry + 1):
+            columns = apply_delta(
+                columns=columns, arrays=self.read_record(entry=delta_entry)
+            )
+        self.cached_entry = entry
+        self.cached_columns = columns
+        # hand out copies so the cache can not be changed
+        columns = {
+            name: list(values) if name in _STRING_COLUMNS else np.array(values)
+            for name, values in columns.items()
+        }
+        columns["genomes"] = self.genome_table.get_genomes(columns["genome_ids"])
+        columns["genome_sizes"] = np.array(
+            [len(genome) for genome in columns["genomes"]], dtype=np.int64
+        )
+        return columns
+
+    def read_aggregates(self) -> List[dict]:
+        """
+        @returns aggregates = aggregates over every cell of each sampled round
+        """
+        return store_index.read_json_lines(
+            filename=os.path.join(self.dirname, constants.SNAPSHOT_AGGREGATES_FILENAME)
+        )
+
+    def read_snaps(self, round_num: int) -> Dict[int, dict]:
+        """
+        reads one round as the cell snaps that take_snapshot writes as JSON
+
+        @param round_num = round number of the snapshot
+        @returns cell_snaps = map of cell id to its snap
+        """
+        columns = self.read_round(round_num=round_num)
+        return snapshot_store.get_snaps(columns=columns, traits=self.traits)
+
+
+# replay a delta
+def apply_delta(
+    columns: Dict[str, Union[np.array, list]], arrays: Dict[str, np.array]
+) -> Dict[str, Union[np.array, list]]:
+    """
+    applies the deaths, changes and births of a delta to the previous round
+
+    @param columns = columns of the previous round
+    @param arrays = arrays of the delta record
+    @returns columns = columns of the round the delta was taken at
+    """
+    # remove the dead
+    is_alive = np.ones(shape=len(columns["ids"]), dtype=bool)
+    is_alive[arrays["dead_rows"]] = False
+    alive_rows = np.flatnonzero(is_alive)
+    new_columns = {
+        name: take_rows(values=values, rows=alive_rows)
+        for name, values in columns.items()
+    }
+    # change the survivors
+    for name in _DELTA_COLUMNS:
+        if f"changed_{name}" not in arrays:
+            continue
+        values = decode_column(name=name, arrays={name: arrays[f"changed_{name}"]})
+        rows = arrays.get(f"{name}_rows")
+        if rows is None:
+            new_columns[name] = values
+        elif name in _STRING_COLUMNS:
+            for row, value in zip(rows.tolist(), values):
+                new_columns[name][row] = value
+        else:
+            new_columns[name][rows] = values
+    # append the born
+    if "born_ids" in arrays:
+        born_arrays = {
+            key[len("born_") :]: array
+            for key, array in arrays.items()
+            if key.startswith("born_")
+        }
+        for name in ("ids",) + _DELTA_COLUMNS:
+            born_values = decode_column(name=name, arrays=born_arrays)
+            if name in _STRING_COLUMNS:
+                new_columns[name] = new_columns[name] + born_values
+            else:
+                new_columns[name] = np.concatenate([new_columns[name], born_values])
+    return new_columns
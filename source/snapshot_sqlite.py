@@ -0,0 +1,412 @@
+import os
+import json
+import time
+import sqlite3
+import numpy as np
+import source.constants as constants
+import source.utils as utils
+import source.snapshot_store as snapshot_store
+from typing import Dict, List, Optional, Tuple, Union
+
+"""
+this file writes snapshots into a SQLite database for analysis, every run
+gets a row in runs and each round adds a row to rounds, a row per cell to
+cells, a row per cell and trait to trait_scores and a row per trait to
+round_trait_scores in one transaction using executemany, the tables are keyed
+so per round and per trait queries read only the rows they need instead of
+rescanning every snapshot, sampled runs add the aggregates over every cell
+to round_aggregates
+"""
+
+# tables and indices of the database
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    traits TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    run_id INTEGER NOT NULL,
+    round_num INTEGER NOT NULL,
+    n_cells INTEGER NOT NULL,
+    mean_energy REAL,
+    PRIMARY KEY (run_id, round_num)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS genomes (
+    run_id INTEGER NOT NULL,
+    genome_id INTEGER NOT NULL,
+    genome TEXT NOT NULL,
+    PRIMARY KEY (run_id, genome_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS cells (
+    run_id INTEGER NOT NULL,
+    round_num INTEGER NOT NULL,
+    cell_id INTEGER NOT NULL,
+    parent_id INTEGER NOT NULL,
+    x REAL NOT NULL,
+    y REAL NOT NULL,
+    energy REAL NOT NULL,
+    radius REAL NOT NULL,
+    move_step_size REAL NOT NULL,
+    genome_id INTEGER NOT NULL,
+    color TEXT NOT NULL,
+    PRIMARY KEY (run_id, round_num, cell_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cells_by_cell ON cells (run_id, cell_id, round_num);
+CREATE TABLE IF NOT EXISTS trait_scores (
+    run_id INTEGER NOT NULL,
+    trait TEXT NOT NULL,
+    round_num INTEGER NOT NULL,
+    cell_id INTEGER NOT NULL,
+    score REAL,
+    frame_start INTEGER NOT NULL,
+    frame_end INTEGER NOT NULL,
+    PRIMARY KEY (run_id, trait, round_num, cell_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trait_scores_by_score
+    ON trait_scores (run_id, trait, round_num, score);
+CREATE TABLE IF NOT EXISTS round_trait_scores (
+    run_id INTEGER NOT NULL,
+    trait TEXT NOT NULL,
+    round_num INTEGER NOT NULL,
+    mean_score REAL,
+    min_score REAL,
+    max_score REAL,
+    PRIMARY KEY (run_id, trait, round_num)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS round_aggregates (
+    run_id INTEGER NOT NULL,
+    round_num INTEGER NOT NULL,
+    n_cells INTEGER NOT NULL,
+    n_sampled INTEGER NOT NULL,
+    aggregates TEXT NOT NULL,
+    PRIMARY KEY (run_id, round_num)
+) WITHOUT ROWID;
+"""
+
+
+# find the database file
+def get_database_filename(filename: Optional[str] = None) -> str:
+    """
+    constructs the database filename inside the snapshot directory
+
+    @param filename = name of the database file defaults to constants
+    @returns filename = full path of the database file
+    """
+    # configure parameters
+    filename = constants.SNAPSHOT_SQLITE_FILENAME if filename is None else filename
+    # replace current directory with ideal
+    file_dir = os.path.dirname(os.path.abspath(__file__))
+    snapshot_dir = os.path.join(os.path.dirname(file_dir), constants.SNAPSHOT_DIRNAME)
+    _ = utils.create_dir_if_none(dirname=snapshot_dir, overwrite=False)
+    return os.path.join(snapshot_dir, filename)
+
+
+# open a database
+def connect(filename: str) -> sqlite3.Connection:
+    """
+    opens the database in WAL mode creating its tables if needed, the
+    connection may be handed to the snapshot writer thread
+
+    @param filename = full path of the database file
+    @returns connection = connection to the database
+    """
+    connection = sqlite3.connect(filename, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+# define the SQLite snapshot writer class
+class SqliteSnapshotWriter:
+    def __init__(self, filename: str, traits: List[str]):
+        """
+        @param filename = full path of the database file
+        @param traits = traits every cell in the run is scored on
+        """
+        self.filename = filename
+        self.traits = list(traits)
+        self.connection = connect(filename=filename)
+        # every writer records a new run
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (started_at, traits) VALUES (?, ?)",
+                (time.time(), json.dumps(self.traits)),
+            )
+        self.run_id = cursor.lastrowid
+        # genomes already written for this run
+        self.genome2id = {}
+
+    def append(self, round_num: int, columns: Dict[str, Union[np.array, list]]):
+        """
+        inserts the cells of one round in a single transaction
+
+        @param round_num = round number of the snapshot
+        @param columns = columns of the living cells, see CellPopulation.get_columns
+        """
+        n_cells = len(columns["ids"])
+        run_ids = [self.run_id] * n_cells
+        round_nums = [round_num] * n_cells
+        cell_ids = np.asarray(columns["ids"]).tolist()
+        # give each genome its id, keeping the new ones to insert
+        genome_ids = []
+        genome_rows = []
+        for genome in columns["genomes"]:
+            genome_id = self.genome2id.get(genome)
+            if genome_id is None:
+                genome_id = len(self.genome2id)
+                self.genome2id[genome] = genome_id
+                genome_rows.append((self.run_id, genome_id, genome))
+            genome_ids.append(genome_id)
+        # gather the rows column by column
+        positions = np.asarray(columns["positions"])
+        energies = np.asarray(columns["energies"])
+        cell_rows = zip(
+            run_ids,
+            round_nums,
+            cell_ids,
+            np.asarray(columns["parent_ids"]).tolist(),
+            positions[:, 0].tolist(),
+            positions[:, 1].tolist(),
+            energies.tolist(),
+            np.asarray(columns["radii"]).tolist(),
+            np.asarray(columns["move_step_sizes"]).tolist(),
+            genome_ids,
+            columns["colors"],
+        )
+        scores = np.asarray(columns["scores"], dtype=float)
+        frames = np.asarray(columns["frames"])
+        mean_energy = float(energies.mean()) if n_cells > 0 else None
+        # summarize each trait so per round trends need no scan of the cells
+        trait_rows = []
+        for trait_idx, trait in enumerate(self.traits):
+            trait_scores = scores[:, trait_idx]
+            trait_scores = trait_scores[~np.isnan(trait_scores)]
+            summary = [None] * 3
+            if len(trait_scores) > 0:
+                summary = [
+                    float(trait_scores.mean()),
+                    float(trait_scores.min()),
+                    float(trait_scores.max()),
+                ]
+            trait_rows.append((self.run_id, trait, round_num, *summary))
+        # write the round in one transaction
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO rounds VALUES (?, ?, ?, ?)",
+                (self.run_id, round_num, n_cells, mean_energy),
+            )
+            self.connection.executemany(
+                "INSERT INTO genomes VALUES (?, ?, ?)", genome_rows
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO round_trait_scores VALUES (?, ?, ?, ?, ?, ?)",
+                trait_rows,
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                cell_rows,
+            )
+            for trait_idx, trait in enumerate(self.traits):
+                # nan scores are stored as NULL
+                trait_scores = [
+                    None if np.isnan(score) else score
+                    for score in scores[:, trait_idx].tolist()
+                ]
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO trait_scores VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    zip(
+                        run_ids,
+                        [trait] * n_cells,
+                        round_nums,
+                        cell_ids,
+                        trait_scores,
+                        frames[:, trait_idx, 0].tolist(),
+                        frames[:, trait_idx, 1].tolist(),
+                    ),
+                )
+
+    def append_aggregates(self, round_num: int, aggregates: dict):
+        """
+        inserts the aggregates of a round
+
+        @param round_num = round number of the snapshot
+        @param aggregates = aggregates over every cell, see snapshot.calc_aggregates
+        """
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO round_aggregates VALUES (?, ?, ?, ?, ?)",
+                (
+                    self.run_id,
+                    round_num,
+                    aggregates["n_cells"],
+                    aggregates["n_sampled"],
+                    json.dumps(dict(aggregates, round_num=round_num)),
+                ),
+            )
+
+    def close(self):
+        """
+        closes the database
+        """
+        self.connection.close()
+
+
+# define the SQLite snapshot reader class
+class SqliteSnapshotReader:
+    def __init__(self, filename: str):
+        """
+        @param filename = full path of the database file
+        """
+        self.filename = filename
+        self.connection = connect(filename=filename)
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """
+        @param sql = query to run
+        @param params = values of the query placeholders
+        @returns rows = every row the query returns
+        """
+        return self.connection.execute(sql, params).fetchall()
+
+    # get functions
+    def get_runs(self) -> List[int]:
+        """
+        @returns ids of the runs in the order they started
+        """
+        return [row[0] for row in self.query("SELECT run_id FROM runs ORDER BY run_id")]
+
+    def get_traits(self, run_id: int) -> List[str]:
+        """
+        @param run_id = id of the run
+        @returns traits the cells of the run are scored on
+        """
+        rows = self.query("SELECT traits FROM runs WHERE run_id = ?", (run_id,))
+        return json.loads(rows[0][0])
+
+    def get_rounds(self, run_id: int) -> List[int]:
+        """
+        @param run_id = id of the run
+        @returns round numbers stored for the run in order
+        """
+        rows = self.query(
+            "SELECT round_num FROM rounds WHERE run_id = ? ORDER BY round_num",
+            (run_id,),
+        )
+        return [row[0] for row in rows]
+
+    def get_aggregates(self, run_id: int) -> List[dict]:
+        """
+        @param run_id = id of the run
+        @returns aggregates = aggregates over every cell of each sampled round
+        """
+        rows = self.query(
+            "SELECT aggregates FROM round_aggregates WHERE run_id = ? "
+            "ORDER BY round_num",
+            (run_id,),
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    # analysis functions
+    def calc_mean_trait_scores(
+        self, run_id: int, trait: str
+    ) -> Tuple[np.array, np.array]:
+        """
+        @param run_id = id of the run
+        @param trait = trait to average
+        @returns round_nums = (n_rounds) round numbers
+        @returns mean_scores = (n_rounds) mean score of the trait each round
+        """
+        rows = self.query(
+            "SELECT round_num, mean_score FROM round_trait_scores "
+            "WHERE run_id = ? AND trait = ? ORDER BY round_num",
+            (run_id, trait),
+        )
+        round_nums = np.array([row[0] for row in rows], dtype=np.int64)
+        mean_scores = np.array([row[1] for row in rows], dtype=float)
+        return (round_nums, mean_scores)
+
+    def get_cells_above(
+        self, run_id: int, round_num: int, trait: str, min_score: float
+    ) -> List[int]:
+        """
+        @param run_id = id of the run
+        @param round_num = round number of the snapshot
+        @param trait = trait to filter on
+        @param min_score = score the trait must be above
+        @returns cell_ids = ids of the cells scoring above min_score
+        """
+        rows = self.query(
+            "SELECT cell_id FROM trait_scores WHERE run_id = ? AND trait = ? "
+            "AND round_num = ? AND score > ? ORDER BY cell_id",
+            (run_id, trait, round_num, min_score),
+        )
+        return [row[0] for row in rows]
+
+    # read functions
+    def read_round(
+        self, run_id: int, round_num: int
+    ) -> Dict[str, Union[np.array, list]]:
+        """
+        @param run_id = id of the run
+        @param round_num = round number of the snapshot
+        @returns columns = columns of the cells ordered by cell id
+        """
+        traits = self.get_traits(run_id=run_id)
+        rows = self.query(
+            "SELECT cells.cell_id, parent_id, x, y, energy, radius, move_step_size, "
+            "cells.genome_id, genome, color FROM cells JOIN genomes "
+            "ON cells.run_id = genomes.run_id AND cells.genome_id = genomes.genome_id "
+            "WHERE cells.run_id = ? AND round_num = ? ORDER BY cells.cell_id",
+            (run_id, round_num),
+        )
+        columns = {
+            "ids": np.array([row[0] for row in rows], dtype=np.int64),
+            "parent_ids": np.array([row[1] for row in rows], dtype=np.int64),
+            "positions": np.array([row[2:4] for row in rows], dtype=float).reshape(
+                -1, 2
+            ),
+            "energies": np.array([row[4] for row in rows], dtype=float),
+            "radii": np.array([row[5] for row in rows], dtype=float),
+            "move_step_sizes": np.array([row[6] for row in rows], dtype=float),
+            "genome_ids": np.array([row[7] for row in rows], dtype=np.int64),
+            "genomes": [row[8] for row in rows],
+            "colors": [row[9] for row in rows],
+        }
+        # gather the trait scores and frames in trait order
+        n_cells = len(rows)
+        columns["scores"] = np.full(shape=(n_cells, len(traits)), fill_value=np.nan)
+        columns["frames"] = np.zeros(shape=(n_cells, len(traits), 2), dtype=np.int64)
+        for trait_idx, trait in enumerate(traits):
+            trait_rows = self.query(
+                "SELECT score, frame_start, frame_end FROM trait_scores "
+                "WHERE run_id = ? AND trait = ? AND round_num = ? ORDER BY cell_id",
+                (run_id, trait, round_num),
+            )
+            if len(trait_rows) == 0:
+                continue
+            columns["scores"][:, trait_idx] = [
+                np.nan if row[0] is None else row[0] for row in trait_rows
+            ]
+            columns["frames"][:, trait_idx] = [row[1:] for row in trait_rows]
+        return columns
+
+    def read_snaps(self, run_id: int, round_num: int) -> Dict[int, dict]:
+        """
+        reads one round as the cell snaps that take_snapshot writes as JSON
+
+        @param run_id = id of the run
+        @param round_num = round number of the snapshot
+        @returns cell_snaps = map of cell id to its snap
+        """
+        columns = self.read_round(run_id=run_id, round_num=round_num)
+        return snapshot_store.get_snaps(
+            columns=columns, traits=self.get_traits(run_id=run_id)
+        )
+
+    def close(self):
+        """
+        closes the database
+        """
+        self.connection.close()
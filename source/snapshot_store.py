@@ -0,0 +1,312 @@
+import os
+import numpy as np
+import source.constants as constants
+import source.utils as utils
+import source.genome_table as genome_table
+import source.store_index as store_index
+from typing import Dict, List, Optional, Union
+
+"""
+this file keeps every snapshot of a run in one append only columnar store,
+each numeric column is a file of fixed width rows, the genomes are interned
+into a genome table with each cell storing its genome id and an index file
+maps each round to its rows so a reader memory maps the columns and slices
+any round without parsing the rounds before it
+"""
+
+# version of the store layout written to its metadata
+STORE_VERSION = 2
+# numeric columns and the per row shape of each given the number of traits
+_COLUMN_SHAPES = {
+    "ids": lambda n_traits: (),
+    "parent_ids": lambda n_traits: (),
+    "positions": lambda n_traits: (2,),
+    "energies": lambda n_traits: (),
+    "radii": lambda n_traits: (),
+    "move_step_sizes": lambda n_traits: (),
+    "frames": lambda n_traits: (n_traits, 2),
+    "scores": lambda n_traits: (n_traits,),
+    "genome_ids": lambda n_traits: (),
+    "genome_sizes": lambda n_traits: (),
+    "colors": lambda n_traits: (),
+}
+_COLUMN_DTYPES = {
+    "ids": "<i8",
+    "parent_ids": "<i8",
+    "positions": "<f8",
+    "energies": "<f8",
+    "radii": "<f8",
+    "move_step_sizes": "<f8",
+    "frames": "<i8",
+    "scores": "<f8",
+    "genome_ids": "<i8",
+    "genome_sizes": "<i8",
+    "colors": "S16",
+}
+# each index entry is round number, first row and number of rows
+_INDEX_WIDTH = 3
+# name of the genome table in a store
+_GENOMES_DIRNAME = "genomes"
+
+
+# find the directory the store lives in
+def get_store_dirname(dirname: Optional[str] = None) -> str:
+    """
+    constructs the store directory inside the snapshot directory
+
+    @param dirname = name of the store directory defaults to constants
+    @returns dirname = full path of the store directory
+    """
+    # configure parameters
+    dirname = constants.SNAPSHOT_STORE_DIRNAME if dirname is None else dirname
+    # replace current directory with ideal
+    file_dir = os.path.dirname(os.path.abspath(__file__))
+    snapshot_dir = os.path.join(os.path.dirname(file_dir), constants.SNAPSHOT_DIRNAME)
+    _ = utils.create_dir_if_none(dirname=snapshot_dir, overwrite=False)
+    return os.path.join(snapshot_dir, dirname)
+
+
+# retrieve the filename of a column
+def get_column_filename(dirname: str, name: str) -> str:
+    """
+    @param dirname = full path of the store directory
+    @param name = name of the column
+    @returns filename = file holding the column
+    """
+    return os.path.join(dirname, f"{name}.bin")
+
+
+# define the snapshot writer class
+class SnapshotWriter:
+    def __init__(self, dirname: str, traits: List[str], overwrite: bool):
+        """
+        @param dirname = full path of the store directory
+        @param traits = traits every cell in the run is scored on
+        @param overwrite = whether to remove a previous store first
+        """
+        self.dirname = dirname
+        self.traits = list(traits)
+        # create the store or check it matches the traits
+        _ = store_index.open_meta(
+            dirname=dirname,
+            overwrite=overwrite,
+            meta={"version": STORE_VERSION, "traits": self.traits},
+            keys=("traits",),
+        )
+        # continue after any rows already in the store
+        index = read_index(dirname=dirname)
+        self.n_rows = int(index[-1, 1] + index[-1, 2]) if len(index) > 0 else 0
+        # open every file for appending after the committed rows
+        self.column_files = {}
+        for name, get_shape in _COLUMN_SHAPES.items():
+            row_size = np.dtype(_COLUMN_DTYPES[name]).itemsize * int(
+                np.prod(get_shape(len(self.traits)), dtype=np.int64)
+            )
+            self.column_files[name] = store_index.open_data_file(
+                filename=get_column_filename(dirname=dirname, name=name),
+                n_bytes=self.n_rows * row_size,
+            )
+        self.genome_table = genome_table.GenomeTableWriter(
+            dirname=os.path.join(dirname, _GENOMES_DIRNAME), overwrite=False
+        )
+        self.index_file = store_index.open_index_file(
+            dirname=dirname, width=_INDEX_WIDTH
+        )
+        # opened once a sampled round brings aggregates
+        self.aggregates_file = None
+
+    def append(self, round_num: int, columns: Dict[str, Union[np.array, list]]):
+        """
+        appends the cells of one round, every column is written in bulk and
+        the index entry goes last so readers never see a partial round
+
+        @param round_num = round number of the snapshot
+        @param columns = columns of the living cells, see CellPopulation.get_columns
+        """
+        n_rows = len(columns["ids"])
+        n_traits = len(self.traits)
+        # intern the genomes, writing only the ones not seen before
+        values = dict(columns)
+        values["genome_ids"] = self.genome_table.intern(
+            genomes=columns["genomes"],
+            cell_ids=columns["ids"],
+            parent_ids=columns["parent_ids"],
+        )
+        values["genome_sizes"] = [len(genome) for genome in columns["genomes"]]
+        values["colors"] = [color.encode() for color in columns["colors"]]
+        # write each column as fixed width rows
+        for name, f in self.column_files.items():
+            shape = (n_rows,) + _COLUMN_SHAPES[name](n_traits)
+            column = np.asarray(values[name], dtype=_COLUMN_DTYPES[name])
+            store_index.write_data(f=f, data=column.reshape(shape).tobytes())
+        # commit the round to the index
+        store_index.write_entry(
+            f=self.index_file, entry=[round_num, self.n_rows, n_rows]
+        )
+        self.n_rows += n_rows
+
+    def append_aggregates(self, round_num: int, aggregates: dict):
+        """
+        appends the aggregates of a round to the store's JSON lines file
+
+        @param round_num = round number of the snapshot
+        @param aggregates = aggregates over every cell, see snapshot.calc_aggregates
+        """
+        if self.aggregates_file is None:
+            self.aggregates_file = open(
+                os.path.join(self.dirname, constants.SNAPSHOT_AGGREGATES_FILENAME), "at"
+            )
+        store_index.write_json_line(
+            f=self.aggregates_file, value=dict(aggregates, round_num=round_num)
+        )
+
+    def close(self):
+        """
+        closes every file of the store
+        """
+        for f in self.column_files.values():
+            f.close()
+        self.genome_table.close()
+        self.index_file.close()
+        if self.aggregates_file is not None:
+            self.aggregates_file.close()
+
+
+# read the round index of a store
+def read_index(dirname: str) -> np.array:
+    """
+    reads every complete index entry of a store
+
+    @param dirname = full path of the store directory
+    @returns index = (n_rounds x 3) round number, first row and number of
+        rows of each round
+    """
+    return store_index.read_index(dirname=dirname, width=_INDEX_WIDTH)
+
+
+# memory map a file of fixed width rows
+def map_rows(filename: str, dtype: str, shape: tuple) -> np.array:
+    """
+    memory maps the complete rows of a file read only
+
+    @param filename = file holding the rows
+    @param dtype = dtype of the values
+    @param shape = shape of each row
+    @returns rows = (n_rows x shape) memory mapped array
+    """
+    row_size = np.dtype(dtype).itemsize * int(np.prod(shape, dtype=np.int64))
+    n_rows = os.path.getsize(filename) // row_size if row_size > 0 else 0
+    # empty files can not be memory mapped
+    if n_rows == 0:
+        return np.zeros(shape=(0,) + shape, dtype=dtype)
+    return np.memmap(filename, dtype=dtype, mode="r", shape=(n_rows,) + shape)
+
+
+# define the snapshot reader class
+class SnapshotReader:
+    def __init__(self, dirname: str):
+        """
+        @param dirname = full path of the store directory
+        """
+        self.dirname = dirname
+        self.refresh()
+
+    def refresh(self):
+        """
+        maps the store again to pick up rounds appended since it was opened
+        """
+        self.traits = store_index.read_meta(dirname=self.dirname)["traits"]
+        n_traits = len(self.traits)
+        # map the index and columns
+        self.index = read_index(dirname=self.dirname)
+        self.round2entry = {
+            round_num: idx for idx, round_num in enumerate(self.index[:, 0].tolist())
+        }
+        self.columns = {
+            name: map_rows(
+                filename=get_column_filename(dirname=self.dirname, name=name),
+                dtype=_COLUMN_DTYPES[name],
+                shape=get_shape(n_traits),
+            )
+            for name, get_shape in _COLUMN_SHAPES.items()
+        }
+        self.genome_table = genome_table.GenomeTableReader(
+            dirname=os.path.join(self.dirname, _GENOMES_DIRNAME)
+        )
+
+    # get functions
+    def get_rounds(self) -> List[int]:
+        """
+        @returns round numbers stored in the order they were written
+        """
+        return self.index[:, 0].tolist()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    # read functions
+    def read_round(self, round_num: int) -> Dict[str, Union[np.array, list]]:
+        """
+        reads the cells of one round without touching any other round
+
+        @param round_num = round number of the snapshot
+        @returns columns = memory mapped columns of the cells and their genomes
+        """
+        if round_num not in self.round2entry:
+            raise KeyError(f"round_num={round_num} is not in the store")
+        _, row_start, n_rows = self.index[self.round2entry[round_num]].tolist()
+        # slice every column
+        columns = {
+            name: column[row_start : row_start + n_rows]
+            for name, column in self.columns.items()
+        }
+        # look up the genomes in the genome table
+        columns["genomes"] = self.genome_table.get_genomes(columns["genome_ids"])
+        columns["colors"] = [color.decode() for color in columns["colors"].tolist()]
+        return columns
+
+    def read_aggregates(self) -> List[dict]:
+        """
+        @returns aggregates = aggregates over every cell of each sampled round
+        """
+        return store_index.read_json_lines(
+            filename=os.path.join(self.dirname, constants.SNAPSHOT_AGGREGATES_FILENAME)
+        )
+
+    def read_snaps(self, round_num: int) -> Dict[int, dict]:
+        """
+        reads one round as the cell snaps that take_snapshot writes as JSON
+
+        @param round_num = round number of the snapshot
+        @returns cell_snaps = map of cell id to its snap
+        """
+        columns = self.read_round(round_num=round_num)
+        return get_snaps(columns=columns, traits=self.traits)
+
+
+# convert columns to cell snaps
+def get_snaps(
+    columns: Dict[str, Union[np.array, list]], traits: List[str]
+) -> Dict[int, dict]:
+    """
+    converts the columns of a round into the snaps Cell.get_snap creates
+
+    @param columns = columns of the cells, see CellPopulation.get_columns
+    @param traits = traits the cells are scored on in column order
+    @returns cell_snaps = map of cell id to its snap
+    """
+    cell_snaps = {}
+    for row, cell_id in enumerate(np.asarray(columns["ids"]).tolist()):
+        genome = columns["genomes"][row]
+        cell_snap = {}
+        cell_snap["genome"] = genome
+        cell_snap["genome_size"] = len(genome)
+        cell_snap["color"] = columns["colors"][row]
+        cell_snap["radius"] = float(columns["radii"][row])
+        cell_snap["position"] = columns["positions"][row].tolist()
+        cell_snap["move_step_size"] = float(columns["move_step_sizes"][row])
+        cell_snap["traits"] = list(traits)
+        cell_snap["trait_frames"] = dict(zip(traits, columns["frames"][row].tolist()))
+        cell_snap["trait_scores"] = dict(zip(traits, columns["scores"][row].tolist()))
+        cell_snaps[cell_id] = cell_snap
+    return cell_snaps
@@ -0,0 +1,168 @@
+import time
+import logging
+import threading
+import collections
+import numpy as np
+import source.constants as constants
+from typing import Dict, Optional, Union
+
+"""
+this file moves snapshot writing off the simulation loop, each round hands
+a copy of its columns to a bounded queue and a writer thread appends them to
+the snapshot sink, when the queue is full the round either waits for room
+(block), is thrown away (drop) or replaces the newest waiting round (coalesce)
+"""
+
+# policies for a full queue
+QUEUE_POLICIES = ("block", "drop", "coalesce")
+
+
+# define the background snapshot writer class
+class BackgroundSnapshotWriter:
+    def __init__(
+        self,
+        sink,
+        queue_size: Optional[int] = None,
+        policy: Optional[str] = None,
+    ):
+        """
+        @param sink = writer with append(round_num, columns) and close()
+        @param queue_size = number of rounds that may wait defaults to constants
+        @param policy = what to do when the queue is full defaults to constants
+        """
+        # configure parameters
+        queue_size = constants.SNAPSHOT_QUEUE_SIZE if queue_size is None else queue_size
+        policy = constants.SNAPSHOT_QUEUE_POLICY if policy is None else policy
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"policy={policy} is not one of {QUEUE_POLICIES}")
+        if queue_size < 1:
+            raise ValueError(f"queue_size={queue_size} must be at least 1")
+        self.sink = sink
+        self.queue_size = queue_size
+        self.policy = policy
+        # the queue and the condition guarding it
+        self.queue = collections.deque()
+        self.condition = threading.Condition()
+        self.is_closed = False
+        self.error = None
+        # statistics
+        self.n_submitted = 0
+        self.n_written = 0
+        self.n_dropped = 0
+        self.n_coalesced = 0
+        self.max_depth = 0
+        self.block_seconds = 0.0
+        self.write_seconds = 0.0
+        self.max_write_seconds = 0.0
+        # start writing
+        self.thread = threading.Thread(
+            target=self.run, name="snapshot-writer", daemon=True
+        )
+        self.thread.start()
+
+    def append(self, round_num: int, columns: Dict[str, Union[np.array, list]]):
+        """
+        queues a round for writing, the columns must not change afterwards
+
+        @param round_num = round number of the snapshot
+        @param columns = columns of the living cells, see CellPopulation.get_columns
+        """
+        with self.condition:
+            self.raise_error()
+            if self.is_closed:
+                raise RuntimeError("the snapshot writer is closed")
+            self.n_submitted += 1
+            # make room following the policy
+            if len(self.queue) >= self.queue_size:
+                if self.policy == "drop":
+                    self.n_dropped += 1
+                    return
+                if self.policy == "coalesce":
+                    # the waiting round is superseded by the newer one
+                    self.queue[-1] = (round_num, columns)
+                    self.n_coalesced += 1
+                    return
+                start_time = time.perf_counter()
+                while len(self.queue) >= self.queue_size and self.error is None:
+                    self.condition.wait()
+                self.block_seconds += time.perf_counter() - start_time
+                self.raise_error()
+            self.queue.append((round_num, columns))
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.condition.notify_all()
+
+    def run(self):
+        """
+        writes queued rounds until the writer is closed and the queue is empty
+        """
+        while True:
+            with self.condition:
+                while len(self.queue) == 0 and not self.is_closed:
+                    self.condition.wait()
+                if len(self.queue) == 0:
+                    return
+                # take the round off the queue so it can no longer be coalesced
+                round_num, columns = self.queue.popleft()
+                self.condition.notify_all()
+            # write outside the lock so the simulation can keep queueing
+            start_time = time.perf_counter()
+            try:
+                self.sink.append(round_num=round_num, columns=columns)
+            except Exception as e:
+                logging.exception(f"[snapshot writer] threw {str(e)}")
+                with self.condition:
+                    self.error = e
+                    self.queue.clear()
+                    self.condition.notify_all()
+                return
+            write_seconds = time.perf_counter() - start_time
+            with self.condition:
+                self.n_written += 1
+                self.write_seconds += write_seconds
+                self.max_write_seconds = max(self.max_write_seconds, write_seconds)
+                self.condition.notify_all()
+
+    def raise_error(self):
+        """
+        raises the error the writer thread stopped on, if any
+        """
+        if self.error is not None:
+            raise RuntimeError("the snapshot writer failed") from self.error
+
+    def close(self):
+        """
+        writes every queued round then closes the sink
+        """
+        with self.condition:
+            self.is_closed = True
+            self.condition.notify_all()
+        self.thread.join()
+        self.sink.close()
+        self.raise_error()
+
+    # get functions
+    def get_depth(self) -> int:
+        """
+        @returns number of rounds waiting to be written
+        """
+        with self.condition:
+            return len(self.queue)
+
+    def get_stats(self) -> Dict[str, float]:
+        """
+        @returns counts of the rounds submitted, written, dropped and coalesced,
+            the queue depth and the seconds spent blocked and writing
+        """
+        with self.condition:
+            return {
+                "depth": len(self.queue),
+                "max_depth": self.max_depth,
+                "n_submitted": self.n_submitted,
+                "n_written": self.n_written,
+                "n_dropped": self.n_dropped,
+                "n_coalesced": self.n_coalesced,
+                "block_seconds": self.block_seconds,
+                "write_seconds": self.write_seconds,
+                "mean_write_seconds": self.write_seconds / max(self.n_written, 1),
+                "max_write_seconds": self.max_write_seconds,
+            }
@@ -0,0 +1,377 @@
+import numpy as np
+import source.constants as constants
+from typing import Iterator, Optional, Tuple
+
+"""
+this file buckets points into a uniform grid over the world so that finding
+the points near each other only compares points in neighboring buckets, the
+grid is rebuilt every round with one sort of the bucket ids and on a round
+world the buckets and distances wrap around the edges like utils.bound_positions
+"""
+
+# offset turning coincident points apart, consecutive rows spread evenly
+GOLDEN_ANGLE = np.pi * (3 - np.sqrt(5))
+
+
+# define the spatial hash class
+class SpatialHash:
+    def __init__(self, cell_size: float, world_shape: Optional[str] = None):
+        """
+        @param cell_size = smallest width of a bucket
+        @param world_shape = "flat" or "round" defaults to constants
+        """
+        # configure parameters
+        self.world_shape = constants.WORLD_SHAPE if world_shape is None else world_shape
+        if self.world_shape not in ("flat", "round"):
+            raise ValueError(f"world_shape={self.world_shape} is erroneous")
+        # positions span 0 to the window size - 1 and wrap with that period
+        self.world_size = np.array(
+            [constants.WINDOW_WIDTH - 1, constants.WINDOW_HEIGHT - 1], dtype=float
+        )
+        # fit a whole number of buckets so they line up across the wrap
+        self.n_buckets = np.maximum(np.floor(self.world_size / cell_size), 1).astype(
+            np.int64
+        )
+        self.bucket_size = self.world_size / self.n_buckets
+        # points sorted by bucket
+        self.positions = np.zeros(shape=(0, 2))
+        self.order = np.zeros(shape=0, dtype=np.int64)
+        self.bucket_starts = np.zeros(shape=self.n_buckets.prod() + 1, dtype=np.int64)
+
+    def calc_buckets(self, positions: np.array) -> np.array:
+        """
+        @param positions = (n x 2) x, y coordinates within the world
+        @returns buckets = (n x 2) column and row of the bucket of each point
+        """
+        buckets = np.floor(positions / self.bucket_size).astype(np.int64)
+        return np.clip(buckets, 0, self.n_buckets - 1)
+
+    def build(self, positions: np.array):
+        """
+        buckets the points sorting them by bucket so that the points of a
+        bucket are stored together
+
+        @param positions = (n x 2) x, y coordinates within the world
+        """
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 2)
+        buckets = self.calc_buckets(positions=self.positions)
+        bucket_ids = buckets[:, 1] * self.n_buckets[0] + buckets[:, 0]
+        self.order = np.argsort(bucket_ids, kind="stable")
+        counts = np.bincount(bucket_ids, minlength=self.n_buckets.prod())
+        self.bucket_starts[0] = 0
+        np.cumsum(counts, out=self.bucket_starts[1:])
+        # keep each axis of the sorted points contiguous for the queries
+        self.sorted_xs = self.positions[self.order, 0]
+        self.sorted_ys = self.positions[self.order, 1]
+
+    def wrap_deltas(self, deltas: np.array, axis: int) -> np.array:
+        """
+        @param deltas = differences along one axis of points within the world
+        @param axis = 0 for x and 1 for y
+        @returns deltas = shortest differences, which may cross the edge of a
+            round world
+        """
+        if self.world_shape == "flat":
+            return deltas
+        world_size = self.world_size[axis]
+        deltas = np.where(deltas > world_size / 2, deltas - world_size, deltas)
+        return np.where(deltas < -world_size / 2, deltas + world_size, deltas)
+
+    def calc_deltas(self, starts: np.array, ends: np.array) -> np.array:
+        """
+        @param starts = (n x 2) x, y coordinates to measure from
+        @param ends = (n x 2) x, y coordinates to measure to
+        @returns deltas = (n x 2) shortest vectors from starts to ends
+        """
+        deltas = np.asarray(ends, dtype=float) - starts
+        for axis in range(2):
+            deltas[:, axis] = self.wrap_deltas(deltas=deltas[:, axis], axis=axis)
+        return deltas
+
+    def get_offsets(self, radius: float) -> np.array:
+        """
+        @param radius = distance around a point to search
+        @returns offsets = (m x 2) bucket steps covering the radius, each
+            distinct bucket is only stepped to once even when wrapping
+        """
+        n_rings = np.ceil(radius / self.bucket_size).astype(np.int64)
+        steps = []
+        for axis in range(2):
+            axis_steps = np.arange(-n_rings[axis], n_rings[axis] + 1)
+            # on a round world steps a whole lap apart reach the same bucket
+            if self.world_shape == "round":
+                n_buckets = self.n_buckets[axis]
+                axis_steps = np.unique(np.mod(axis_steps, n_buckets))
+                axis_steps = np.where(
+                    axis_steps > n_buckets // 2, axis_steps - n_buckets, axis_steps
+                )
+            steps.append(axis_steps)
+        xs, ys = np.meshgrid(*steps, indexing="ij")
+        return np.stack([xs.ravel(), ys.ravel()], axis=1)
+
+    def get_neighbor_buckets(
+        self, buckets: np.array, offset: np.array
+    ) -> Tuple[np.array, np.array]:
+        """
+        @param buckets = (m x 2) column and row of the bucket of each point
+        @param offset = column and row steps to the neighboring bucket
+        @returns rows = index of the points whose neighbor is in the world
+        @returns bucket_ids = id of the neighboring bucket of those points
+        """
+        neighbors = buckets + offset
+        # neighbors past the edge wrap on a round world, dropped on a flat one
+        if self.world_shape == "round":
+            neighbors = np.mod(neighbors, self.n_buckets)
+            rows = np.arange(len(buckets))
+        else:
+            rows = np.flatnonzero(
+                np.all((neighbors >= 0) & (neighbors < self.n_buckets), axis=1)
+            )
+            neighbors = neighbors[rows]
+        return (rows, neighbors[:, 1] * self.n_buckets[0] + neighbors[:, 0])
+
+    def count_candidates(self, points: np.array, radius: float) -> np.array:
+        """
+        @param points = (m x 2) x, y coordinates to search around
+        @param radius = distance around each point to search
+        @returns counts = (m) number of bucketed points compared with each point
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        buckets = self.calc_buckets(positions=points)
+        counts = np.zeros(shape=len(points), dtype=np.int64)
+        for offset in self.get_offsets(radius=radius):
+            rows, bucket_ids = self.get_neighbor_buckets(buckets=buckets, offset=offset)
+            counts[rows] += (
+                self.bucket_starts[bucket_ids + 1] - self.bucket_starts[bucket_ids]
+            )
+        return counts
+
+    def query(
+        self, points: np.array, radius: float
+    ) -> Tuple[np.array, np.array, np.array]:
+        """
+        finds every bucketed point within radius of each query point
+
+        @param points = (m x 2) x, y coordinates to search around
+        @param radius = distance around each point to search
+        @returns point_idxs = (k) index of the query point of each match
+        @returns item_idxs = (k) index of the bucketed point of each match
+        @returns deltas = (k x 2) shortest vectors from point to item
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        xs, ys = points[:, 0].copy(), points[:, 1].copy()
+        buckets = self.calc_buckets(positions=points)
+        point_idxs = [np.zeros(shape=0, dtype=np.int64)]
+        item_idxs = [np.zeros(shape=0, dtype=np.int64)]
+        deltas = [np.zeros(shape=(0, 2))]
+        for offset in self.get_offsets(radius=radius):
+            rows, bucket_ids = self.get_neighbor_buckets(buckets=buckets, offset=offset)
+            # expand every query point by the points in its neighboring bucket
+            starts = self.bucket_starts[bucket_ids]
+            counts = self.bucket_starts[bucket_ids + 1] - starts
+            firsts = np.cumsum(counts) - counts
+            candidate_rows = np.repeat(rows, counts)
+            sorted_idxs = np.arange(counts.sum()) + np.repeat(starts - firsts, counts)
+            # keep the candidates that are close enough
+            dxs = self.wrap_deltas(
+                deltas=self.sorted_xs[sorted_idxs] - xs[candidate_rows], axis=0
+            )
+            dys = self.wrap_deltas(
+                deltas=self.sorted_ys[sorted_idxs] - ys[candidate_rows], axis=1
+            )
+            is_near = dxs * dxs + dys * dys <= radius**2
+            point_idxs.append(candidate_rows[is_near])
+            item_idxs.append(self.order[sorted_idxs[is_near]])
+            deltas.append(np.stack([dxs[is_near], dys[is_near]], axis=1))
+        return (
+            np.concatenate(point_idxs),
+            np.concatenate(item_idxs),
+            np.concatenate(deltas),
+        )
+
+    def iter_query(
+        self, points: np.array, radius: float, memory_budget: Optional[int] = None
+    ) -> Iterator[Tuple[np.array, np.array, np.array]]:
+        """
+        runs query over chunks of the query points so that the candidates
+        compared at once fit in the memory budget, e.g. when many points
+        share a bucket
+
+        @param points = (m x 2) x, y coordinates to search around
+        @param radius = distance around each point to search
+        @param memory_budget = bytes of candidates per chunk defaults to constants
+        @returns point_idxs, item_idxs, deltas = matches of each chunk as in query
+        """
+        # configure parameters
+        if memory_budget is None:
+            memory_budget = constants.SPATIAL_MEMORY_BUDGET
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        # indices, distances and their temporaries take about 64 bytes per candidate
+        max_candidates = max(memory_budget // 64, 1)
+        totals = np.cumsum(self.count_candidates(points=points, radius=radius))
+        start = 0
+        while start < len(points):
+            done = totals[start - 1] if start > 0 else 0
+            end = np.searchsorted(totals, done + max_candidates, side="right")
+            end = max(end, start + 1)
+            point_idxs, item_idxs, deltas = self.query(
+                points=points[start:end], radius=radius
+            )
+            yield (point_idxs + start, item_idxs, deltas)
+            start = end
+
+    def iter_query_pairs(
+        self, radius: float, memory_budget: Optional[int] = None
+    ) -> Iterator[Tuple[np.array, np.array, np.array]]:
+        """
+        finds every pair of bucketed points within radius of each other,
+        in chunks that fit in the memory budget
+
+        @param radius = distance between the points of a pair
+        @param memory_budget = bytes of candidates per chunk defaults to constants
+        @returns firsts = (k) index of the first point of each pair
+        @returns seconds = (k) index of the second point, always larger
+        @returns deltas = (k x 2) shortest vectors from first to second
+        """
+        for firsts, seconds, deltas in self.iter_query(
+            points=self.positions, radius=radius, memory_budget=memory_budget
+        ):
+            is_pair = firsts < seconds
+            yield (firsts[is_pair], seconds[is_pair], deltas[is_pair])
+
+
+# push overlapping points apart
+def calc_repulsions(
+    positions: np.array,
+    radii: np.array,
+    strength: Optional[float] = None,
+    world_shape: Optional[str] = None,
+) -> np.array:
+    """
+    computes how far to push each point so that overlapping pairs move
+    apart along the line between them by strength times their overlap
+
+    @param positions = (n x 2) x, y coordinates within the world
+    @param radii = (n) radius of each point
+    @param strength = fraction of each overlap resolved defaults to constants
+    @param world_shape = "flat" or "round" defaults to constants
+    @returns displacements = (n x 2) x, y steps to add to the positions
+    """
+    # configure parameters
+    strength = constants.CROWDING_STRENGTH if strength is None else strength
+    radii = np.asarray(radii, dtype=float)
+    displacements = np.zeros(shape=(len(radii), 2))
+    if len(radii) < 2:
+        return displacements
+    # bucket the points by the largest distance two of them can overlap at
+    max_dist = 2 * radii.max()
+    spatial_hash = SpatialHash(cell_size=max_dist, world_shape=world_shape)
+    spatial_hash.build(positions=positions)
+    for firsts, seconds, deltas in spatial_hash.iter_query_pairs(radius=max_dist):
+        # keep the pairs that overlap
+        dists = np.hypot(deltas[:, 0], deltas[:, 1])
+        overlaps = radii[firsts] + radii[seconds] - dists
+        is_overlap = overlaps > 0
+        firsts, seconds, deltas = (
+            firsts[is_overlap],
+            seconds[is_overlap],
+            deltas[is_overlap],
+        )
+        dists, overlaps = dists[is_overlap], overlaps[is_overlap]
+        # points on top of each other are pushed apart in a fixed direction
+        angles = GOLDEN_ANGLE * seconds
+        directions = np.where(
+            dists[:, None] > 0,
+            deltas / np.where(dists > 0, dists, 1)[:, None],
+            np.stack([np.cos(angles), np.sin(angles)], axis=1),
+        )
+        # each point of a pair moves half of the push
+        pushes = directions * (strength * overlaps / 2)[:, None]
+        for axis in range(2):
+            displacements[:, axis] -= np.bincount(
+                firsts, weights=pushes[:, axis], minlength=len(radii)
+            )
+            displacements[:, axis] += np.bincount(
+                seconds, weights=pushes[:, axis], minlength=len(radii)
+            )
+    return displacements
+
+
+# find the items touching each point
+def find_contacts(
+    positions: np.array,
+    radii: np.array,
+    item_positions: np.array,
+    item_radii: np.array,
+    world_shape: Optional[str] = None,
+) -> Tuple[np.array, np.array, np.array]:
+    """
+    finds every point and item whose circles touch with a single batched
+    query of a spatial hash built over the items
+
+    @param positions = (n x 2) x, y coordinates of the points
+    @param radii = (n) radius of each point
+    @param item_positions = (m x 2) x, y coordinates of the items
+    @param item_radii = (m) radius of each item
+    @param world_shape = "flat" or "round" defaults to constants
+    @returns point_idxs = (k) index of the point of each contact
+    @returns item_idxs = (k) index of the item of each contact
+    @returns dists = (k) distance between the centers of each contact
+    """
+    radii = np.asarray(radii, dtype=float)
+    item_radii = np.asarray(item_radii, dtype=float)
+    if len(radii) == 0 or len(item_radii) == 0:
+        empty_idxs = np.zeros(shape=0, dtype=np.int64)
+        return (empty_idxs, empty_idxs, np.zeros(shape=0))
+    # search as far as the largest point and item could touch, buckets half
+    # that wide hug the search circle closer and compare fewer candidates
+    max_dist = radii.max() + item_radii.max()
+    spatial_hash = SpatialHash(cell_size=max_dist / 2, world_shape=world_shape)
+    spatial_hash.build(positions=item_positions)
+    point_idxs, item_idxs, dists = [], [], []
+    for chunk_point_idxs, chunk_item_idxs, deltas in spatial_hash.iter_query(
+        points=positions, radius=max_dist
+    ):
+        # keep the pairs that actually touch
+        chunk_dists = np.hypot(deltas[:, 0], deltas[:, 1])
+        is_contact = (
+            chunk_dists <= radii[chunk_point_idxs] + item_radii[chunk_item_idxs]
+        )
+        point_idxs.append(chunk_point_idxs[is_contact])
+        item_idxs.append(chunk_item_idxs[is_contact])
+        dists.append(chunk_dists[is_contact])
+    return (
+        np.concatenate(point_idxs),
+        np.concatenate(item_idxs),
+        np.concatenate(dists),
+    )
+
+
+# give each item to a single point
+def assign_items(
+    point_idxs: np.array, item_idxs: np.array, dists: np.array, point_keys: np.array
+) -> Tuple[np.array, np.array]:
+    """
+    resolves items touching several points by giving each item to its
+    closest point, ties go to the point with the smallest key
+
+    @param point_idxs = (k) index of the point of each contact
+    @param item_idxs = (k) index of the item of each contact
+    @param dists = (k) distance between the centers of each contact
+    @param point_keys = (n) tie breaking key of each point, e.g. its id
+    @returns point_idxs = index of the point each assigned item goes to
+    @returns item_idxs = index of each assigned item, every item once
+    """
+    n_items = item_idxs.max() + 1 if len(item_idxs) > 0 else 0
+    keys = point_keys[point_idxs]
+    # find the closest distance to each item
+    closest_dists = np.full(shape=n_items, fill_value=np.inf)
+    np.minimum.at(closest_dists, item_idxs, dists)
+    is_closest = dists == closest_dists[item_idxs]
+    # break ties with the smallest key among the closest points
+    smallest_keys = np.full(shape=n_items, fill_value=np.iinfo(np.int64).max)
+    np.minimum.at(smallest_keys, item_idxs[is_closest], keys[is_closest])
+    is_winner = is_closest & (keys == smallest_keys[item_idxs])
+    # report the items in order
+    order = np.argsort(item_idxs[is_winner], kind="stable")
+    return (point_idxs[is_winner][order], item_idxs[is_winner][order])
@@ -0,0 +1,160 @@
+import os
+import json
+import logging
+import numpy as np
+import source.utils as utils
+from typing import List, Tuple
+
+"""
+this file holds what the append only stores share, a store is a directory
+with a metadata file, data files that only grow and an index file of fixed
+width entries that is written after the data so an entry only points at
+data that is complete, reopening a store cuts every file back to what its
+index commits, the columnar and delta snapshot stores and the genome table
+all build on it
+"""
+
+# dtype of every index entry value
+INDEX_DTYPE = "<i8"
+# names of the files every store has
+META_FILENAME = "meta.json"
+INDEX_FILENAME = "index.bin"
+
+
+# create a store or load the metadata of an existing one
+def open_meta(dirname: str, overwrite: bool, meta: dict, keys: Tuple[str] = ()) -> dict:
+    """
+    @param dirname = full path of the store directory
+    @param overwrite = whether to remove a previous store first
+    @param meta = metadata to write if the store is new
+    @param keys = metadata that must match an existing store
+    @returns meta = metadata of the store
+    """
+    _ = utils.create_dir_if_none(dirname=dirname, overwrite=overwrite)
+    filename = os.path.join(dirname, META_FILENAME)
+    if not os.path.exists(filename):
+        with open(filename, "wt") as f:
+            json.dump(meta, f)
+        return meta
+    stored_meta = read_meta(dirname=dirname)
+    for key in keys:
+        if stored_meta[key] != meta[key]:
+            raise ValueError(
+                f"store {key}={stored_meta[key]} do not match {key}={meta[key]}"
+            )
+    return stored_meta
+
+
+# read the metadata of a store
+def read_meta(dirname: str) -> dict:
+    """
+    @param dirname = full path of the store directory
+    @returns meta = metadata of the store
+    """
+    with open(os.path.join(dirname, META_FILENAME), "rt") as f:
+        return json.load(f)
+
+
+# read the index of a store
+def read_index(dirname: str, width: int) -> np.array:
+    """
+    reads every complete index entry of a store
+
+    @param dirname = full path of the store directory
+    @param width = number of values in each entry
+    @returns index = (n_entries x width) entries in the order they were written
+    """
+    filename = os.path.join(dirname, INDEX_FILENAME)
+    if not os.path.exists(filename):
+        return np.zeros(shape=(0, width), dtype=INDEX_DTYPE)
+    index = np.fromfile(filename, dtype=INDEX_DTYPE)
+    # ignore a trailing entry that was only partially written
+    n_entries = len(index) // width
+    return index[: n_entries * width].reshape(n_entries, width)
+
+
+# cut a file back to the bytes that are committed
+def truncate_file(filename: str, n_bytes: int):
+    """
+    drops whatever a writer that stopped midway appended past the last
+    committed byte so new data lands where the index will point
+
+    @param filename = file to cut back
+    @param n_bytes = number of bytes to keep
+    """
+    if os.path.exists(filename) and os.path.getsize(filename) > n_bytes:
+        logging.info(f"dropping uncommitted bytes of {filename}")
+        os.truncate(filename, n_bytes)
+
+
+# open a data file of a store for appending
+def open_data_file(filename: str, n_bytes: int):
+    """
+    @param filename = file to append to
+    @param n_bytes = number of bytes the index points at
+    @returns f = the file opened for appending bytes
+    """
+    truncate_file(filename=filename, n_bytes=n_bytes)
+    return open(filename, "ab")
+
+
+# open the index of a store for appending
+def open_index_file(dirname: str, width: int):
+    """
+    @param dirname = full path of the store directory
+    @param width = number of values in each entry
+    @returns f = the index opened for appending entries
+    """
+    filename = os.path.join(dirname, INDEX_FILENAME)
+    n_entries = len(read_index(dirname=dirname, width=width))
+    entry_size = np.dtype(INDEX_DTYPE).itemsize * width
+    truncate_file(filename=filename, n_bytes=n_entries * entry_size)
+    return open(filename, "ab")
+
+
+# append data to a store
+def write_data(f, data: bytes):
+    """
+    @param f = data file opened by open_data_file
+    @param data = bytes to append
+    """
+    f.write(data)
+    f.flush()
+
+
+# commit an entry to the index
+def write_entry(f, entry: List[int]):
+    """
+    appends an entry once the data it points at is written
+
+    @param f = index opened by open_index_file
+    @param entry = values of the entry
+    """
+    f.write(np.array(entry, dtype=INDEX_DTYPE).tobytes())
+    f.flush()
+
+
+# append a JSON line to a file of a store
+def write_json_line(f, value: dict):
+    """
+    @param f = text file opened for appending
+    @param value = value to write on its own line
+    """
+    f.write(json.dumps(value) + "\n")
+    f.flush()
+
+
+# read a JSON lines file of a store
+def read_json_lines(filename: str) -> List[dict]:
+    """
+    reads every complete line of a file written by write_json_line
+
+    @param filename = file holding the lines
+    @returns values = value of each line in the order they were written
+    """
+    if not os.path.exists(filename):
+        return []
+    with open(filename, "rt") as f:
+        lines = f.read().split("\n")
+    # the last piece is empty unless a line was only partially written
+    return [json.loads(line) for line in lines[:-1]]
@@ -299,6 +299,25 @@ def gen_color(rng: Optional[np.random._generator.Generator] = None) -> str:
     return hex_color
 
 
+# generate many random colors
+def gen_colors(
+    n: int, rng: Optional[np.random._generator.Generator] = None
+) -> List[str]:
+    """
+    generates random colors drawing every rgb value at once
+
+    @param n = number of colors to create
+    @param rng = random number generator to create the colors
+    @returns hex_colors = strings of the hex colors
+    """
+    # configure parameters
+    rng = constants.DEFAULT_RNG if rng is None else rng
+    # create hex color %02X means convert to hexadecimal format
+    rgbs = rng.integers(0, 256, size=(n, 3)).tolist()
+    hex_colors = ["#%02X%02X%02X" % tuple(rgb) for rgb in rgbs]
+    return hex_colors
+
+
 # create a directory if it does not exist
 def create_dir_if_none(dirname: str, overwrite: bool):
     """
@@ -392,21 +411,57 @@ def limit_input(number: float, vmin: float, vmax: float) -> float:
     @param vmax = the maximum value the number can be
     @returns the limited number post correction
     """
-    # fix the number if it is smaller
-    limited_number = number
-    # keep looping until the number is perfect for example
-    # vmin = -5, vmax = 5, number = -50 then it'll cycle to 5 - (-5 -- 50)
-    # which gets us 5 - 45 = -40 this will continue to cycle to 0
-    while limited_number < vmin or limited_number > vmax:
-        # if the number is too small calculate the difference and
-        # subtract it from the max to get the new value
-        if limited_number < vmin:
-            limited_number = vmax - (vmin - limited_number)
-        # if the number is too large then calculate the difference and
-        # add the overhead to the minimum to get the new value
-        elif limited_number > vmax:
-            limited_number = vmin + (limited_number - vmax)
-        # this should never happen but if it is equal then leave the loop
-        else:
-            break
-    return limited_number
+    return limit_array(values=number, vmin=vmin, vmax=vmax).item()
+
+
+# set limits on an array of data
+def limit_array(values: np.array, vmin: float, vmax: float) -> np.array:
+    """
+    limits every value to vmin and vmax by wrapping around, a value that is
+    too small comes back in from vmax and one too large from vmin, for example
+    vmin = -5, vmax = 5, number = -50 cycles to 5 - (-5 -- 50) = -40 and
+    so on until it reaches 0, rather than cycling we jump there with modular
+    arithmetic, values already within [vmin, vmax] are left untouched
+
+    @param values = the numbers to correct
+    @param vmin = the minimum value the numbers can be
+    @param vmax = the maximum value the numbers can be
+    @returns limited_values = the limited numbers post correction
+    """
+    values = np.asarray(values, dtype=float)
+    # the distance past the minimum folded into a single window
+    remainders = np.mod(values - vmin, vmax - vmin)
+    limited_values = vmin + remainders
+    # values wrapping down from above stop at vmax rather than vmin
+    too_large = values > vmax
+    limited_values = np.where(too_large & (remainders == 0), vmax, limited_values)
+    # leave values that are already within the limits alone
+    return np.where((values < vmin) | too_large, limited_values, values)
+
+
+# keep positions within the world
+def bound_positions(positions: np.array, world_shape: Optional[str] = None) -> np.array:
+    """
+    keeps (n x 2) positions within the window by wrapping them around
+    for a round world or clamping them to the edges for a flat world
+
+    @param positions = (n x 2) x, y coordinates
+    @param world_shape = "flat" or "round" defaults to constants
+    @returns bounded_positions = (n x 2) x, y coordinates within the window
+    """
+    # configure parameters
+    world_shape = constants.WORLD_SHAPE if world_shape is None else world_shape
+    positions = np.asarray(positions, dtype=float)
+    vmaxs = np.array([constants.WINDOW_WIDTH - 1, constants.WINDOW_HEIGHT - 1])
+    # bound each axis
+    if world_shape == "round":
+        bounded_positions = np.empty(shape=np.shape(positions))
+        for axis, vmax in enumerate(vmaxs):
+            bounded_positions[..., axis] = limit_array(
+                values=positions[..., axis], vmin=0, vmax=vmax
+            )
+        return bounded_positions
+    elif world_shape == "flat":
+        return np.clip(positions, 0, vmaxs)
+    else:
+        raise ValueError(f"world_shape={world_shape} is erroneous")
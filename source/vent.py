@@ -1,6 +1,6 @@
 import numpy as np
 import tkinter
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import source.constants as constants
 import source.utils as utils
 import source.food as food
@@ -27,11 +27,13 @@ class Vent:
         self.prod_rate = prod_rate
 
     # create functions
-    def create_foods(self, canvas: tkinter.Canvas) -> Tuple[List[food.Food]]:
+    def create_foods(
+        self, canvas: Optional[tkinter.Canvas] = None
+    ) -> Tuple[List[food.Food]]:
         """
         creates a list of food based on the production rate
 
-        @param canvas = canvas to draw on
+        @param canvas = canvas to draw on, nothing is drawn if None
         @returns food_objects = memory tracked positions of the food
         @returns food_drawings = memory tracked canvas drawings of the food
         """
@@ -67,17 +69,16 @@ class Vent:
             food_object = food.Food(position=np.array([jitteredx, jitteredy]))
             # get the id
             food_id = id(food_object)
-            # draw the food
-            food_drawing = utils.draw_circular_object(
-                canvas=canvas,
-                position=food_object.position,
-                radius=food_object.radius,
-                fill_color=food_object.color,
-                outline_color=constants.FOOD_OUTLINE_COLOR,
-            )
-            # append to trackers
             food_objects[food_id] = food_object
-            food_drawings[food_id] = food_drawing
+            # draw the food
+            if canvas is not None:
+                food_drawings[food_id] = utils.draw_circular_object(
+                    canvas=canvas,
+                    position=food_object.position,
+                    radius=food_object.radius,
+                    fill_color=food_object.color,
+                    outline_color=constants.FOOD_OUTLINE_COLOR,
+                )
         return (food_objects, food_drawings)
 
     # get functions
@@ -104,3 +105,56 @@ class Vent:
         @returns the color of the vent
         """
         return self.color
+
+    def get_prod_rate(self) -> int:
+        """
+        get function for the production rate
+
+        @returns the number of foods the vent makes each round
+        """
+        return self.prod_rate
+
+
+# create foods for many vents at once
+def create_food_batch(
+    vent_positions: np.array,
+    vent_radii: np.array,
+    prod_rates: np.array,
+    rng: Optional[np.random._generator.Generator] = None,
+) -> Tuple[np.array, np.array, np.array]:
+    """
+    creates every vent's foods for a round in a handful of array draws using
+    the same bimodal jitter and normal radius as Vent.create_foods
+
+    @param vent_positions = (n_vents x 2) array of the vent x, y coordinates
+    @param vent_radii = (n_vents) array of the vent radii
+    @param prod_rates = (n_vents) number of foods each vent produces
+    @param rng = random number generator
+    @returns positions = (n_foods x 2) positions of the new foods
+    @returns radii = (n_foods) radii of the new foods
+    @returns sources = (n_foods) index of the vent making each food
+    """
+    # configure parameters
+    rng = constants.DEFAULT_RNG if rng is None else rng
+    # repeat each vent once per food it produces
+    sources = np.repeat(np.arange(len(vent_radii)), prod_rates)
+    source_radii = vent_radii[sources, None]
+    # decide if each jitter is left or right then draw around that mode
+    is_left = rng.uniform(low=0, high=1, size=(len(sources), 2)) >= 0.5
+    locs = np.where(is_left, -source_radii, source_radii)
+    jitters = rng.normal(loc=locs, scale=source_radii / 2)
+    positions = vent_positions[sources] + jitters
+    # limit the jitter
+    positions[:, 0] = utils.limit_array(
+        values=positions[:, 0], vmin=0, vmax=constants.WINDOW_WIDTH - 1
+    )
+    positions[:, 1] = utils.limit_array(
+        values=positions[:, 1], vmin=0, vmax=constants.WINDOW_HEIGHT - 1
+    )
+    # draw the radii of the foods
+    radii = rng.normal(
+        loc=constants.FOOD_RADIUS_MEAN,
+        scale=constants.FOOD_RADIUS_STD,
+        size=len(sources),
+    )
+    return (positions, radii, sources)
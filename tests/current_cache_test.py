@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import source.current_cache as current_cache
+
+
+class CurrentCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define a temporary cache directory
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dirname = self.tmp_dir.name
+        # define the vents and their maps
+        self.vent_positions = np.array([[10.0, 20.0], [30.5, 40.5]])
+        self.vent_radii = np.array([5.0, 7.5])
+        self.currentx_map = np.arange(12, dtype=float).reshape(3, 4)
+        self.currenty_map = -self.currentx_map
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_hash_vent_config(self) -> None:
+        key = current_cache.hash_vent_config(self.vent_positions, self.vent_radii)
+        same_key = current_cache.hash_vent_config(
+            self.vent_positions.copy(), self.vent_radii.copy()
+        )
+        other_key = current_cache.hash_vent_config(
+            self.vent_positions, self.vent_radii + 1
+        )
+        self.assertEqual(key, same_key)
+        self.assertNotEqual(key, other_key)
+
+    def test_save_load_currents(self) -> None:
+        self.assertIsNone(current_cache.load_currents(key="a", dirname=self.dirname))
+        current_cache.save_currents(
+            key="a",
+            currentx_map=self.currentx_map,
+            currenty_map=self.currenty_map,
+            dirname=self.dirname,
+        )
+        currentx_map, currenty_map = current_cache.load_currents(
+            key="a", dirname=self.dirname
+        )
+        self.assertIsInstance(currentx_map, np.memmap)
+        np.testing.assert_array_equal(currentx_map, self.currentx_map)
+        np.testing.assert_array_equal(currenty_map, self.currenty_map)
+
+    def test_evict_currents(self) -> None:
+        for key in ("a", "b", "c"):
+            current_cache.save_currents(
+                key=key,
+                currentx_map=self.currentx_map,
+                currenty_map=self.currenty_map,
+                dirname=self.dirname,
+            )
+        # make "a" the least recently used entry
+        os.utime(os.path.join(self.dirname, "a_x.npy"), (0, 0))
+        os.utime(os.path.join(self.dirname, "a_y.npy"), (0, 0))
+        entry_bytes = 2 * os.path.getsize(os.path.join(self.dirname, "a_x.npy"))
+        current_cache.evict_currents(dirname=self.dirname, max_bytes=2 * entry_bytes)
+        self.assertEqual(
+            sorted(os.listdir(self.dirname)),
+            ["b_x.npy", "b_y.npy", "c_x.npy", "c_y.npy"],
+        )
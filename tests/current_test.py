@@ -0,0 +1,151 @@
+import unittest
+import numpy as np
+import source.constants as constants
+import source.current as current
+import source.vent as vent
+
+
+# reference per pixel implementation of the flat currents
+def calc_reference_maps(vent_positions, vent_radii, width, height):
+    currentx_map = np.zeros(shape=(height, width))
+    currenty_map = np.zeros(shape=(height, width))
+    for idx in range(width):
+        for idy in range(height):
+            position = np.array([idx, idy])
+            differences = vent_positions - position
+            distances = np.linalg.norm(differences, axis=1)
+            scaling_factors = np.array([vent_radii / (distances + 1)]).T
+            thetas = np.arctan2(differences[:, 1], differences[:, 0])
+            unit_steps = np.vstack([np.cos(thetas), np.sin(thetas)]).T
+            currents = -(scaling_factors * unit_steps).sum(0) * constants.CURRENT_SCALER
+            currentx_map[idy, idx] = currents[0]
+            currenty_map[idy, idx] = currents[1]
+    return currentx_map, currenty_map
+
+
+class CurrentTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define a small world with one vent sitting exactly on a pixel
+        self.width = 23
+        self.height = 17
+        self.vent_positions = np.array([[3.5, 4.25], [10.0, 8.0], [20.2, 1.7]])
+        self.vent_radii = np.array([20.0, 12.5, 5.0])
+        self.reference_maps = calc_reference_maps(
+            vent_positions=self.vent_positions,
+            vent_radii=self.vent_radii,
+            width=self.width,
+            height=self.height,
+        )
+
+    def test_calc_current_maps(self) -> None:
+        maps = current.calc_current_maps(
+            vent_positions=self.vent_positions,
+            vent_radii=self.vent_radii,
+            width=self.width,
+            height=self.height,
+        )
+        for current_map, reference_map in zip(maps, self.reference_maps):
+            np.testing.assert_allclose(current_map, reference_map, atol=1e-12)
+
+    def test_calc_current_maps_chunked(self) -> None:
+        # a tiny budget forces one row and one vent per block
+        maps = current.calc_current_maps(
+            vent_positions=self.vent_positions,
+            vent_radii=self.vent_radii,
+            memory_budget=1,
+            width=self.width,
+            height=self.height,
+        )
+        for current_map, reference_map in zip(maps, self.reference_maps):
+            np.testing.assert_allclose(current_map, reference_map, atol=1e-12)
+
+    def test_gen_periodic_images(self) -> None:
+        image_positions, image_radii = current.gen_periodic_images(
+            vent_positions=self.vent_positions,
+            vent_radii=self.vent_radii,
+            n_shells=1,
+            width=self.width,
+            height=self.height,
+        )
+        self.assertEqual(image_positions.shape, (27, 2))
+        self.assertEqual(image_radii.shape, (27,))
+        # the central tile keeps the original vents
+        np.testing.assert_array_equal(image_positions[12:15], self.vent_positions)
+        # the first tile is shifted one window up and to the left
+        np.testing.assert_array_equal(
+            image_positions[:3], self.vent_positions - [self.width, self.height]
+        )
+
+    def test_gen_periodic_images_no_shells(self) -> None:
+        image_positions, image_radii = current.gen_periodic_images(
+            vent_positions=self.vent_positions,
+            vent_radii=self.vent_radii,
+            n_shells=0,
+        )
+        np.testing.assert_array_equal(image_positions, self.vent_positions)
+        np.testing.assert_array_equal(image_radii, self.vent_radii)
+
+    def test_calc_current_maps_fft_flat(self) -> None:
+        # vents on the pixel grid are rasterized exactly
+        vent_positions = np.round(self.vent_positions)
+        maps = current.calc_current_maps_fft(
+            vent_positions=vent_positions,
+            vent_radii=self.vent_radii,
+            world_shape="flat",
+            width=self.width,
+            height=self.height,
+        )
+        reference_maps = calc_reference_maps(
+            vent_positions=vent_positions,
+            vent_radii=self.vent_radii,
+            width=self.width,
+            height=self.height,
+        )
+        for current_map, reference_map in zip(maps, reference_maps):
+            np.testing.assert_allclose(current_map, reference_map, atol=1e-9)
+
+    def test_calc_current_maps_fft_round(self) -> None:
+        # compare against every periodic image summed directly
+        vent_positions = np.round(self.vent_positions)
+        for n_shells in (0, 1, 2):
+            maps = current.calc_current_maps_fft(
+                vent_positions=vent_positions,
+                vent_radii=self.vent_radii,
+                world_shape="round",
+                n_shells=n_shells,
+                width=self.width,
+                height=self.height,
+            )
+            image_positions, image_radii = current.gen_periodic_images(
+                vent_positions=vent_positions,
+                vent_radii=self.vent_radii,
+                n_shells=n_shells,
+                width=self.width,
+                height=self.height,
+            )
+            reference_maps = current.calc_current_maps(
+                vent_positions=image_positions,
+                vent_radii=image_radii,
+                width=self.width,
+                height=self.height,
+            )
+            for current_map, reference_map in zip(maps, reference_maps):
+                np.testing.assert_allclose(current_map, reference_map, atol=1e-9)
+
+    def test_current_field_add_remove_vent(self) -> None:
+        vents = [vent.Vent(prod_rate=1) for _ in range(2)]
+        positions, radii = current.get_vent_arrays(dict(enumerate(vents)))
+        for world_shape, backend in (("flat", "direct"), ("round", "fft")):
+            both_maps = current.calc_world_maps(positions, radii, world_shape, backend)
+            first_maps = current.calc_world_maps(
+                positions[:1], radii[:1], world_shape, backend
+            )
+            # adding the second vent matches computing both at once
+            current_field = current.CurrentField(*first_maps, world_shape, backend)
+            current_field.add_vent(vent_object=vents[1])
+            for current_map, both_map in zip(current_field.get_maps(), both_maps):
+                np.testing.assert_allclose(current_map, both_map, atol=1e-9)
+            # removing it again restores the first vent's maps
+            current_field.remove_vent(vent_object=vents[1])
+            for current_map, first_map in zip(current_field.get_maps(), first_maps):
+                np.testing.assert_allclose(current_map, first_map, atol=1e-9)
@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+import source.constants as constants
+import source.engine as engine
+import source.scoring as scoring
+
+
+# observer counting the notifications it receives
+class CountingObserver(engine.Observer):
+    def __init__(self, stop_round=None):
+        self.stop_round = stop_round
+        self.n_starts = 0
+        self.rounds = []
+        self.n_stops = 0
+
+    def on_start(self, state):
+        self.n_starts += 1
+
+    def on_round(self, state):
+        self.rounds.append(state.get_round_num())
+        if state.get_round_num() == self.stop_round:
+            raise engine.StopSimulation
+
+    def on_stop(self, state):
+        self.n_stops += 1
+
+
+class EngineTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define a small world without touching the current cache
+        self.ideal_seqs = {"digest": "ACGT", "move": "ACGT", "mutate": "ACGT"}
+        with mock.patch.object(constants, "CURRENT_CACHE_ENABLED", False):
+            self.state = engine.create_state(
+                n_cells=3, n_vents=2, ideal_seqs=self.ideal_seqs
+            )
+
+    def test_create_state(self) -> None:
+        self.assertEqual(self.state.get_round_num(), 0)
+        self.assertEqual(self.state.get_n_cells(), 3)
+        self.assertEqual(len(self.state.vent_objects), 2)
+        self.assertEqual(len(self.state.food_objects), 0)
+
+    def test_run(self) -> None:
+        observer = CountingObserver()
+        simulation = engine.Engine(state=self.state, observers=[observer])
+        state = simulation.run(n_rounds=4)
+        self.assertEqual(state.get_round_num(), 4)
+        self.assertEqual(observer.n_starts, 1)
+        self.assertEqual(observer.rounds, [1, 2, 3, 4])
+        self.assertEqual(observer.n_stops, 1)
+        # every vent produces its foods each round
+        n_foods = 4 * 2 * constants.VENT_PROD_RATE
+        self.assertEqual(len(state.food_objects), n_foods)
+
+    def test_run_stopped_by_observer(self) -> None:
+        observer = CountingObserver(stop_round=2)
+        simulation = engine.Engine(state=self.state, observers=[observer])
+        state = simulation.run()
+        self.assertEqual(state.get_round_num(), 2)
+        self.assertEqual(observer.n_stops, 1)
+
+    def test_reproduce_cells(self) -> None:
+        self.state.cells.energies[0] = constants.REPRODUCTION_ENERGY
+        engine.reproduce_cells(state=self.state)
+        self.assertEqual(self.state.get_n_cells(), 4)
+        self.assertEqual(self.state.timings["reproduce"]["n_daughters"], 1)
+
+    def test_set_ideal_seqs(self) -> None:
+        ideal_seqs = {"digest": "AAAA", "move": "CCCC", "mutate": "GGGG"}
+        simulation = engine.Engine(state=self.state)
+        timings = simulation.set_ideal_seqs(ideal_seqs=ideal_seqs, n_workers=2)
+        self.assertEqual(timings["n_cells"], 3)
+        self.assertIs(self.state.ideal_seqs, ideal_seqs)
+        # the scores match scoring each cell on its own
+        for cell_view in self.state.cell_objects.values():
+            for trait, ideal_seq in ideal_seqs.items():
+                self.assertEqual(
+                    cell_view.get_trait_score(trait=trait),
+                    scoring.calc_score(cell_view.get_trait_seq(trait), ideal_seq),
+                )
+
+    def test_ideal_seqs_shifter(self) -> None:
+        shifter = engine.IdealSeqsShifter(every_n_rounds=2)
+        simulation = engine.Engine(state=self.state, observers=[shifter])
+        state = simulation.run(n_rounds=5)
+        self.assertEqual(len(shifter.timings), 2)
+        self.assertEqual(len(state.ideal_seqs["digest"]), constants.DIGEST_SIZE)
@@ -0,0 +1,119 @@
+import unittest
+from unittest import mock
+import numpy as np
+import source.constants as constants
+import source.food as food
+
+
+class FoodTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define foods including some that will cross the window edges
+        self.positions = np.array([[0.2, 0.4], [498.7, 3.0], [250.0, 499.0]])
+        self.radii = np.array([5.0, 4.0, 6.0])
+        shape = (constants.WINDOW_HEIGHT, constants.WINDOW_WIDTH)
+        rng = np.random.default_rng(0)
+        self.currentx_map = rng.uniform(-3, 3, size=shape)
+        self.currenty_map = rng.uniform(-3, 3, size=shape)
+        self.currentx_map[0, 0] = -600.5
+        self.currenty_map[499, 250] = 3.5
+        self.field = food.FoodField(capacity=1)
+        self.food_ids = self.field.add(positions=self.positions, radii=self.radii)
+
+    def test_add(self) -> None:
+        self.assertEqual(len(self.field), 3)
+        np.testing.assert_array_equal(self.food_ids, [0, 1, 2])
+        view = self.field.get_food(food_id=1)
+        np.testing.assert_array_equal(view.get_position(), self.positions[1])
+        self.assertEqual(view.get_radius(), self.radii[1])
+        self.assertEqual(view.get_color(), constants.FOOD_COLOR)
+
+    def test_advect(self) -> None:
+        self.field.advect(
+            currentx_map=self.currentx_map, currenty_map=self.currenty_map
+        )
+        # matches moving each food on its own
+        for food_id, position in zip(self.food_ids, self.positions):
+            food_object = food.Food(position=position.copy())
+            food_object.move(
+                currentx_map=self.currentx_map, currenty_map=self.currenty_map
+            )
+            np.testing.assert_allclose(
+                self.field.get_food(food_id=food_id).get_position(),
+                food_object.get_position(),
+            )
+
+    def test_expire(self) -> None:
+        field = food.FoodField(lifetime=2)
+        field.add(positions=self.positions[:2], radii=self.radii[:2])
+        self.assertEqual(field.expire(), 0)
+        field.add(positions=self.positions[2:], radii=self.radii[2:])
+        self.assertEqual(field.expire(), 0)
+        # the first two foods are now past their lifetime
+        self.assertEqual(field.expire(), 2)
+        np.testing.assert_array_equal(field.get_ids(), [2])
+        # their slots are recycled rather than new ones allocated
+        field.add(positions=self.positions[:2], radii=self.radii[:2])
+        self.assertEqual(field.n_slots, 3)
+        np.testing.assert_array_equal(np.sort(field.get_ids()), [2, 3, 4])
+
+    def test_max_foods(self) -> None:
+        field = food.FoodField(max_foods=4)
+        for _ in range(3):
+            field.add(positions=self.positions, radii=self.radii)
+        # only the newest foods remain in a fixed number of slots
+        self.assertEqual(len(field), 4)
+        self.assertEqual(field.n_slots, 4)
+        np.testing.assert_array_equal(np.sort(field.get_ids()), [5, 6, 7, 8])
+
+    def test_max_foods_per_source(self) -> None:
+        field = food.FoodField(max_foods_per_source=2)
+        field.add(positions=self.positions, radii=self.radii, sources=[0, 0, 1])
+        field.add(positions=self.positions, radii=self.radii, sources=[0, 1, 1])
+        np.testing.assert_array_equal(np.sort(field.get_ids()), [1, 3, 4, 5])
+        # a single batch is held to the cap too keeping its newest foods
+        field = food.FoodField(max_foods_per_source=2)
+        food_ids = field.add(
+            positions=np.tile(self.positions, (2, 1)),
+            radii=np.tile(self.radii, 2),
+            sources=[0, 0, 0, 1, 0, 1],
+        )
+        np.testing.assert_array_equal(food_ids, [0, 1, 2, 3])
+        np.testing.assert_array_equal(field.get_radii(), [6.0, 5.0, 4.0, 6.0])
+        # an empty batch adds nothing
+        food_ids = field.add(positions=np.zeros((0, 2)), radii=[], sources=[])
+        self.assertEqual(len(food_ids), 0)
+        self.assertEqual(len(field), 4)
+
+    def test_calc_group_ranks(self) -> None:
+        ranks = food.calc_group_ranks(groups=[2, 0, 2, 2, 0], orders=[5, 9, 1, 3, 2])
+        np.testing.assert_array_equal(ranks, [2, 1, 0, 1, 0])
+
+    def test_max_foods_per_source_batches(self) -> None:
+        # every vent keeps its newest foods across many batches
+        rng = np.random.default_rng(0)
+        field = food.FoodField(max_foods_per_source=3)
+        food_sources = {}
+        all_sources = []
+        for _ in range(20):
+            sources = rng.integers(-1, 6, size=int(rng.integers(0, 10)))
+            positions = rng.uniform(0, 100, size=(len(sources), 2))
+            food_ids = field.add(
+                positions=positions, radii=np.ones(len(sources)), sources=sources
+            )
+            rows = [field.id2row[food_id] for food_id in food_ids.tolist()]
+            food_sources.update(zip(food_ids.tolist(), field.sources[rows].tolist()))
+            all_sources.extend(sources.tolist())
+        for source in range(-1, 6):
+            alive_ids = [idx for idx in field.get_ids() if food_sources[idx] == source]
+            self.assertEqual(len(alive_ids), min(all_sources.count(source), 3))
+            source_ids = [idx for idx, src in food_sources.items() if src == source]
+            self.assertEqual(sorted(alive_ids), sorted(source_ids)[-3:])
+
+    def test_no_limit(self) -> None:
+        with mock.patch.object(constants, "FOOD_MAX", 2):
+            field = food.FoodField(max_foods=food.NO_LIMIT)
+            capped_field = food.FoodField()
+        self.assertIsNone(field.max_foods)
+        self.assertEqual(capped_field.max_foods, 2)
+        field.add(positions=self.positions, radii=self.radii)
+        self.assertEqual(len(field), 3)
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import source.constants as constants
+import source.genome_table as genome_table
+import source.mutation as mutation
+import source.utils as utils
+
+
+class GenomeTableTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define a temporary table directory
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dirname = self.tmp_dir.name
+        # define a parent genome, a clone and a daughter a few bases apart
+        self.parent = "ACGT" * 30
+        self.daughter = "ACGA" + self.parent[4:60] + "TT" + self.parent[61:]
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_edits(self) -> None:
+        rng = np.random.default_rng(0)
+        parents = [utils.gen_genome(size=40, rng=rng) for _ in range(20)]
+        genomes, _ = mutation.mutate_cells(
+            genomes=parents,
+            frames=np.zeros(shape=(20, 1, 2)),
+            thresholds=np.full(20, 0.2),
+            rng=rng,
+        )
+        for parent, genome in zip(parents, genomes):
+            edits = genome_table.calc_edits(parent_genome=parent, genome=genome)
+            self.assertEqual(genome_table.apply_edits(parent, edits), genome)
+
+    def test_intern(self) -> None:
+        for codec in genome_table.CODECS:
+            writer = genome_table.GenomeTableWriter(
+                dirname=self.dirname, overwrite=True, codec=codec, use_edits=True
+            )
+            # clones share the id of their genome
+            genome_ids = writer.intern(
+                genomes=[self.parent, self.parent], cell_ids=[0, 1], parent_ids=[-1, 0]
+            )
+            np.testing.assert_array_equal(genome_ids, [0, 0])
+            # only the daughter's genome is new in the next round
+            genome_ids = writer.intern(
+                genomes=[self.parent, self.parent, self.daughter],
+                cell_ids=[0, 1, 2],
+                parent_ids=[-1, 0, 1],
+            )
+            np.testing.assert_array_equal(genome_ids, [0, 0, 1])
+            writer.intern(genomes=[self.daughter], cell_ids=[2], parent_ids=[1])
+            writer.close()
+            self.assertEqual(len(genome_table.read_index(self.dirname)), 2)
+            # the daughter is stored as the edits of its parent's genome
+            reader = genome_table.GenomeTableReader(dirname=self.dirname)
+            self.assertEqual(reader.get_genomes([1, 0]), [self.daughter, self.parent])
+            self.assertEqual(reader.id2entry[1][0], 0)
+            with self.assertRaises(KeyError):
+                reader.get_genome(genome_id=2)
+
+    def test_max_depth(self) -> None:
+        writer = genome_table.GenomeTableWriter(dirname=self.dirname, overwrite=True)
+        genomes = [self.parent, self.daughter, self.daughter + "A"]
+        with mock.patch.object(constants, "GENOME_TABLE_MAX_DEPTH", 1):
+            for cell_id, genome in enumerate(genomes):
+                writer.intern(
+                    genomes=[genome], cell_ids=[cell_id], parent_ids=[cell_id - 1]
+                )
+        writer.close()
+        self.assertEqual(writer.depths, [0, 1, 0])
+
+    def test_reopen(self) -> None:
+        writer = genome_table.GenomeTableWriter(dirname=self.dirname, overwrite=True)
+        writer.intern(genomes=[self.parent], cell_ids=[0])
+        writer.close()
+        # a reopened table keeps the ids it gave out
+        writer = genome_table.GenomeTableWriter(dirname=self.dirname, overwrite=False)
+        genome_ids = writer.intern(
+            genomes=[self.daughter, self.parent], cell_ids=[1, 0]
+        )
+        writer.close()
+        np.testing.assert_array_equal(genome_ids, [1, 0])
+        reader = genome_table.GenomeTableReader(dirname=self.dirname)
+        self.assertEqual(len(reader), 2)
+        self.assertEqual(reader.get_genome(genome_id=1), self.daughter)
+
+    def test_torn_block_is_dropped(self) -> None:
+        writer = genome_table.GenomeTableWriter(dirname=self.dirname, overwrite=True)
+        writer.intern(genomes=[self.parent], cell_ids=[0])
+        writer.close()
+        # a block that never reached the index
+        with open(os.path.join(self.dirname, "blocks.bin"), "ab") as f:
+            f.write(b"\x00" * 10)
+        writer = genome_table.GenomeTableWriter(dirname=self.dirname, overwrite=False)
+        writer.intern(genomes=[self.daughter], cell_ids=[1])
+        writer.close()
+        reader = genome_table.GenomeTableReader(dirname=self.dirname)
+        self.assertEqual(reader.get_genomes([0, 1]), [self.parent, self.daughter])
@@ -0,0 +1,87 @@
+import unittest
+import tracemalloc
+import numpy as np
+import source.constants as constants
+import source.cell as cell
+import source.genome as genome
+
+
+class GenomeTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define the genome
+        self.genome = "ACGTTGCAACG"
+        self.codes = np.array([0, 1, 2, 3, 3, 2, 1, 0, 0, 1, 2], dtype=np.uint8)
+
+    def test_encode_decode(self) -> None:
+        np.testing.assert_array_equal(genome.encode(self.genome), self.codes)
+        self.assertEqual(genome.decode(self.codes), self.genome)
+        with self.assertRaises(ValueError):
+            genome.encode("ACGX")
+
+    def test_pack_unpack(self) -> None:
+        # lengths that are and are not a multiple of four
+        for size in range(len(self.codes) + 1):
+            codes = self.codes[:size]
+            packed = genome.pack(codes)
+            self.assertEqual(len(packed), -(-size // 4))
+            np.testing.assert_array_equal(genome.unpack(packed, size), codes)
+        # the first base sits in the high bits
+        self.assertEqual(genome.pack(self.codes[:4]), bytes([0b00011011]))
+
+    def test_packed_genome(self) -> None:
+        packed_genome = genome.PackedGenome(self.genome)
+        self.assertEqual(str(packed_genome), self.genome)
+        self.assertEqual(len(packed_genome), len(self.genome))
+        self.assertEqual(packed_genome, self.genome)
+        self.assertEqual(packed_genome[4], "T")
+        self.assertEqual(str(packed_genome[2:7]), self.genome[2:7])
+        self.assertEqual(str(packed_genome[-5:-1]), self.genome[-5:-1])
+        self.assertEqual(
+            genome.PackedGenome.from_packed(packed_genome.pack(), len(self.genome)),
+            packed_genome,
+        )
+        self.assertEqual(hash(packed_genome), hash(genome.PackedGenome(self.genome)))
+        # both forms of a genome find each other in dicts and sets
+        self.assertEqual(hash(packed_genome), hash(self.genome))
+        self.assertIn(self.genome, {packed_genome})
+        self.assertIn(packed_genome, {self.genome: 0})
+        self.assertEqual(packed_genome[-1], self.genome[-1])
+        with self.assertRaises(IndexError):
+            _ = packed_genome[len(self.genome)]
+
+    def test_packed_genome_memory(self) -> None:
+        # every genome is built here so the strings are counted like the genomes
+        rng = np.random.default_rng(0)
+        codes = rng.integers(0, 4, size=(2000, constants.DEFAULT_GENOME_SIZE))
+        tracemalloc.start()
+        genome_strs = [genome.decode(codes=row) for row in codes]
+        str_size, _ = tracemalloc.get_traced_memory()
+        packed_genomes = [genome.PackedGenome(row) for row in codes]
+        packed_size = tracemalloc.get_traced_memory()[0] - str_size
+        tracemalloc.stop()
+        self.assertEqual([str(seq) for seq in packed_genomes], genome_strs)
+        self.assertLess(packed_size / len(codes), str_size / len(codes))
+
+    def test_cell_scores(self) -> None:
+        ideal_seqs = {trait: "ACGTA" for trait in constants.CELL_TRAITS}
+        trait2frame = {
+            trait: (idx, idx + 5) for idx, trait in enumerate(constants.CELL_TRAITS)
+        }
+        genome_str = "ACGTACGTACGTACGTACGT"
+        cell_str = cell.Cell(
+            ideal_seqs=ideal_seqs,
+            traits=constants.CELL_TRAITS,
+            trait2frame=trait2frame,
+            genome=genome_str,
+        )
+        cell_packed = cell.Cell(
+            ideal_seqs=ideal_seqs,
+            traits=constants.CELL_TRAITS,
+            trait2frame=trait2frame,
+            genome=genome.PackedGenome(genome_str),
+        )
+        for trait in constants.CELL_TRAITS:
+            self.assertEqual(
+                cell_str.get_trait_score(trait), cell_packed.get_trait_score(trait)
+            )
+        self.assertEqual(cell_packed.get_snap()["genome"], genome_str)
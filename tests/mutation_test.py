@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+import source.constants as constants
+import source.genome as genome
+import source.mutation as mutation
+
+
+class MutationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define the genomes and frames
+        self.genomes = ["ACGTACGT", "", "TTTGGGCCCAAA", "G"]
+        self.frames = np.array(
+            [[[0, 4], [2, 6]], [[0, 0], [0, 0]], [[3, 9], [1, 2]], [[0, 1], [0, 1]]]
+        )
+
+    def test_concat_split_genomes(self) -> None:
+        codes, offsets = mutation.concat_genomes(self.genomes)
+        np.testing.assert_array_equal(offsets, [0, 8, 8, 20, 21])
+        self.assertEqual(mutation.split_genomes(codes, offsets), self.genomes)
+        packed_genomes = [genome.PackedGenome(seq) for seq in self.genomes]
+        packed_codes, packed_offsets = mutation.concat_genomes(packed_genomes)
+        np.testing.assert_array_equal(packed_codes, codes)
+        np.testing.assert_array_equal(packed_offsets, offsets)
+        split_genomes = mutation.split_genomes(codes, offsets, packed=True)
+        self.assertEqual(split_genomes, packed_genomes)
+        # the packed genomes do not share the batch of codes
+        codes[:] = 3
+        self.assertEqual([str(seq) for seq in split_genomes], self.genomes)
+
+    def test_mutate_codes(self) -> None:
+        codes, offsets = mutation.concat_genomes(self.genomes)
+        # nothing mutates without a threshold
+        mut_codes, mut_offsets = mutation.mutate_codes(
+            codes, offsets, thresholds=np.zeros(4), rng=np.random.default_rng(0)
+        )
+        np.testing.assert_array_equal(mut_codes, codes)
+        np.testing.assert_array_equal(mut_offsets, offsets)
+        # only the genomes with a threshold mutate
+        thresholds = np.array([1.0, 1.0, 0.0, 1.0])
+        mut_codes, mut_offsets = mutation.mutate_codes(
+            codes, offsets, thresholds=thresholds, rng=np.random.default_rng(0)
+        )
+        mut_genomes = mutation.split_genomes(mut_codes, mut_offsets)
+        self.assertEqual(mut_genomes[1], "")
+        self.assertEqual(mut_genomes[2], self.genomes[2])
+        self.assertNotEqual(mut_genomes[0], self.genomes[0])
+
+    def test_mutate_codes_rates(self) -> None:
+        # a long genome that always mutates has the expected mutation mix
+        codes = np.zeros(100000, dtype=np.uint8)
+        offsets = np.array([0, len(codes)])
+        mut_codes, mut_offsets = mutation.mutate_codes(
+            codes, offsets, thresholds=np.ones(1), rng=np.random.default_rng(0)
+        )
+        # insertions and deletions are equally likely so the length holds
+        self.assertAlmostEqual(mut_offsets[-1] / len(codes), 1, places=2)
+        # substitutions never keep the current nucleotide
+        n_sub = len(codes) * (1 - constants.INDEL_THRESHOLD)
+        self.assertGreater(np.count_nonzero(mut_codes), 0.99 * n_sub)
+
+    def test_mutate_frames(self) -> None:
+        thresholds = np.array([0.0, 1.0, 1.0, 0.0])
+        mut_frames = mutation.mutate_frames(
+            self.frames, thresholds=thresholds, rng=np.random.default_rng(0)
+        )
+        self.assertEqual(mut_frames.shape, self.frames.shape)
+        np.testing.assert_array_equal(mut_frames[0], self.frames[0])
+        np.testing.assert_array_equal(mut_frames[3], self.frames[3])
+        self.assertTrue(np.all(mut_frames[..., 0] <= mut_frames[..., 1]))
+
+    def test_mutate_cells(self) -> None:
+        packed_genomes = [genome.PackedGenome(seq) for seq in self.genomes]
+        mut_genomes, mut_frames = mutation.mutate_cells(
+            packed_genomes, self.frames, thresholds=np.full(4, 0.5)
+        )
+        self.assertEqual(len(mut_genomes), len(self.genomes))
+        self.assertIsInstance(mut_genomes[0], genome.PackedGenome)
+        self.assertEqual(mut_frames.shape, self.frames.shape)
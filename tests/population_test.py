@@ -0,0 +1,154 @@
+import unittest
+from unittest import mock
+import numpy as np
+import source.constants as constants
+import source.cell as cell
+import source.population as population
+
+
+class PopulationTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define ideal sequences and traits
+        self.ideal_seqs = {"move": "AAACCCTTTGGG", "mutate": "ACTG"}
+        self.traits = ["move", "mutate"]
+        # define cells to copy into the population
+        self.cells = [
+            cell.Cell(
+                ideal_seqs=self.ideal_seqs,
+                traits=self.traits,
+                trait2frame={"move": (0, 12), "mutate": (12, 16 + idx)},
+                genome="AAACCCTTTGGGACTGACTG",
+            )
+            for idx in range(3)
+        ]
+        self.population = population.CellPopulation(traits=self.traits, capacity=2)
+        self.cell_ids = self.population.add_cells(self.cells)
+
+    def test_add_cells(self) -> None:
+        self.assertEqual(len(self.population), 3)
+        np.testing.assert_array_equal(self.cell_ids, [0, 1, 2])
+        for cell_id, cell_object in zip(self.cell_ids, self.cells):
+            view = self.population.get_cell(cell_id=cell_id)
+            self.assertEqual(view.get_genome(), cell_object.get_genome())
+            self.assertEqual(view.get_color(), cell_object.get_color())
+            np.testing.assert_array_equal(
+                view.get_position(), cell_object.get_position()
+            )
+            for trait in self.traits:
+                self.assertEqual(
+                    view.get_trait_frame(trait=trait),
+                    cell_object.get_trait_frame(trait=trait),
+                )
+                self.assertEqual(
+                    view.get_trait_score(trait=trait),
+                    cell_object.get_trait_score(trait=trait),
+                )
+
+    def test_get_snap(self) -> None:
+        view = self.population.get_cell(cell_id=self.cell_ids[0])
+        self.assertEqual(view.get_snap(), self.cells[0].get_snap())
+
+    def test_move(self) -> None:
+        positions = self.population.get_positions().copy()
+        energies = self.population.get_energies().copy()
+        self.population.move(rng=np.random.default_rng(0))
+        # energy is charged by the distance moved discounted by the move score
+        distances = np.linalg.norm(self.population.get_positions() - positions, axis=1)
+        move_scores = self.population.get_trait_scores(trait="move")
+        np.testing.assert_allclose(
+            energies - self.population.get_energies(), distances * (1 - move_scores)
+        )
+        self.assertTrue(
+            np.all(distances <= self.cells[0].get_move_step_size() * np.sqrt(2))
+        )
+
+    def test_crowd(self) -> None:
+        # the cells all start on top of each other
+        self.population.crowd(strength=1)
+        positions = self.population.get_positions()
+        dists = np.linalg.norm(positions[:, None] - positions[None, :], axis=-1)
+        self.assertTrue(np.all(dists[np.triu_indices(3, k=1)] > 0))
+
+    def test_eat(self) -> None:
+        cells = population.CellPopulation(traits=["digest", "move"])
+        cells.add_columns(
+            genomes=["ACGT"] * 3,
+            frames=np.zeros(shape=(3, 2, 2)),
+            scores=np.array([[1, 0], [0.5, 0], [0.25, 0]]),
+            positions=np.array([[100, 100], [103, 100], [300, 300]]),
+            energies=np.zeros(3),
+            colors=["#000000"] * 3,
+        )
+        food_positions = np.array([[102, 100], [400, 400], [300, 300]])
+        with mock.patch.object(constants, "FOOD_ENERGY", 4):
+            eaten_idxs = cells.eat(food_positions=food_positions, food_radii=np.ones(3))
+        self.assertEqual(sorted(eaten_idxs.tolist()), [0, 2])
+        # the first food goes to the closer second cell, scaled by digest
+        np.testing.assert_allclose(cells.get_energies(), [0, 2, 1])
+
+    def test_mutate(self) -> None:
+        # cells that do not mutate get copies of their genome and frames
+        self.population.scores[:, self.population.trait2idx["mutate"]] = 0
+        mut_genomes, mut_frames = self.population.mutate(rows=[2, 0])
+        self.assertEqual(mut_genomes, [self.cells[2].get_genome()] * 2)
+        np.testing.assert_array_equal(mut_frames, self.population.frames[[2, 0]])
+
+    def test_calc_scores(self) -> None:
+        genomes = ["AAACCCTTTGGGACTA"]
+        frames = self.population.frames[[0]]
+        scores = self.population.calc_scores(
+            genomes=genomes, frames=frames, ideal_seqs=self.ideal_seqs
+        )
+        np.testing.assert_array_equal(scores, [[1, 0.75]])
+        # the unchanged move sequence keeps the score of the parent
+        self.population.scores[0] = 0.5
+        scores = self.population.calc_scores(
+            genomes=genomes, frames=frames, ideal_seqs=self.ideal_seqs, parent_rows=[0]
+        )
+        np.testing.assert_array_equal(scores, [[0.5, 0.75]])
+
+    def test_reproduce(self) -> None:
+        # only the cell with enough energy divides
+        self.population.energies[:3] = [1, 6, 2]
+        self.population.scores[:, self.population.trait2idx["mutate"]] = 0
+        daughter_ids, timings = self.population.reproduce(
+            ideal_seqs=self.ideal_seqs, threshold=5
+        )
+        np.testing.assert_array_equal(daughter_ids, [3])
+        np.testing.assert_array_equal(self.population.parent_ids[:4], [-1, -1, -1, 1])
+        self.assertEqual(timings["n_daughters"], 1)
+        self.assertEqual(len(self.population), 4)
+        # the daughter copies its parent and they split the energy
+        np.testing.assert_array_equal(self.population.get_energies(), [1, 3, 2, 3])
+        np.testing.assert_array_equal(
+            self.population.positions[3], self.population.positions[1]
+        )
+        self.assertEqual(
+            self.population.get_cell(cell_id=3).get_genome(), self.cells[1].get_genome()
+        )
+
+    def test_rescore(self) -> None:
+        ideal_seqs = {"move": "CCCTTT", "mutate": "GACT"}
+        expected = self.population.calc_scores(
+            genomes=self.population.genomes,
+            frames=self.population.frames[: len(self.population)],
+            ideal_seqs=ideal_seqs,
+        )
+        for n_workers in (None, 2):
+            self.population.scores[:] = 0
+            timings = self.population.rescore(
+                ideal_seqs=ideal_seqs, n_workers=n_workers, chunk_size=2
+            )
+            self.assertEqual(timings["n_cells"], 3)
+            np.testing.assert_array_equal(
+                self.population.scores[: len(self.population)], expected
+            )
+
+    def test_reap(self) -> None:
+        self.population.energies[1] = -1
+        dead_ids = self.population.reap()
+        np.testing.assert_array_equal(dead_ids, [1])
+        np.testing.assert_array_equal(self.population.get_ids(), [0, 2])
+        # views still find their cell after the rows are compacted
+        view = self.population.get_cell(cell_id=2)
+        self.assertEqual(view.get_trait_frame(trait="mutate"), (12, 18))
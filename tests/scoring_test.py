@@ -0,0 +1,148 @@
+import unittest
+import numpy as np
+import source.cell as cell
+import source.genome as genome
+import source.mutation as mutation
+import source.scoring as scoring
+from Levenshtein import distance as levenshtein_distance
+
+
+class ScoringTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # start every test with empty shared caches
+        scoring.clear_score_caches()
+        # define ideal sequences and traits
+        self.ideal_seqs = {"move": "AAACCCTTTGGG", "mutate": "ACTG"}
+        self.traits = ["move", "mutate"]
+        # define the genomes and frames
+        self.genomes = ["AAACCCTTTGGGACTG", "AAACCCTTTGGGACTA"]
+        self.frames = np.array([[[0, 12], [12, 16]], [[0, 12], [12, 16]]])
+
+    def test_calc_score(self) -> None:
+        self.assertEqual(scoring.calc_score("ACTG", "ACTG"), 1)
+        self.assertEqual(scoring.calc_score("ACTA", "ACTG"), 0.75)
+        self.assertEqual(scoring.calc_score("", "ACTG"), 0)
+        self.assertEqual(scoring.calc_score("AAAAAAAAA", "ACTG"), 0)
+
+    def test_score_cache(self) -> None:
+        score_cache = scoring.ScoreCache(ideal_seq="ACTG", max_size=2)
+        self.assertEqual(score_cache.get_score("ACTA"), 0.75)
+        self.assertEqual(score_cache.get_score("ACTA"), 0.75)
+        score_cache.get_score("ACTG")
+        # the least recently used sequence is forgotten
+        score_cache.get_score("AAAA")
+        self.assertNotIn("ACTA", score_cache.seq2score)
+        self.assertEqual(score_cache.get_stats(), {"hits": 1, "misses": 3, "size": 2})
+
+    def test_get_score_cache(self) -> None:
+        score_cache = scoring.get_score_cache(ideal_seq="ACTG")
+        self.assertIs(scoring.get_score_cache(ideal_seq="ACTG"), score_cache)
+        self.assertIsNot(scoring.get_score_cache(ideal_seq="ACTA"), score_cache)
+
+    def test_score_cells(self) -> None:
+        scores = scoring.score_cells(
+            genomes=self.genomes,
+            frames=self.frames,
+            ideal_seqs=self.ideal_seqs,
+            traits=self.traits + ["other"],
+        )
+        np.testing.assert_array_equal(scores[:, :2], [[1, 1], [1, 0.75]])
+        self.assertTrue(np.all(np.isnan(scores[:, 2])))
+        # identical move frames are scored once
+        self.assertEqual(
+            scoring.get_score_cache(ideal_seq="AAACCCTTTGGG").get_stats()["misses"], 1
+        )
+
+    def test_score_cells_parents(self) -> None:
+        # unchanged sequences keep the parent's score even if it is stale
+        parent_scores = np.array([[0.5, 0.5], [0.5, 0.5]])
+        scores = scoring.score_cells(
+            genomes=self.genomes,
+            frames=self.frames,
+            ideal_seqs=self.ideal_seqs,
+            traits=self.traits,
+            parent_genomes=[self.genomes[0], self.genomes[0]],
+            parent_frames=self.frames,
+            parent_scores=parent_scores,
+        )
+        np.testing.assert_array_equal(scores, [[0.5, 0.5], [0.5, 0.75]])
+
+    def test_cell_parent(self) -> None:
+        parent = cell.Cell(
+            ideal_seqs=self.ideal_seqs,
+            traits=self.traits,
+            trait2frame={"move": (0, 12), "mutate": (12, 16)},
+            genome=self.genomes[0],
+        )
+        parent.trait2score["move"] = 0.5
+        child = cell.Cell(
+            ideal_seqs=self.ideal_seqs,
+            traits=self.traits,
+            trait2frame={"move": (0, 12), "mutate": (12, 16)},
+            genome=self.genomes[1],
+            parent=parent,
+        )
+        self.assertEqual(child.get_trait_score("move"), 0.5)
+        self.assertEqual(child.get_trait_score("mutate"), 0.75)
+
+    def test_batch_scorer(self) -> None:
+        rng = np.random.default_rng(0)
+        nucs = ["A", "C", "G", "T"]
+        for size in (1, 15, 50, 64, 70):
+            ideal_seq = "".join(rng.choice(nucs, size=size))
+            seqs = ["", ideal_seq, ideal_seq[1:], ideal_seq + "A"]
+            seqs += ["".join(rng.choice(nucs, size=n)) for n in range(0, 140, 3)]
+            exact = np.array([levenshtein_distance(seq, ideal_seq) for seq in seqs])
+            batch_scorer = scoring.BatchScorer(ideal_seq=ideal_seq)
+            self.assertEqual(batch_scorer.is_bit_parallel, size <= 64)
+            np.testing.assert_array_equal(batch_scorer.calc_distances(seqs), exact)
+            # distances past the cutoff are reported as one more than it
+            for max_dist in (0, 5, size):
+                np.testing.assert_array_equal(
+                    batch_scorer.calc_distances(seqs, max_dist=max_dist),
+                    np.minimum(exact, max_dist + 1),
+                )
+            np.testing.assert_array_equal(
+                batch_scorer.calc_scores(seqs),
+                [scoring.calc_score(seq, ideal_seq) for seq in seqs],
+            )
+
+    def test_calc_lower_bounds(self) -> None:
+        batch_scorer = scoring.BatchScorer(ideal_seq="AACC")
+        codes = genome.encode("GGTTAACCAAAAAAAA")
+        lower_bounds = batch_scorer.calc_lower_bounds(
+            codes, starts=np.array([0, 4, 8]), lengths=np.array([4, 4, 8])
+        )
+        np.testing.assert_array_equal(lower_bounds, [4, 0, 6])
+
+    def test_calc_frame_bounds(self) -> None:
+        seqs = ["ACGTACGT", "TTGCA"]
+        codes, offsets = mutation.concat_genomes(seqs)
+        for frame in ((1, 4), (-3, 20), (-20, -2), (5, 2), (0, 0)):
+            starts, lengths = scoring.calc_frame_bounds(
+                offsets, frames=np.array([frame, frame])
+            )
+            for seq, start, length in zip(seqs, starts, lengths):
+                self.assertEqual(
+                    genome.decode(codes[start : start + length]),
+                    seq[frame[0] : frame[1]],
+                )
+
+    def test_score_codes(self) -> None:
+        codes, offsets = mutation.concat_genomes(self.genomes)
+        scores = scoring.score_codes(
+            codes=codes,
+            offsets=offsets,
+            frames=self.frames,
+            ideal_seqs=self.ideal_seqs,
+            traits=self.traits,
+        )
+        np.testing.assert_array_equal(
+            scores,
+            scoring.score_cells(
+                genomes=self.genomes,
+                frames=self.frames,
+                ideal_seqs=self.ideal_seqs,
+                traits=self.traits,
+            ),
+        )
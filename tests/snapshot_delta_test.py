@@ -0,0 +1,151 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import source.cell as cell
+import source.population as population
+import source.snapshot_delta as snapshot_delta
+import source.snapshot_store as snapshot_store
+
+
+class SnapshotDeltaTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define temporary store directories
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.delta_dirname = os.path.join(self.tmp_dir.name, "deltas")
+        self.store_dirname = os.path.join(self.tmp_dir.name, "store")
+        # define a small population
+        self.ideal_seqs = {"move": "AAACCC", "mutate": "ACTG"}
+        self.traits = ["move", "mutate"]
+        cells = [
+            cell.Cell(
+                ideal_seqs=self.ideal_seqs,
+                traits=self.traits,
+                trait2frame={"move": (0, 6), "mutate": (6, 10)},
+                genome="AAACCCACTG" + "A" * idx,
+            )
+            for idx in range(4)
+        ]
+        self.population = population.CellPopulation(traits=self.traits)
+        self.population.add_cells(cells)
+        self.population.energies[:4] = [1, 2, 3, 4]
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def write_rounds(self, n_rounds: int, keyframe_interval: int) -> None:
+        # write the same rounds as deltas and in full
+        delta_writer = snapshot_delta.DeltaSnapshotWriter(
+            dirname=self.delta_dirname,
+            traits=self.traits,
+            overwrite=True,
+            keyframe_interval=keyframe_interval,
+        )
+        store_writer = snapshot_store.SnapshotWriter(
+            dirname=self.store_dirname, traits=self.traits, overwrite=True
+        )
+        rng = np.random.default_rng(0)
+        for round_num in range(n_rounds):
+            # cells move every round, divide, die and get rescored now and then
+            if round_num % 3 == 1:
+                self.population.reproduce(
+                    ideal_seqs=self.ideal_seqs, threshold=2, rng=rng
+                )
+            if round_num % 4 == 2:
+                self.population.keep(mask=np.arange(len(self.population)) % 3 != 0)
+            if round_num == 5:
+                self.population.scores[0] = np.nan
+                self.population.colors[1] = "#123456"
+            self.population.move(rng=rng)
+            self.population.energies[: len(self.population)] += 1
+            columns = self.population.get_columns()
+            delta_writer.append(round_num=round_num, columns=columns)
+            store_writer.append(round_num=round_num, columns=columns)
+        delta_writer.close()
+        store_writer.close()
+
+    def assert_rounds_equal(self, columns: dict, expected: dict) -> None:
+        for name, values in columns.items():
+            if name in ("genomes", "colors"):
+                self.assertEqual(values, expected[name])
+            else:
+                np.testing.assert_array_equal(values, expected[name])
+
+    def test_pack_arrays(self) -> None:
+        arrays = {"a": np.arange(6).reshape(2, 3), "b": np.array([b"#FFFFFF"])}
+        record = np.frombuffer(snapshot_delta.pack_arrays(arrays), dtype=np.uint8)
+        unpacked = snapshot_delta.unpack_arrays(record)
+        np.testing.assert_array_equal(unpacked["a"], arrays["a"])
+        np.testing.assert_array_equal(unpacked["b"], arrays["b"])
+
+    def test_replay(self) -> None:
+        self.write_rounds(n_rounds=12, keyframe_interval=5)
+        reader = snapshot_delta.DeltaSnapshotReader(dirname=self.delta_dirname)
+        store_reader = snapshot_store.SnapshotReader(dirname=self.store_dirname)
+        self.assertEqual(reader.get_rounds(), list(range(12)))
+        self.assertEqual(reader.get_keyframe_rounds(), [0, 5, 10])
+        # rounds rebuild the same in order, backwards and from the cache
+        for round_num in list(range(12)) + list(range(11, -1, -1)) + [7, 7]:
+            expected = store_reader.read_round(round_num=round_num)
+            self.assert_rounds_equal(
+                columns=reader.read_round(round_num=round_num), expected=expected
+            )
+        self.assertEqual(
+            reader.read_snaps(round_num=8), store_reader.read_snaps(round_num=8)
+        )
+        with self.assertRaises(KeyError):
+            reader.read_round(round_num=12)
+
+    def test_replay_turnover(self) -> None:
+        writer = snapshot_delta.DeltaSnapshotWriter(
+            dirname=self.delta_dirname, traits=self.traits, overwrite=True
+        )
+        expected = [self.population.get_columns()]
+        # every cell divides then only the daughters survive
+        daughter_ids, _ = self.population.reproduce(
+            ideal_seqs=self.ideal_seqs, threshold=0, rng=np.random.default_rng(0)
+        )
+        self.population.keep(mask=np.isin(self.population.get_ids(), daughter_ids))
+        expected.append(self.population.get_columns())
+        # then every cell dies
+        self.population.keep(mask=np.zeros(shape=len(self.population), dtype=bool))
+        expected.append(self.population.get_columns())
+        for round_num, columns in enumerate(expected):
+            writer.append(round_num=round_num, columns=columns)
+        writer.close()
+        reader = snapshot_delta.DeltaSnapshotReader(dirname=self.delta_dirname)
+        self.assertEqual(reader.get_keyframe_rounds(), [0])
+        for round_num, columns in enumerate(expected):
+            read_columns = reader.read_round(round_num=round_num)
+            read_columns.pop("genome_ids")
+            read_columns.pop("genome_sizes")
+            self.assert_rounds_equal(columns=read_columns, expected=columns)
+
+    def test_delta_is_smaller(self) -> None:
+        writer = snapshot_delta.DeltaSnapshotWriter(
+            dirname=self.delta_dirname, traits=self.traits, overwrite=True
+        )
+        writer.append(round_num=0, columns=self.population.get_columns())
+        # the cells only move and spend energy
+        self.population.move(rng=np.random.default_rng(0))
+        writer.append(round_num=1, columns=self.population.get_columns())
+        writer.close()
+        index = snapshot_delta.read_index(dirname=self.delta_dirname)
+        self.assertEqual(index[:, 1].tolist(), [1, 0])
+        self.assertLess(writer.n_delta_bytes, writer.n_keyframe_bytes / 2)
+
+    def test_torn_record_is_dropped(self) -> None:
+        self.write_rounds(n_rounds=2, keyframe_interval=5)
+        expected = self.population.get_columns()
+        # a record that never reached the index
+        with open(os.path.join(self.delta_dirname, "records.bin"), "ab") as f:
+            f.write(b"\x00" * 100)
+        writer = snapshot_delta.DeltaSnapshotWriter(
+            dirname=self.delta_dirname, traits=self.traits, overwrite=False
+        )
+        writer.append(round_num=2, columns=expected)
+        writer.close()
+        reader = snapshot_delta.DeltaSnapshotReader(dirname=self.delta_dirname)
+        columns = reader.read_round(round_num=2)
+        np.testing.assert_array_equal(columns["energies"], expected["energies"])
+        self.assertEqual(columns["genomes"], expected["genomes"])
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import source.cell as cell
+import source.population as population
+import source.snapshot_sqlite as snapshot_sqlite
+import source.snapshot_store as snapshot_store
+
+
+class SnapshotSqliteTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define a temporary database
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, "snapshots.sqlite")
+        # define a small population
+        self.ideal_seqs = {"move": "AAACCC", "mutate": "ACTG"}
+        self.traits = ["move", "mutate"]
+        self.cells = [
+            cell.Cell(
+                ideal_seqs=self.ideal_seqs,
+                traits=self.traits,
+                trait2frame={"move": (0, 6), "mutate": (6 - idx, 10)},
+                genome="AAACCCACTG" + "A" * idx,
+            )
+            for idx in range(3)
+        ]
+        self.population = population.CellPopulation(traits=self.traits)
+        self.population.add_cells(self.cells)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def write_run(self, n_rounds: int) -> int:
+        writer = snapshot_sqlite.SqliteSnapshotWriter(
+            filename=self.filename, traits=self.traits
+        )
+        self.mean_scores = []
+        for round_num in range(n_rounds):
+            self.population.scores[:3, 0] = np.array([0.1, 0.5, 0.9]) + round_num / 10
+            self.mean_scores.append(self.population.scores[:3, 0].mean())
+            writer.append(round_num=round_num, columns=self.population.get_columns())
+        writer.close()
+        return writer.run_id
+
+    def test_queries(self) -> None:
+        run_id = self.write_run(n_rounds=3)
+        reader = snapshot_sqlite.SqliteSnapshotReader(filename=self.filename)
+        self.assertEqual(reader.get_runs(), [run_id])
+        self.assertEqual(reader.get_rounds(run_id=run_id), [0, 1, 2])
+        # mean move score per round
+        round_nums, mean_scores = reader.calc_mean_trait_scores(
+            run_id=run_id, trait="move"
+        )
+        np.testing.assert_array_equal(round_nums, [0, 1, 2])
+        np.testing.assert_allclose(mean_scores, self.mean_scores)
+        # cells with a move score above a threshold at a round
+        cell_ids = reader.get_cells_above(
+            run_id=run_id, round_num=1, trait="move", min_score=0.55
+        )
+        self.assertEqual(cell_ids, [1, 2])
+        reader.close()
+
+    def test_read_snaps(self) -> None:
+        run_id = self.write_run(n_rounds=1)
+        reader = snapshot_sqlite.SqliteSnapshotReader(filename=self.filename)
+        expected = snapshot_store.get_snaps(
+            columns=self.population.get_columns(), traits=self.traits
+        )
+        self.assertEqual(reader.read_snaps(run_id=run_id, round_num=0), expected)
+        # identical genomes are stored once
+        self.assertEqual(reader.query("SELECT COUNT(*) FROM genomes")[0][0], 3)
+        reader.close()
+
+    def test_runs(self) -> None:
+        # every writer adds a run without touching the ones before
+        first_run_id = self.write_run(n_rounds=2)
+        second_run_id = self.write_run(n_rounds=1)
+        reader = snapshot_sqlite.SqliteSnapshotReader(filename=self.filename)
+        self.assertEqual(reader.get_runs(), [first_run_id, second_run_id])
+        self.assertEqual(reader.get_rounds(run_id=first_run_id), [0, 1])
+        self.assertEqual(reader.get_traits(run_id=second_run_id), self.traits)
+        reader.close()
@@ -0,0 +1,111 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import source.cell as cell
+import source.population as population
+import source.snapshot_store as snapshot_store
+
+
+class SnapshotStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define a temporary store directory
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dirname = os.path.join(self.tmp_dir.name, "store")
+        # define a small population
+        self.ideal_seqs = {"move": "AAACCC", "mutate": "ACTG"}
+        self.traits = ["move", "mutate"]
+        self.cells = [
+            cell.Cell(
+                ideal_seqs=self.ideal_seqs,
+                traits=self.traits,
+                trait2frame={"move": (0, 6), "mutate": (6, 10)},
+                genome="AAACCCACTG" + "A" * idx,
+            )
+            for idx in range(3)
+        ]
+        self.population = population.CellPopulation(traits=self.traits)
+        self.population.add_cells(self.cells)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def write_rounds(self, n_rounds: int) -> None:
+        writer = snapshot_store.SnapshotWriter(
+            dirname=self.dirname, traits=self.traits, overwrite=True
+        )
+        for round_num in range(n_rounds):
+            self.population.energies[: len(self.population)] = round_num
+            writer.append(round_num=round_num, columns=self.population.get_columns())
+        writer.close()
+
+    def test_read_round(self) -> None:
+        self.write_rounds(n_rounds=3)
+        reader = snapshot_store.SnapshotReader(dirname=self.dirname)
+        self.assertEqual(reader.get_rounds(), [0, 1, 2])
+        columns = reader.read_round(round_num=1)
+        np.testing.assert_array_equal(columns["ids"], [0, 1, 2])
+        np.testing.assert_array_equal(columns["energies"], [1, 1, 1])
+        np.testing.assert_array_equal(
+            columns["positions"], self.population.get_positions()
+        )
+        self.assertEqual(
+            columns["genomes"], [cell_object.get_genome() for cell_object in self.cells]
+        )
+        with self.assertRaises(KeyError):
+            reader.read_round(round_num=3)
+
+    def test_read_snaps(self) -> None:
+        self.write_rounds(n_rounds=1)
+        reader = snapshot_store.SnapshotReader(dirname=self.dirname)
+        cell_snaps = reader.read_snaps(round_num=0)
+        for cell_id, cell_object in zip(range(3), self.cells):
+            self.assertEqual(cell_snaps[cell_id], cell_object.get_snap())
+
+    def test_append_to_existing(self) -> None:
+        self.write_rounds(n_rounds=2)
+        # reopening keeps the rounds and appends after them
+        writer = snapshot_store.SnapshotWriter(
+            dirname=self.dirname, traits=self.traits, overwrite=False
+        )
+        self.population.keep(mask=np.array([True, False, True]))
+        writer.append(round_num=2, columns=self.population.get_columns())
+        writer.close()
+        reader = snapshot_store.SnapshotReader(dirname=self.dirname)
+        self.assertEqual(reader.get_rounds(), [0, 1, 2])
+        self.assertEqual(len(reader.read_round(round_num=1)["genomes"]), 3)
+        columns = reader.read_round(round_num=2)
+        np.testing.assert_array_equal(columns["ids"], [0, 2])
+        self.assertEqual(columns["genomes"][1], self.cells[2].get_genome())
+        # a store for other traits is refused
+        with self.assertRaises(ValueError):
+            snapshot_store.SnapshotWriter(
+                dirname=self.dirname, traits=["move"], overwrite=False
+            )
+
+    def test_partial_round_is_ignored(self) -> None:
+        self.write_rounds(n_rounds=2)
+        # a round whose index entry was cut short is not visible
+        with open(os.path.join(self.dirname, "index.bin"), "ab") as f:
+            f.write(b"\x00" * 12)
+        reader = snapshot_store.SnapshotReader(dirname=self.dirname)
+        self.assertEqual(len(reader), 2)
+
+    def test_torn_round_is_dropped(self) -> None:
+        self.write_rounds(n_rounds=1)
+        # a writer that stopped after some columns of a round but before
+        # its index entry left rows no round points at
+        for name in ("energies", "ids"):
+            filename = snapshot_store.get_column_filename(self.dirname, name)
+            with open(filename, "ab") as f:
+                f.write(np.full(shape=2, fill_value=9, dtype="<i8").tobytes())
+        writer = snapshot_store.SnapshotWriter(
+            dirname=self.dirname, traits=self.traits, overwrite=False
+        )
+        self.population.energies[: len(self.population)] = 5
+        writer.append(round_num=1, columns=self.population.get_columns())
+        writer.close()
+        reader = snapshot_store.SnapshotReader(dirname=self.dirname)
+        columns = reader.read_round(round_num=1)
+        np.testing.assert_array_equal(columns["energies"], [5, 5, 5])
+        np.testing.assert_array_equal(columns["ids"], [0, 1, 2])
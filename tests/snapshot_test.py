@@ -0,0 +1,212 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import source.cell as cell
+import source.population as population
+import source.snapshot as snapshot
+import source.snapshot_delta as snapshot_delta
+import source.snapshot_sqlite as snapshot_sqlite
+import source.snapshot_store as snapshot_store
+
+
+class RecordingSink:
+    """
+    sink that keeps the columns of every round it is given
+    """
+
+    def __init__(self):
+        self.rounds = {}
+        self.aggregates = {}
+        self.is_closed = False
+
+    def append(self, round_num, columns):
+        self.rounds[round_num] = columns
+
+    def append_aggregates(self, round_num, aggregates):
+        self.aggregates[round_num] = aggregates
+
+    def close(self):
+        self.is_closed = True
+
+
+class SnapshotTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define a temporary snapshot directory
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dirname = self.tmp_dir.name
+        # define a population
+        self.ideal_seqs = {"move": "AAACCC", "mutate": "ACTG"}
+        self.traits = ["move", "mutate"]
+        self.cells = [
+            cell.Cell(
+                ideal_seqs=self.ideal_seqs,
+                traits=self.traits,
+                trait2frame={"move": (0, 6), "mutate": (6, 10)},
+                genome="AAACCCACTG" + "A" * (idx % 3),
+            )
+            for idx in range(20)
+        ]
+        self.population = population.CellPopulation(traits=self.traits)
+        self.population.add_cells(self.cells)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def get_filename(self, dirname, prefix, round_num, overwrite) -> str:
+        return os.path.join(self.dirname, f"{prefix}{round_num}.json")
+
+    def test_sample_ids(self) -> None:
+        ids = np.arange(1000)
+        is_sampled = snapshot.sample_ids(ids=ids, sample_size=100)
+        self.assertEqual(is_sampled.sum(), 100)
+        sampled_ids = set(ids[is_sampled].tolist())
+        # the sample does not depend on the order of the cells
+        shuffled_ids = np.random.default_rng(0).permutation(ids)
+        is_sampled = snapshot.sample_ids(ids=shuffled_ids, sample_size=100)
+        self.assertEqual(set(shuffled_ids[is_sampled].tolist()), sampled_ids)
+        # sampled cells stay sampled when other cells die
+        alive_ids = ids[(ids % 2 == 0) | np.isin(ids, list(sampled_ids))]
+        alive_ids = alive_ids[alive_ids % 3 != 0]
+        is_sampled = snapshot.sample_ids(ids=alive_ids, sample_size=100)
+        self.assertTrue(
+            {idx for idx in sampled_ids if idx % 3 != 0}
+            <= set(alive_ids[is_sampled].tolist())
+        )
+        # living sampled cells never leave the sample as cells die and are born
+        rng = np.random.default_rng(0)
+        ids = np.arange(10000)
+        next_id = len(ids)
+        sampled_ids = None
+        for _ in range(50):
+            is_sampled = snapshot.sample_ids(
+                ids=ids, sample_size=100, sampled_ids=sampled_ids
+            )
+            self.assertEqual(is_sampled.sum(), 100)
+            if sampled_ids is not None:
+                alive_sampled_ids = sampled_ids[np.isin(sampled_ids, ids)]
+                self.assertTrue(np.isin(alive_sampled_ids, ids[is_sampled]).all())
+            sampled_ids = ids[is_sampled]
+            ids = ids[rng.random(len(ids)) >= 0.05]
+            ids = np.concatenate([ids, np.arange(next_id, next_id + 500)])
+            next_id += 500
+        # small populations are saved in full
+        self.assertTrue(snapshot.sample_ids(ids=ids[:5], sample_size=100).all())
+        self.assertTrue(snapshot.sample_ids(ids=ids, sample_size=None).all())
+
+    def test_calc_aggregates(self) -> None:
+        aggregates = snapshot.calc_aggregates(
+            energies=[1, 2, 3],
+            scores=[[0.5, np.nan], [1, np.nan], [0, np.nan]],
+            genome_sizes=[10, 10, 13],
+            traits=self.traits,
+        )
+        self.assertEqual(aggregates["n_cells"], 3)
+        self.assertEqual(aggregates["energy"]["mean"], 2)
+        self.assertEqual(aggregates["genome_size"]["max"], 13)
+        self.assertEqual(aggregates["trait_scores"]["move"]["min"], 0)
+        self.assertIsNone(aggregates["trait_scores"]["mutate"]["mean"])
+
+    def test_take_snapshot(self) -> None:
+        cell_objects = self.population.get_views()
+        with mock.patch.object(snapshot, "prep_snapshot_env", self.get_filename):
+            snapshot.take_snapshot(
+                cell_objects=cell_objects, round_num=3, overwrite=False, sample_size=5
+            )
+        with open(os.path.join(self.dirname, "snap_3.json")) as f:
+            cell_snaps = json.load(f)
+        with open(os.path.join(self.dirname, "agg_3.json")) as f:
+            aggregates = json.load(f)
+        self.assertEqual(len(cell_snaps), 5)
+        # the aggregates cover every cell
+        self.assertEqual(aggregates["n_cells"], 20)
+        self.assertEqual(aggregates["n_sampled"], 5)
+        self.assertAlmostEqual(
+            aggregates["genome_size"]["mean"],
+            np.mean([cell_object.get_genome_size() for cell_object in self.cells]),
+        )
+        # without a sample size every cell is saved as its snap
+        with mock.patch.object(snapshot, "prep_snapshot_env", self.get_filename):
+            snapshot.take_snapshot(
+                cell_objects=cell_objects, round_num=4, overwrite=False
+            )
+        with open(os.path.join(self.dirname, "snap_4.json")) as f:
+            cell_snaps = json.load(f)
+        self.assertEqual(
+            cell_snaps,
+            {
+                str(cell_id): cell_object.get_snap()
+                for cell_id, cell_object in cell_objects.items()
+            },
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.dirname, "agg_4.json")))
+
+    def test_sampled_writer(self) -> None:
+        sink = RecordingSink()
+        writer = snapshot.SampledSnapshotWriter(
+            sink=sink, traits=self.traits, sample_size=4
+        )
+        for round_num in range(2):
+            writer.append(round_num=round_num, columns=self.population.get_columns())
+            self.population.keep(mask=np.arange(len(self.population)) != 0)
+        writer.close()
+        self.assertTrue(sink.is_closed)
+        # the same cells are passed on while they live
+        sampled_ids = [set(sink.rounds[idx]["ids"].tolist()) for idx in range(2)]
+        self.assertEqual(len(sampled_ids[0]), 4)
+        self.assertTrue(sampled_ids[0] - {0} <= sampled_ids[1])
+        self.assertEqual(len(sink.rounds[1]["genomes"]), 4)
+        # the aggregates cover every cell
+        self.assertEqual(
+            [sink.aggregates[idx]["n_cells"] for idx in range(2)], [20, 19]
+        )
+
+    def test_sampled_stores(self) -> None:
+        # every store keeps the aggregates of its own run
+        sqlite_filename = os.path.join(self.dirname, "snapshots.sqlite")
+        sinks = {
+            "columnar": lambda: snapshot_store.SnapshotWriter(
+                dirname=os.path.join(self.dirname, "store"),
+                traits=self.traits,
+                overwrite=True,
+            ),
+            "delta": lambda: snapshot_delta.DeltaSnapshotWriter(
+                dirname=os.path.join(self.dirname, "deltas"),
+                traits=self.traits,
+                overwrite=True,
+            ),
+            "sqlite": lambda: snapshot_sqlite.SqliteSnapshotWriter(
+                filename=sqlite_filename, traits=self.traits
+            ),
+        }
+        for name, create_sink in sinks.items():
+            run_ids = []
+            for n_rounds in (2, 1):
+                sink = create_sink()
+                writer = snapshot.SampledSnapshotWriter(
+                    sink=sink, traits=self.traits, sample_size=4
+                )
+                for round_num in range(n_rounds):
+                    writer.append(
+                        round_num=round_num, columns=self.population.get_columns()
+                    )
+                writer.close()
+                run_ids.append(getattr(sink, "run_id", None))
+            if name == "columnar":
+                reader = snapshot_store.SnapshotReader(dirname=sink.dirname)
+                aggregates = reader.read_aggregates()
+                self.assertEqual(len(reader.read_round(round_num=0)["ids"]), 4)
+            elif name == "delta":
+                reader = snapshot_delta.DeltaSnapshotReader(dirname=sink.dirname)
+                aggregates = reader.read_aggregates()
+            else:
+                reader = snapshot_sqlite.SqliteSnapshotReader(filename=sqlite_filename)
+                self.assertEqual(len(reader.get_aggregates(run_id=run_ids[0])), 2)
+                aggregates = reader.get_aggregates(run_id=run_ids[1])
+                reader.close()
+            # the second run replaced the first
+            self.assertEqual([agg["round_num"] for agg in aggregates], [0], name)
+            self.assertEqual(aggregates[0]["n_cells"], 20)
+            self.assertEqual(aggregates[0]["n_sampled"], 4)
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import source.constants as constants
+import source.engine as engine
+import source.snapshot as snapshot
+import source.snapshot_store as snapshot_store
+import source.snapshot_writer as snapshot_writer
+
+
+class GatedSink:
+    """
+    sink that records the rounds it writes and holds each write until released
+    """
+
+    def __init__(self, fail: bool = False):
+        self.rounds = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = fail
+        self.is_closed = False
+
+    def append(self, round_num, columns):
+        self.started.set()
+        self.release.wait(timeout=5)
+        if self.fail:
+            raise OSError("disk is full")
+        self.rounds.append(round_num)
+
+    def close(self):
+        self.is_closed = True
+
+
+class SnapshotWriterTests(unittest.TestCase):
+    def fill(self, policy: str) -> snapshot_writer.BackgroundSnapshotWriter:
+        # the first round is being written while the next three arrive
+        self.sink = GatedSink()
+        writer = snapshot_writer.BackgroundSnapshotWriter(
+            sink=self.sink, queue_size=1, policy=policy
+        )
+        writer.append(round_num=0, columns={})
+        self.sink.started.wait(timeout=5)
+        writer.append(round_num=1, columns={})
+        return writer
+
+    def test_block(self) -> None:
+        writer = self.fill(policy="block")
+        threading.Timer(0.05, self.sink.release.set).start()
+        for round_num in range(2, 4):
+            writer.append(round_num=round_num, columns={})
+        writer.close()
+        self.assertEqual(self.sink.rounds, [0, 1, 2, 3])
+        self.assertTrue(self.sink.is_closed)
+        stats = writer.get_stats()
+        self.assertEqual(stats["n_written"], 4)
+        self.assertEqual(stats["depth"], 0)
+        self.assertGreater(stats["block_seconds"], 0)
+
+    def test_drop(self) -> None:
+        writer = self.fill(policy="drop")
+        for round_num in range(2, 4):
+            writer.append(round_num=round_num, columns={})
+        self.assertEqual(writer.get_depth(), 1)
+        self.sink.release.set()
+        writer.close()
+        self.assertEqual(self.sink.rounds, [0, 1])
+        self.assertEqual(writer.get_stats()["n_dropped"], 2)
+
+    def test_coalesce(self) -> None:
+        writer = self.fill(policy="coalesce")
+        for round_num in range(2, 4):
+            writer.append(round_num=round_num, columns={})
+        self.sink.release.set()
+        writer.close()
+        self.assertEqual(self.sink.rounds, [0, 3])
+        self.assertEqual(writer.get_stats()["n_coalesced"], 2)
+
+    def test_error(self) -> None:
+        sink = GatedSink(fail=True)
+        sink.release.set()
+        writer = snapshot_writer.BackgroundSnapshotWriter(sink=sink, policy="block")
+        writer.append(round_num=0, columns={})
+        with self.assertRaises(RuntimeError):
+            writer.close()
+        with self.assertRaises(ValueError):
+            snapshot_writer.BackgroundSnapshotWriter(sink=sink, policy="wait")
+
+    def test_observer(self) -> None:
+        # run a small simulation snapshotting into a temporary store
+        tmp_dir = tempfile.TemporaryDirectory()
+        dirname = os.path.join(tmp_dir.name, "store")
+        with mock.patch.object(constants, "CURRENT_CACHE_ENABLED", False):
+            state = engine.create_state(
+                n_cells=3,
+                n_vents=1,
+                ideal_seqs={"digest": "ACGT", "move": "ACGT", "mutate": "ACGT"},
+            )
+        observer = snapshot.SnapshotObserver(
+            snapshot_format="columnar", background=True
+        )
+        with mock.patch.object(
+            snapshot_store, "get_store_dirname", return_value=dirname
+        ):
+            engine.Engine(state=state, observers=[observer]).run(n_rounds=3)
+        self.assertEqual(state.timings["snapshot"]["n_written"], 4)
+        reader = snapshot_store.SnapshotReader(dirname=dirname)
+        self.assertEqual(reader.get_rounds(), [0, 1, 2, 3])
+        tmp_dir.cleanup()
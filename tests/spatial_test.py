@@ -0,0 +1,97 @@
+import unittest
+import numpy as np
+import source.constants as constants
+import source.spatial as spatial
+
+
+class SpatialTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define random points and a brute force neighbor search
+        rng = np.random.default_rng(0)
+        self.positions = rng.uniform(0, constants.WINDOW_WIDTH - 1, size=(400, 2))
+        self.radius = 30
+
+    def calc_brute_pairs(self, world_shape: str) -> set:
+        deltas = self.positions[None, :, :] - self.positions[:, None, :]
+        if world_shape == "round":
+            world_size = constants.WINDOW_WIDTH - 1
+            deltas -= world_size * np.round(deltas / world_size)
+        dists = np.hypot(deltas[..., 0], deltas[..., 1])
+        firsts, seconds = np.nonzero(np.triu(dists <= self.radius, k=1))
+        return set(zip(firsts.tolist(), seconds.tolist()))
+
+    def test_query_pairs(self) -> None:
+        for world_shape in ("flat", "round"):
+            for cell_size in (self.radius, 2 * self.radius, 7, 1000):
+                spatial_hash = spatial.SpatialHash(
+                    cell_size=cell_size, world_shape=world_shape
+                )
+                spatial_hash.build(positions=self.positions)
+                pairs = set()
+                for firsts, seconds, deltas in spatial_hash.iter_query_pairs(
+                    radius=self.radius, memory_budget=64 * 500
+                ):
+                    np.testing.assert_allclose(
+                        deltas,
+                        spatial_hash.calc_deltas(
+                            self.positions[firsts], self.positions[seconds]
+                        ),
+                    )
+                    pairs.update(zip(firsts.tolist(), seconds.tolist()))
+                self.assertEqual(pairs, self.calc_brute_pairs(world_shape))
+
+    def test_query_wraps(self) -> None:
+        edge = constants.WINDOW_WIDTH - 2
+        spatial_hash = spatial.SpatialHash(cell_size=10, world_shape="round")
+        spatial_hash.build(positions=np.array([[1.0, 1.0], [edge, edge]]))
+        point_idxs, item_idxs, deltas = spatial_hash.query(
+            points=np.array([[0.5, 0.5]]), radius=5
+        )
+        self.assertEqual(sorted(item_idxs.tolist()), [0, 1])
+        # the flat world does not see across the edge
+        spatial_hash = spatial.SpatialHash(cell_size=10, world_shape="flat")
+        spatial_hash.build(positions=np.array([[1.0, 1.0], [edge, edge]]))
+        point_idxs, item_idxs, deltas = spatial_hash.query(
+            points=np.array([[0.5, 0.5]]), radius=5
+        )
+        self.assertEqual(item_idxs.tolist(), [0])
+
+    def test_calc_repulsions(self) -> None:
+        positions = np.array([[100.0, 100.0], [104.0, 100.0], [300.0, 300.0]])
+        displacements = spatial.calc_repulsions(
+            positions=positions, radii=np.full(3, 5.0), strength=1, world_shape="flat"
+        )
+        # the overlapping pair moves apart by their overlap, the other stays
+        np.testing.assert_allclose(displacements, [[-3, 0], [3, 0], [0, 0]])
+        # coincident points are still pushed apart
+        displacements = spatial.calc_repulsions(
+            positions=np.zeros(shape=(2, 2)), radii=np.full(2, 5.0), strength=1
+        )
+        np.testing.assert_allclose(np.linalg.norm(displacements, axis=1), [5, 5])
+        np.testing.assert_allclose(displacements.sum(axis=0), [0, 0], atol=1e-12)
+
+    def test_find_contacts(self) -> None:
+        rng = np.random.default_rng(1)
+        item_positions = rng.uniform(0, constants.WINDOW_WIDTH - 1, size=(300, 2))
+        radii, item_radii = np.full(400, 8.0), rng.uniform(1, 4, size=300)
+        point_idxs, item_idxs, dists = spatial.find_contacts(
+            self.positions, radii, item_positions, item_radii, world_shape="flat"
+        )
+        # compare with a brute force search
+        all_dists = np.linalg.norm(
+            self.positions[:, None] - item_positions[None, :], axis=-1
+        )
+        expected = set(zip(*np.nonzero(all_dists <= radii[:, None] + item_radii)))
+        self.assertEqual(set(zip(point_idxs.tolist(), item_idxs.tolist())), expected)
+        np.testing.assert_allclose(dists, all_dists[point_idxs, item_idxs])
+
+    def test_assign_items(self) -> None:
+        point_idxs, item_idxs = spatial.assign_items(
+            point_idxs=np.array([0, 1, 2, 1, 0]),
+            item_idxs=np.array([5, 5, 5, 7, 7]),
+            dists=np.array([2.0, 1.0, 1.0, 3.0, 3.0]),
+            point_keys=np.array([10, 30, 20]),
+        )
+        # the closest point wins and ties go to the smallest key
+        self.assertEqual(item_idxs.tolist(), [5, 7])
+        self.assertEqual(point_idxs.tolist(), [2, 0])
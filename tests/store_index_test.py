@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+import source.store_index as store_index
+
+
+class StoreIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define a temporary store directory
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dirname = os.path.join(self.tmp_dir.name, "store")
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def test_open_meta(self) -> None:
+        meta = {"version": 1, "traits": ["move"]}
+        self.assertEqual(
+            store_index.open_meta(dirname=self.dirname, overwrite=True, meta=meta),
+            meta,
+        )
+        # an existing store keeps its metadata
+        self.assertEqual(
+            store_index.open_meta(
+                dirname=self.dirname,
+                overwrite=False,
+                meta={"version": 2, "traits": ["move"]},
+                keys=("traits",),
+            ),
+            meta,
+        )
+        with self.assertRaises(ValueError):
+            store_index.open_meta(
+                dirname=self.dirname,
+                overwrite=False,
+                meta={"version": 1, "traits": ["mutate"]},
+                keys=("traits",),
+            )
+
+    def test_read_index(self) -> None:
+        _ = store_index.open_meta(dirname=self.dirname, overwrite=True, meta={})
+        self.assertEqual(store_index.read_index(self.dirname, width=2).shape, (0, 2))
+        with store_index.open_index_file(dirname=self.dirname, width=2) as f:
+            store_index.write_entry(f=f, entry=[3, 4])
+            store_index.write_entry(f=f, entry=[5, 6])
+            # a partially written entry is ignored
+            f.write(b"\x01\x02")
+        self.assertEqual(
+            store_index.read_index(self.dirname, width=2).tolist(), [[3, 4], [5, 6]]
+        )
+        # and dropped before the next entry is appended
+        with store_index.open_index_file(dirname=self.dirname, width=2) as f:
+            store_index.write_entry(f=f, entry=[7, 8])
+        self.assertEqual(
+            store_index.read_index(self.dirname, width=2).tolist(),
+            [[3, 4], [5, 6], [7, 8]],
+        )
+
+    def test_open_data_file(self) -> None:
+        filename = os.path.join(self.tmp_dir.name, "data.bin")
+        with store_index.open_data_file(filename=filename, n_bytes=0) as f:
+            store_index.write_data(f=f, data=b"committed-torn")
+        # bytes past the committed ones are dropped on reopening
+        with store_index.open_data_file(filename=filename, n_bytes=9) as f:
+            store_index.write_data(f=f, data=b"-new")
+        with open(filename, "rb") as f:
+            self.assertEqual(f.read(), b"committed-new")
+
+    def test_json_lines(self) -> None:
+        filename = os.path.join(self.tmp_dir.name, "lines.jsonl")
+        self.assertEqual(store_index.read_json_lines(filename=filename), [])
+        with open(filename, "at") as f:
+            store_index.write_json_line(f=f, value={"a": 1})
+            store_index.write_json_line(f=f, value={"a": 2})
+            # a partially written line is ignored
+            f.write('{"a": ')
+        self.assertEqual(
+            store_index.read_json_lines(filename=filename), [{"a": 1}, {"a": 2}]
+        )
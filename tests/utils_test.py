@@ -3,6 +3,16 @@ import source.utils as utils
 import numpy as np
 
 
+# reference looping implementation of utils.limit_input
+def limit_input_loop(number, vmin, vmax):
+    while number < vmin or number > vmax:
+        if number < vmin:
+            number = vmax - (vmin - number)
+        else:
+            number = vmin + (number - vmax)
+    return number
+
+
 class UtilsTests(unittest.TestCase):
     def setUp(self) -> None:
         # inputs for test_gen_genome
@@ -69,6 +79,36 @@ class UtilsTests(unittest.TestCase):
         color = utils.gen_color(rng=rng)
         self.assertEqual(color, self.color)
 
+    def test_gen_colors(self) -> None:
+        colors = utils.gen_colors(n=3, rng=np.random.default_rng(0))
+        self.assertEqual(len(colors), 3)
+        self.assertTrue(all(len(color) == 7 and color[0] == "#" for color in colors))
+
     def test_create_dir_if_none(self) -> None:
         func_out = utils.create_dir_if_none(self.dirname)
         self.assertEqual(func_out, self.func_out)
+
+    def test_limit_array(self) -> None:
+        rng = np.random.default_rng(0)
+        values = np.concatenate(
+            [rng.uniform(-2000, 2000, size=1000), [-998, -499, 0, 499, 998, 1497]]
+        )
+        limited_values = utils.limit_array(values, vmin=0, vmax=499)
+        expected_values = [limit_input_loop(value, 0, 499) for value in values]
+        np.testing.assert_allclose(limited_values, expected_values, atol=1e-9)
+
+    def test_limit_input(self) -> None:
+        self.assertEqual(utils.limit_input(-50, vmin=-5, vmax=5), 0)
+        self.assertEqual(utils.limit_input(3.5, vmin=-5, vmax=5), 3.5)
+        self.assertEqual(utils.limit_input(15, vmin=-5, vmax=5), 5)
+
+    def test_bound_positions(self) -> None:
+        positions = np.array([[-1.0, 250.0], [520.0, 600.0]])
+        np.testing.assert_allclose(
+            utils.bound_positions(positions, world_shape="round"),
+            [[498.0, 250.0], [21.0, 101.0]],
+        )
+        np.testing.assert_allclose(
+            utils.bound_positions(positions, world_shape="flat"),
+            [[0.0, 250.0], [499.0, 499.0]],
+        )
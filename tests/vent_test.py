@@ -0,0 +1,37 @@
+import unittest
+import numpy as np
+import source.constants as constants
+import source.vent as vent
+
+
+class VentTests(unittest.TestCase):
+    def setUp(self) -> None:
+        # define vents including one on the edge of the window
+        self.vent_positions = np.array([[250.0, 250.0], [0.0, 499.0], [100.0, 50.0]])
+        self.vent_radii = np.array([20.0, 10.0, 5.0])
+        self.prod_rates = np.array([3, 0, 2])
+
+    def test_create_food_batch(self) -> None:
+        positions, radii, sources = vent.create_food_batch(
+            vent_positions=self.vent_positions,
+            vent_radii=self.vent_radii,
+            prod_rates=self.prod_rates,
+            rng=np.random.default_rng(0),
+        )
+        np.testing.assert_array_equal(sources, [0, 0, 0, 2, 2])
+        self.assertEqual(positions.shape, (5, 2))
+        self.assertEqual(radii.shape, (5,))
+        self.assertTrue(np.all(positions >= 0))
+        self.assertTrue(np.all(positions[:, 0] <= constants.WINDOW_WIDTH - 1))
+        self.assertTrue(np.all(positions[:, 1] <= constants.WINDOW_HEIGHT - 1))
+
+    def test_create_food_batch_jitter(self) -> None:
+        # the bimodal jitter sits about one vent radius away on each axis
+        positions, _, _ = vent.create_food_batch(
+            vent_positions=self.vent_positions[:1],
+            vent_radii=self.vent_radii[:1],
+            prod_rates=np.array([20000]),
+            rng=np.random.default_rng(0),
+        )
+        offsets = np.abs(positions - self.vent_positions[0])
+        np.testing.assert_allclose(offsets.mean(0), self.vent_radii[0], rtol=0.05)